@@ -21,9 +21,12 @@ users set-defaults    Grant typical privileges (SELECT, INSERT, .)
 
 DATABASE SETUP
 -------------------
-create-db             Create schema and deploy all SQL scripts
+create-db             Create schema and deploy all SQL scripts (--jobs N in parallel,
+                      --incremental: only the objects changed since the last run)
 load-db               Load synthetic data via faker or load.sql in the database
-reset-db              Shortcut for drop-db + create-db + load-db
+export-db             Dump every table to TSV files (input of load-db --bulk)
+reset-db              Shortcut for drop-db + create-db + load-db (--snapshot NAME: restore instead)
+snapshot save|restore Golden copy of a loaded schema in a side database, restored table-parallel
 erase-db              Truncate all tables (except lookup), preserving structure
 drop-db               Drop the entire schema
 db-status             Show row counts for each table in the schema
@@ -32,15 +35,27 @@ viewq                 Shows the queue matching log
 QUERIES
 -----------
 q X                   Run sql/queries/QX.sql and save to QX_out.txt
-q X Y                 Run range of queries and save results (e.g. q 1 4)
+q X Y                 Run range of queries and save results (e.g. q 1 4, --jobs N in parallel)
+q X Y --bench         Time repeated runs, write a JSON report, compare with --baseline
+q X Y --profile       Self-time ranking + flamegraph folded stacks from EXPLAIN ANALYZE
+
+PLANS
+-----------
+plans capture         Store normalised EXPLAIN FORMAT=JSON plans as a baseline
+plans check           Flag full scans, lost indexing.sql indexes and cost growth
+plans compare         Median EXPLAIN ANALYZE time per PLAN bundle and optimizer_switch
 """
 
 from __future__ import annotations
 
+import contextlib
 import os
 import sys
 import subprocess
 import re
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List
 
@@ -53,11 +68,24 @@ PROJECT_ROOT = CURRENT_FILE.parents[1]
 if str(PROJECT_ROOT.parent) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT.parent))
 
+from cli.users.bench import METRICS, compare, load_report, write_report
+from cli.users.cache import ResultCache, StatementCache, file_sha256
+from cli.users.compress import open_text, resolve_script
+from cli.users.journal import ScriptJournal
+from cli.users.timing import ScriptTimings
+from cli.users.explain import folded_stacks, format_ranking
+from cli.users.incremental import OBJECTS_TABLE
 from cli.users.manager import UserManager, parse_priv_list
+from cli.users.profile import PROFILES, format_probe, init_command, profile_settings
+from cli.users.plans import diff_plans, indexing_indexes, load_snapshot, write_snapshot
+from cli.users.schema import table_dependencies
+from cli.users.validation import TRUSTED_TRIGGERS
 
 # Default DB name now honors $DB_NAME
 DEFAULT_DB = os.getenv("DB_NAME", "pulse_university")
 DEFAULT_SQL_DIR = PROJECT_ROOT / "sql"
+DEFAULT_DATA_DIR = DEFAULT_SQL_DIR / "data"
+CREATE_DB_SCRIPTS = ("install.sql", "indexing.sql", "procedures.sql", "triggers.sql", "views.sql")
 FAKER_SCRIPT = PROJECT_ROOT / "code" / "data_generation" / "faker.py"
 QUERIES_DIR = DEFAULT_SQL_DIR / "queries"
 
@@ -80,14 +108,28 @@ QUERIES_DIR = DEFAULT_SQL_DIR / "queries"
 )
 @click.option("--root-user", envvar="DB_ROOT_USER", required=True)
 @click.option("--root-pass", envvar="DB_ROOT_PASS", required=True)
+@click.option("--pool-min", envvar="DB_POOL_MIN", default=1, show_default=True, type=int,
+              help="Connections opened up-front per pool (or $DB_POOL_MIN)")
+@click.option("--pool-max", envvar="DB_POOL_MAX", default=8, show_default=True, type=int,
+              help="Upper bound of connections per pool (or $DB_POOL_MAX)")
+@click.option("--identity-ttl", envvar="DB_IDENTITY_TTL", default=300.0, show_default=True,
+              type=click.FloatRange(min=0),
+              help="Seconds to cache CURRENT_USER()/grant lookups, 0 = off (or $DB_IDENTITY_TTL)")
+@click.option("--no-script-cache", is_flag=True,
+              help="Re-parse .sql scripts instead of reusing their cached statement lists")
 @click.pass_context
-def cli(ctx, host, port, root_user, root_pass):
+def cli(ctx, host, port, root_user, root_pass, pool_min, pool_max, identity_ttl, no_script_cache):
     user_mgr = UserManager(
         root_user=root_user,
         root_pass=root_pass,
         host=host,
-        port=port
+        port=port,
+        pool_min=pool_min,
+        pool_max=pool_max,
+        identity_ttl=identity_ttl,
+        statement_cache=None if no_script_cache else StatementCache(),
     )
+    ctx.call_on_close(user_mgr.close)
 
     # Try to establish DB connection and identify user
     try:
@@ -128,19 +170,12 @@ def print_privs(user_mgr: UserManager, username: str, db: str):
     """
     Utility: Show granted privileges for a user on a specific database.
     """
-    with user_mgr._connect() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT privilege_type
-                FROM information_schema.schema_privileges
-                WHERE grantee = %s AND table_schema = %s
-            """, (f"'{username}'@'%'", db))
-            rows = cursor.fetchall()
-            if not rows:
-                click.echo("  (none)")
-            else:
-                for r in sorted(p[0] for p in rows):
-                    click.echo(f"  - {r}")
+    privs = user_mgr.schema_privileges(username, db)
+    if not privs:
+        click.echo("  (none)")
+    else:
+        for r in privs:
+            click.echo(f"  - {r}")
 
 # -------------------- USERS --------------------
 
@@ -289,24 +324,107 @@ def set_defaults(user_mgr: UserManager, username, db, show_diff):
 def _print_ok(msg: str) -> None:
     click.echo(f"[OK] {msg}")
 
+def _timings_options(cmd):
+    """--timings / --top / --timings-out, shared by create-db and load-db."""
+    cmd = click.option("--timings-out", type=click.Path(dir_okay=False),
+                       default=str(DEFAULT_SQL_DIR / "timings.json"), show_default=True,
+                       help="JSON report written by --timings")(cmd)
+    cmd = click.option("--top", default=10, show_default=True, type=click.IntRange(min=0),
+                       help="Slowest statements listed by --timings")(cmd)
+    return click.option("--timings", is_flag=True,
+                        help="Time every statement; print the slowest ones and a per-kind histogram")(cmd)
+
+@contextlib.contextmanager
+def _timed_scripts(enabled: bool, top: int, out_path: str, collector: ScriptTimings | None = None):
+    """
+    Yield the ScriptTimings to pass to execute_sql_file: *collector* when the
+    caller already owns one (load-db → create-db), a new one with --timings,
+    else None. A collector created here is reported on exit, even after a failure.
+    """
+    if collector is not None or not enabled:
+        yield collector
+        return
+    collector = ScriptTimings(top)
+    try:
+        yield collector
+    finally:
+        if collector.units:
+            click.echo("\n" + collector.format_report(), nl=False)
+            collector.write_report(out_path)
+            _print_ok(f"Statement timings → {out_path}")
+
 @root_only
 @cli.command("create-db")
 @click.option("--sql-dir", type=click.Path(exists=True, file_okay=False),
                 default=str(DEFAULT_SQL_DIR), show_default=True)
 @click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--jobs", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Connections deploying independent indexes / procedures / triggers / views concurrently")
+@click.option("--no-indexes", is_flag=True,
+              help="Skip indexing.sql (load-db --defer-indexes builds the indexes after the load)")
+@click.option("--incremental", is_flag=True,
+              help="Redeploy only the objects whose definition changed since the last create-db (data kept)")
+@click.option("--baseline", is_flag=True,
+              help="Run nothing; record the scripts as deployed, so --incremental can compare against them")
+@_timings_options
 @click.pass_obj
-def create_db(user_mgr: UserManager, sql_dir: str, database: str):
+def create_db(user_mgr: UserManager, sql_dir: str, database: str, jobs: int, no_indexes: bool, incremental: bool,
+              baseline: bool, timings: bool, top: int, timings_out: str, collector: ScriptTimings | None = None):
     require_root(user_mgr)
-    order = ["install.sql", "indexing.sql", "procedures.sql", "triggers.sql", "views.sql"]
-    for i, fname in enumerate(order):
-        path = Path(sql_dir) / fname
-        if i == 0:
-            user_mgr.execute_sql_file(path)
-        else:
-            user_mgr.execute_sql_file(path, database=database)
-        _print_ok(fname)
+    if (incremental or baseline) and no_indexes:
+        raise click.ClickException("--incremental / --baseline cannot be combined with --no-indexes "
+                                   "(the indexes would count as removed).")
+    if incremental and baseline:
+        raise click.ClickException("--incremental and --baseline are mutually exclusive.")
+    order = list(CREATE_DB_SCRIPTS)
+    if no_indexes:
+        order.remove("indexing.sql")
+    with _timed_scripts(timings, top, timings_out, collector) as collector:
+        install = resolve_script(Path(sql_dir) / order[0])
+        paths = [resolve_script(Path(sql_dir) / fname) for fname in order[1:]]
+        if baseline:
+            count = user_mgr.record_schema_objects(install, paths, database=database)
+            _print_ok(f"Recorded {count} object fingerprints of {sql_dir} in `{database}` (nothing deployed).")
+            return
+        if incremental:
+            changes = user_mgr.deploy_incremental(install, paths, database=database, jobs=jobs, timings=collector)
+            if changes is None:
+                raise click.ClickException(
+                    f"No object fingerprints in `{database}` to compare against. Run create-db without "
+                    "--incremental (drops the data), or create-db --baseline if the schema already matches "
+                    f"{sql_dir}."
+                )
+            redeployed, dropped = changes
+            if not redeployed and not dropped:
+                _print_ok(f"`{database}` matches {sql_dir}; nothing to redeploy.")
+                return
+            for label in redeployed:
+                click.echo(f"  redeployed  {label}")
+            for label in dropped:
+                click.echo(f"  dropped     {label}")
+            _print_ok(f"Incremental deploy: {len(redeployed)} objects redeployed, {len(dropped)} dropped.")
+            return
+
+        user_mgr.execute_sql_file(install, timings=collector)
+        _print_ok(install.name)
+        _deploy_after_install(user_mgr, install, paths, database=database, jobs=jobs, collector=collector)
+        user_mgr.record_schema_objects(install, paths, database=database)
     _print_ok("Database schema deployed.")
 
+def _deploy_after_install(user_mgr: UserManager, install: Path, paths: list[Path], *, database: str,
+                          jobs: int, collector: ScriptTimings | None) -> None:
+    """Run the scripts that follow install.sql, serially or (jobs > 1) object-parallel."""
+    if jobs > 1:
+        with open_text(install) as fp:
+            tables = table_dependencies(fp.read())
+        user_mgr.deploy_scripts(paths, database=database, tables=tables, jobs=jobs, timings=collector)
+        for path in paths:
+            _print_ok(path.name)
+    else:
+        for path in paths:
+            user_mgr.execute_sql_file(path, database=database, timings=collector)
+            _print_ok(path.name)
+
 @root_only
 @cli.command("drop-db")
 @click.option("--database", default=DEFAULT_DB, show_default=True)
@@ -326,26 +444,123 @@ def drop_db(user_mgr: UserManager, database: str, yes: bool):
 @click.option("--sql-dir", type=click.Path(exists=True, file_okay=False),
                 default=str(DEFAULT_SQL_DIR), show_default=True)
 @click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--single-session", is_flag=True,
+              help="Replay load.sql on one connection with batched commits")
+@click.option("--batch-size", default=1000, show_default=True, type=click.IntRange(min=0),
+              help="Statements per commit with --single-session (0 = one commit)")
+@click.option("--coalesce", is_flag=True,
+              help="Merge consecutive single-row INSERTs into multi-row INSERTs")
+@click.option("--bulk", is_flag=True,
+              help="Load per-table TSV/CSV files with LOAD DATA LOCAL INFILE")
+@click.option("--data-dir", type=click.Path(file_okay=False), default=str(DEFAULT_DATA_DIR),
+              show_default=True, help="Directory of <Table>.tsv|.csv files for --bulk")
+@click.option("--jobs", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Workers for --bulk / --defer-indexes (independent tables in parallel; also create-db --jobs)")
+@click.option("--resume", is_flag=True,
+              help="Continue load.sql after the checkpoint of a failed run (no create-db)")
+@click.option("--defer-indexes", is_flag=True,
+              help="Deploy without indexing.sql, load, then build all indexes per table in one pass")
+@click.option("--trusted", is_flag=True,
+              help="Load without the row-level validation triggers, then validate set-based")
+@click.option("--on-violation", type=click.Choice(["report", "delete"]), default="report", show_default=True,
+              help="--trusted: fail on violating rows, or delete them as the triggers would have rejected them")
+@click.option("--profile", type=click.Choice(["default", *PROFILES]), default="default", show_default=True,
+              help="Server settings for the load connections (bulk: unique_checks=0, …; restored afterwards)")
+@_timings_options
 @click.pass_context
 def load_db(ctx, use_faker_sql: bool, use_faker_intelligent: bool,
-            sql_dir: str, database: str):
+            sql_dir: str, database: str, single_session: bool, batch_size: int,
+            coalesce: bool, bulk: bool, data_dir: str, jobs: int, resume: bool,
+            defer_indexes: bool, trusted: bool, on_violation: str, profile: str, timings: bool,
+            top: int, timings_out: str):
 
     user_mgr = ctx.obj
     require_root(user_mgr)
 
-    if use_faker_sql and use_faker_intelligent:
-        raise click.ClickException("Cannot use both --g and --i at the same time.")
-
-    if use_faker_sql:
+    if sum((use_faker_sql, use_faker_intelligent, bulk)) > 1:
+        raise click.ClickException("--g, --i and --bulk are mutually exclusive.")
+    if jobs > 1 and not (bulk or defer_indexes):
+        raise click.ClickException("--jobs requires --bulk or --defer-indexes (load.sql is replayed in order).")
+    if resume and (use_faker_sql or use_faker_intelligent or bulk):
+        raise click.ClickException("--resume only continues load.sql; drop --g, --i and --bulk.")
+    if defer_indexes and use_faker_intelligent:
+        raise click.ClickException("--defer-indexes cannot be combined with --i (faker.py deploys the schema itself).")
+    if trusted and use_faker_intelligent:
+        raise click.ClickException("--trusted cannot be combined with --i (faker.py inserts through the triggers).")
+    if on_violation != "report" and not trusted:
+        raise click.ClickException("--on-violation only applies to --trusted loads.")
+    if profile != "default" and use_faker_intelligent:
+        raise click.ClickException("--profile cannot be combined with --i (faker.py opens its own connections).")
+
+    settings = profile_settings(profile, trusted=trusted)
+    session_sql = init_command(settings)
+
+    suspended: list[str] = []
+
+    def restore_after_failure():
+        """Put the validation triggers back when the command ends before the trusted branch did."""
+        if not suspended:
+            return
+        user_mgr.restore_triggers(resolve_script(Path(sql_dir) / "triggers.sql"), suspended,
+                                  database=database, jobs=jobs)
+        retry = ("rerun load-db --bulk --trusted (create-db starts over)" if bulk
+                 else "load-db --resume --trusted continues load.sql and validates everything at the end")
+        click.echo(f"[WARN] Trusted load did not complete; {len(suspended)} validation triggers restored. "
+                   f"The rows loaded so far are not validated: {retry}.", err=True)
+
+    def prepare_load():
+        """Runs once the schema exists, right before the data goes in."""
+        if trusted:
+            suspended[:] = user_mgr.suspend_triggers(TRUSTED_TRIGGERS, database=database)
+            ctx.call_on_close(restore_after_failure)
+            click.echo(f"[INFO] Trusted load: {len(suspended)} validation triggers dropped until the load "
+                       "completes (restored if it fails).")
+        if settings:
+            click.echo(format_probe(user_mgr.probe_settings(database, settings), settings))
+            applied = ctx.with_resource(user_mgr.global_settings(settings))
+            used = [s.label for s in settings if s.scope == "SESSION" or s in applied]
+            left_out = [s.name for s in PROFILES[profile] if s not in settings]
+            click.echo(f"[INFO] {profile} profile for the load: {', '.join(used)}"
+                       + (f" ({', '.join(left_out)} only with --trusted)" if left_out else "") + ".")
+
+    # one collector for create-db + load.sql, reported when the command ends
+    collector = ctx.with_resource(_timed_scripts(timings, top, timings_out))
+
+    if resume:
+        prepare_load()
+        load_path = resolve_script(Path(sql_dir) / "load.sql")
+        user_mgr.execute_sql_file(load_path, database=database, show_progress=True,
+                                  single_session=single_session, batch_size=batch_size,
+                                  coalesce_inserts=coalesce, timings=collector, session_sql=session_sql,
+                                  journal=ScriptJournal(load_path, database), resume=True)
+        _print_ok(f"Database loaded from {load_path.name} (resumed).")
+
+    elif bulk:
+        if not Path(data_dir).is_dir():
+            raise click.ClickException(f"Data directory not found: {data_dir}")
+        ctx.invoke(create_db, sql_dir=sql_dir, database=database, jobs=jobs, no_indexes=defer_indexes,
+                   collector=collector)
+        prepare_load()
+        counts = user_mgr.bulk_load_tables(data_dir, database=database,
+                                           install_sql=Path(sql_dir) / "install.sql",
+                                           batch_size=batch_size, jobs=jobs, session_sql=session_sql)
+        _print_ok(f"Bulk-loaded {sum(counts.values())} rows into {len(counts)} tables from {data_dir}.")
+
+    elif use_faker_sql:
         script_path = PROJECT_ROOT / "code" / "data_generation" / "faker_sql.py"
         subprocess.check_call([sys.executable, str(script_path)])
         _print_ok("faker_sql.py executed.")
 
-        ctx.invoke(create_db, sql_dir=sql_dir, database=database)
+        ctx.invoke(create_db, sql_dir=sql_dir, database=database, jobs=jobs, no_indexes=defer_indexes,
+                   collector=collector)
+        prepare_load()
 
-        load_path = Path(sql_dir) / "load.sql"
-        user_mgr.execute_sql_file(load_path, database=database, show_progress=True)
-        _print_ok("load.sql executed after faker_sql.py.")
+        load_path = resolve_script(Path(sql_dir) / "load.sql")
+        user_mgr.execute_sql_file(load_path, database=database, show_progress=True,
+                                  single_session=single_session, batch_size=batch_size,
+                                  coalesce_inserts=coalesce, timings=collector, session_sql=session_sql,
+                                  journal=ScriptJournal(load_path, database))
+        _print_ok(f"{load_path.name} executed after faker_sql.py.")
 
     elif use_faker_intelligent:
         script_path = PROJECT_ROOT / "code" / "data_generation" / "faker.py"
@@ -353,11 +568,47 @@ def load_db(ctx, use_faker_sql: bool, use_faker_intelligent: bool,
         _print_ok("faker.py executed and database populated with intelligent data.")
 
     else:
-        ctx.invoke(create_db, sql_dir=sql_dir, database=database)
+        ctx.invoke(create_db, sql_dir=sql_dir, database=database, jobs=jobs, no_indexes=defer_indexes,
+                   collector=collector)
+        prepare_load()
+
+        load_path = resolve_script(Path(sql_dir) / "load.sql")
+        user_mgr.execute_sql_file(load_path, database=database, show_progress=True,
+                                  single_session=single_session, batch_size=batch_size,
+                                  coalesce_inserts=coalesce, timings=collector, session_sql=session_sql,
+                                  journal=ScriptJournal(load_path, database))
+        _print_ok(f"Database loaded from {load_path.name}.")
+
+    if defer_indexes:
+        built = user_mgr.build_indexes(resolve_script(Path(sql_dir) / "indexing.sql"), database=database,
+                                       jobs=jobs, timings=collector)
+        _print_ok(f"Built {sum(map(len, built.values()))} deferred indexes on {len(built)} tables.")
+        scripts = [resolve_script(Path(sql_dir) / fname) for fname in CREATE_DB_SCRIPTS]
+        user_mgr.record_schema_objects(scripts[0], scripts[1:], database=database)
+
+    if trusted:
+        restored = user_mgr.restore_triggers(resolve_script(Path(sql_dir) / "triggers.sql"), TRUSTED_TRIGGERS,
+                                             database=database, jobs=jobs, timings=collector)
+        suspended.clear()
+        left = user_mgr.validate_data(database, delete=on_violation == "delete")
+        if left:
+            hint = ("a RESTRICT foreign key protects them" if on_violation == "delete"
+                    else "--on-violation delete removes them")
+            raise click.ClickException(f"{sum(left.values())} loaded rows violate {len(left)} validation "
+                                       f"rules; they are kept for inspection ({hint}).")
+        _print_ok(f"Trusted load validated; {restored} validation triggers restored.")
 
-        load_path = Path(sql_dir) / "load.sql"
-        user_mgr.execute_sql_file(load_path, database=database, show_progress=True)
-        _print_ok("Database loaded from load.sql.")
+@root_only
+@cli.command("export-db")
+@click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--out-dir", type=click.Path(file_okay=False), default=str(DEFAULT_DATA_DIR),
+              show_default=True)
+@click.pass_obj
+def export_db(user_mgr: UserManager, database: str, out_dir: str):
+    """Dump every base table to <out-dir>/<Table>.tsv (input of load-db --bulk)."""
+    require_root(user_mgr)
+    counts = user_mgr.export_tables(database, out_dir)
+    _print_ok(f"Exported {sum(counts.values())} rows from {len(counts)} tables to {out_dir}.")
 
 @root_only
 @cli.command("erase-db")
@@ -384,7 +635,7 @@ def erase(user_mgr: UserManager, database: str, yes: bool):
     with user_mgr._connect(database) as cnx, cnx.cursor() as cur:
         cur.execute("SET FOREIGN_KEY_CHECKS = 0;")
         cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE';")
-        tables = [row[0] for row in cur.fetchall() if row[0] not in lookup_tables]
+        tables = [row[0] for row in cur.fetchall() if row[0] not in lookup_tables and row[0] != OBJECTS_TABLE]
         for tbl in tables:
             cur.execute(f"TRUNCATE TABLE `{tbl}`;")
         cur.execute("SET FOREIGN_KEY_CHECKS = 1;")
@@ -413,13 +664,97 @@ def status(user_mgr: UserManager, database: str):
 
 @root_only
 @cli.command("reset-db")
+@click.option("--snapshot", "snapshot_name", metavar="NAME",
+              help="Restore snapshot NAME instead of redeploying and reloading")
 @click.pass_context
-def reset(ctx):
+def reset(ctx, snapshot_name: str | None):
     require_root(ctx.obj)
-    ctx.invoke(drop_db, yes=True)
-    ctx.invoke(load_db)
+    if snapshot_name:
+        ctx.invoke(snapshot_restore, name=snapshot_name, yes=True)
+    else:
+        ctx.invoke(drop_db, yes=True)
+        ctx.invoke(load_db)
     click.echo("[OK] Database reset complete.")
 
+# -------------------- SNAPSHOTS --------------------
+
+@root_only
+@cli.group()
+def snapshot():
+    """Golden copies of a loaded schema in side databases (db137_snap_NAME)."""
+    pass
+
+@snapshot.command("save")
+@click.argument("name")
+@click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--sql-dir", type=click.Path(exists=True, file_okay=False),
+              default=str(DEFAULT_SQL_DIR), show_default=True)
+@click.option("--jobs", default=4, show_default=True, type=click.IntRange(min=1),
+              help="Tables copied concurrently")
+@click.option("--replace", is_flag=True, help="Overwrite an existing snapshot of that name")
+@click.pass_obj
+def snapshot_save(user_mgr: UserManager, name: str, database: str, sql_dir: str, jobs: int, replace: bool):
+    """Copy every table of DATABASE (definitions and rows) into snapshot NAME."""
+    require_root(user_mgr)
+    started = time.perf_counter()
+    install = resolve_script(Path(sql_dir) / "install.sql")
+    tables = user_mgr.save_snapshot(database, name, jobs=jobs, replace=replace,
+                                    install_sha256=file_sha256(install))
+    _print_ok(f"Snapshot {name!r} of `{database}` saved: {len(tables)} tables in "
+              f"{time.perf_counter() - started:.2f}s.")
+
+@snapshot.command("restore")
+@click.argument("name")
+@click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--sql-dir", type=click.Path(exists=True, file_okay=False),
+              default=str(DEFAULT_SQL_DIR), show_default=True)
+@click.option("--jobs", default=4, show_default=True, type=click.IntRange(min=1),
+              help="Tables copied (and schema objects deployed) concurrently")
+@click.option("--yes", is_flag=True, help="Skip confirmation prompt")
+@click.pass_obj
+def snapshot_restore(user_mgr: UserManager, name: str, database: str, sql_dir: str, jobs: int, yes: bool):
+    """Recreate DATABASE from snapshot NAME, then deploy procedures, triggers and views."""
+    require_root(user_mgr)
+    if not yes:
+        click.confirm(f"Replace schema `{database}` with snapshot {name!r}?", abort=True)
+    started = time.perf_counter()
+    meta = user_mgr.restore_snapshot(name, database, jobs=jobs)
+    install = resolve_script(Path(sql_dir) / "install.sql")
+    if meta.get("install_sha256") not in (None, file_sha256(install)):
+        click.echo(f"[WARN] {install.name} changed since snapshot {name!r} was saved; "
+                   "the tables are restored as they were saved.")
+    paths = [resolve_script(Path(sql_dir) / fname) for fname in ("procedures.sql", "triggers.sql", "views.sql")]
+    _deploy_after_install(user_mgr, install, paths, database=database, jobs=jobs, collector=None)
+    _print_ok(f"`{database}` restored from snapshot {name!r} (saved {meta.get('saved_at')} from "
+              f"`{meta.get('source')}`) in {time.perf_counter() - started:.2f}s.")
+
+@snapshot.command("list")
+@click.pass_obj
+def snapshot_list(user_mgr: UserManager):
+    """Show every snapshot with its source schema, age and size."""
+    require_root(user_mgr)
+    snapshots = user_mgr.list_snapshots()
+    if not snapshots:
+        click.echo("No snapshots (create one with `db137 snapshot save NAME`).")
+        return
+    width = max(len(snap["name"]) for snap in snapshots)
+    for snap in snapshots:
+        size = f"{int(snap['bytes']) / 2**20:,.1f} MiB" if snap.get("bytes") is not None else "?"
+        click.echo(f"{snap['name']:<{width}}  {str(snap.get('saved_at', '?')):<19}  "
+                   f"from `{snap.get('source', '?')}`  {snap.get('tables', '?')} tables, {size}")
+
+@snapshot.command("drop")
+@click.argument("name")
+@click.option("--yes", is_flag=True, help="Skip confirmation prompt")
+@click.pass_obj
+def snapshot_drop(user_mgr: UserManager, name: str, yes: bool):
+    """Drop snapshot NAME."""
+    require_root(user_mgr)
+    if not yes:
+        click.confirm(f"Drop snapshot {name!r}?", abort=True)
+    user_mgr.drop_snapshot(name)
+    _print_ok(f"Snapshot {name!r} dropped.")
+
 @cli.command("viewq")
 @click.option("--database", default=DEFAULT_DB, show_default=True)
 @click.pass_obj
@@ -453,8 +788,42 @@ def viewq(user_mgr: UserManager, database: str):
 @click.argument("start", type=int)
 @click.argument("end", required=False, type=int)
 @click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--stream", is_flag=True,
+              help="Fetch rows in batches and spool to a temp file (bounded memory)")
+@click.option("--fetch-size", default=5000, show_default=True, type=click.IntRange(min=1),
+              help="Rows per fetchmany() batch with --stream")
+@click.option("--jobs", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Run up to N query files concurrently (capped by --pool-max)")
+@click.option("--traces", is_flag=True,
+              help="Q04/Q06: save each statement's optimizer trace as JSON plus a summary per plan")
+@click.option("--profile", is_flag=True,
+              help="Also write QXX_profile.txt (self-time ranking) and <plan>.folded flamegraph stacks")
+@click.option("--bench", is_flag=True, help="Benchmark each query instead of writing its output file")
+@click.option("--repeat", default=10, show_default=True, type=click.IntRange(min=1),
+              help="Timed runs per query with --bench")
+@click.option("--warmup", default=2, show_default=True, type=click.IntRange(min=0),
+              help="Discarded warm-up runs per query with --bench")
+@click.option("--bench-out", type=click.Path(dir_okay=False), default=str(QUERIES_DIR / "bench.json"),
+              show_default=True, help="JSON report written by --bench")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False),
+              help="Earlier --bench report to compare against (fails on regressions)")
+@click.option("--metric", type=click.Choice(METRICS), default="p50", show_default=True,
+              help="Latency statistic compared with --baseline")
+@click.option("--threshold", default=0.2, show_default=True, type=click.FloatRange(min=0),
+              help="Allowed growth over the baseline (0.2 = +20%)")
+@click.option("--min-delta-ms", default=1.0, show_default=True, type=click.FloatRange(min=0),
+              help="Ignore regressions smaller than this many milliseconds")
+@click.option("--no-cache", is_flag=True,
+              help="Always execute single-plan queries instead of reusing cached output")
+@click.option("--cache-mode", type=click.Choice(["marker", "checksum"]), default="marker", show_default=True,
+              help="Table change detection: COUNT(*)+MAX(updated_at), or CHECKSUM TABLE everywhere")
+@click.option("--cache-dir", type=click.Path(file_okay=False), envvar="DB137_CACHE_DIR",
+              help="Result cache location [default: ~/.cache/db137]")
 @click.pass_obj
-def run_query(user_mgr: UserManager, start: int, end: int | None, database: str):
+def run_query(user_mgr: UserManager, start: int, end: int | None, database: str,
+              stream: bool, fetch_size: int, jobs: int, traces: bool, profile: bool, bench: bool, repeat: int, warmup: int,
+              bench_out: str, baseline: str | None, metric: str, threshold: float, min_delta_ms: float,
+              no_cache: bool, cache_mode: str, cache_dir: str | None):
     # 1. build exact list
     if end is None:
         query_ids = [start]
@@ -464,25 +833,257 @@ def run_query(user_mgr: UserManager, start: int, end: int | None, database: str)
             return
         query_ids = list(range(start, end + 1))
 
-    # 2. single loop – the only one
-    for q in query_ids:
+    if bench:
+        if jobs > 1:
+            raise click.ClickException("--bench runs queries one at a time; drop --jobs.")
+        _run_bench(user_mgr, query_ids, database=database, repeat=repeat, warmup=warmup,
+                   out_path=Path(bench_out), baseline=baseline, metric=metric,
+                   threshold=threshold, min_delta_ms=min_delta_ms)
+        return
+
+    # 2. one task per query file; multi-plan files keep all plans on one session.
+    #    Only single-plan outputs are cached – Q04/Q06 outputs hold timings.
+    cache = None if no_cache else ResultCache(cache_dir)
+
+    def run_one(q: int) -> tuple[str, str, float] | None:
         sql_path = QUERIES_DIR / f"Q{q:02d}.sql"
         if not sql_path.exists():
             click.echo(f"[SKIP] Missing {sql_path.name}")
-            continue
+            return None
 
+        started = time.perf_counter()
         if q in (4, 6):
             base   = QUERIES_DIR / f"Q{q:02d}_plan"
-            count = user_mgr.run_multi_plan_query_to_files(sql_path, base, database=database)
+            plan_rows: list[int] = []
+            count = user_mgr.run_multi_plan_query_to_files(sql_path, base, database=database,
+                                                           stream=stream, fetch_size=fetch_size,
+                                                           rows_out=plan_rows, save_traces=traces)
+            elapsed = time.perf_counter() - started
             files = ", ".join(f"{base.name}{n}_out.txt" for n in range(1, count + 1))
             _print_ok(f"{sql_path.name} → {files}")
+            if traces:
+                _print_ok(f"{sql_path.name} → {base.name}N_trace.txt, {base.name}N_stmtK.trace.json")
+            if profile:
+                _write_profiles(user_mgr, sql_path, database=database, multi_plan=True)
+            return sql_path.name, "/".join(map(str, plan_rows)), elapsed
+
+        out_path = QUERIES_DIR / f"Q{q:02d}_out.txt"
+        rows = user_mgr.run_query_to_file(sql_path, out_path,
+                                          database=database, stream=stream, fetch_size=fetch_size,
+                                          cache=cache, fingerprint=cache_mode)
+        elapsed = time.perf_counter() - started
+        cached = " (cached)" if cache is not None and out_path.name in cache.hits else ""
+        _print_ok(f"{sql_path.name} → {out_path.name}{cached}")
+        if profile:
+            _write_profiles(user_mgr, sql_path, database=database, multi_plan=False)
+        return sql_path.name, str(rows), elapsed
+
+    wall_start = time.perf_counter()
+    results: list[tuple[str, str, float]] = []
+    failure: Exception | None = None
+    workers = min(jobs, user_mgr.pool_max, len(query_ids))
+    if workers <= 1:
+        for q in query_ids:
+            if (res := run_one(q)) is not None:
+                results.append(res)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(q, pool.submit(run_one, q)) for q in query_ids]
+            # collect in query order so the summary does not depend on timing
+            for q, fut in futures:
+                try:
+                    res = fut.result()
+                except (click.ClickException, mysql.connector.Error, ValueError) as exc:
+                    click.echo(f"[ERROR] Q{q:02d}.sql: {exc}", err=True)
+                    results.append((f"Q{q:02d}.sql", "FAILED", 0.0))
+                    failure = failure or exc
+                    continue
+                if res is not None:
+                    results.append(res)
+
+    # 3. summary
+    if len(results) > 1:
+        name_w = max(len("query"), *(len(r[0]) for r in results))
+        rows_w = max(len("rows"), *(len(r[1]) for r in results))
+        click.echo(f"\n{'query'.ljust(name_w)}  {'rows'.rjust(rows_w)}  {'time (s)':>9}")
+        click.echo(f"{'-' * name_w}  {'-' * rows_w}  {'-' * 9}")
+        for name, rows, elapsed in results:
+            click.echo(f"{name.ljust(name_w)}  {rows.rjust(rows_w)}  {elapsed:9.3f}")
+        click.echo(f"{'wall'.ljust(name_w)}  {'':>{rows_w}}  {time.perf_counter() - wall_start:9.3f}")
+
+    if failure is not None:
+        if isinstance(failure, click.ClickException):
+            raise failure
+        raise click.ClickException(str(failure))
+
+def _write_profiles(user_mgr: UserManager, sql_path: Path, *, database: str, multi_plan: bool) -> None:
+    """QXX_profile.txt with a self-time ranking per plan, plus one <name>.folded per plan."""
+    trees = user_mgr.profile_query_file(sql_path, database=database, multi_plan=multi_plan)
+    report = sql_path.with_name(f"{sql_path.stem}_profile.txt")
+    with report.open("w", encoding="utf-8") as fp:
+        for name, tree in trees.items():
+            fp.write(f"\n## {name} — {tree.total_ms:.3f} ms ##\n")
+            fp.write(format_ranking(tree))
+    for name, tree in trees.items():
+        sql_path.with_name(f"{name}.folded").write_text(folded_stacks(tree), encoding="utf-8")
+    _print_ok(f"{sql_path.name} → {report.name}, " + ", ".join(f"{n}.folded" for n in trees))
+
+# -------------------- PLANS --------------------
+
+def _capture_plans(user_mgr: UserManager, database: str) -> dict[str, dict]:
+    plans: dict[str, dict] = {}
+    for sql_path in sorted(QUERIES_DIR.glob("Q[0-9][0-9].sql")):
+        q = int(sql_path.stem[1:])
+        plans.update(user_mgr.explain_query_file(sql_path, database=database, multi_plan=q in (4, 6)))
+    if not plans:
+        raise click.ClickException(f"No Q??.sql files found in {QUERIES_DIR}.")
+    return plans
+
+@cli.group()
+def plans():
+    """Capture / check EXPLAIN plans of sql/queries."""
+    pass
+
+@plans.command("capture")
+@click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--out", "out_path", type=click.Path(dir_okay=False),
+              default=str(QUERIES_DIR / "plans_baseline.json"), show_default=True)
+@click.pass_obj
+def plans_capture(user_mgr: UserManager, database: str, out_path: str):
+    """Store normalised EXPLAIN FORMAT=JSON plans of every query as the baseline."""
+    captured = _capture_plans(user_mgr, database)
+    write_snapshot(out_path, {
+        "database": database,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "plans": captured,
+    })
+    _print_ok(f"Captured {len(captured)} plans → {out_path}")
+
+@plans.command("check")
+@click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False),
+              default=str(QUERIES_DIR / "plans_baseline.json"), show_default=True)
+@click.option("--cost-threshold", default=0.25, show_default=True, type=click.FloatRange(min=0),
+              help="Allowed growth of the estimated query cost (0.25 = +25%)")
+@click.option("--indexing-sql", type=click.Path(exists=True, dir_okay=False),
+              default=str(DEFAULT_SQL_DIR / "indexing.sql"), show_default=True,
+              help="Indexes created here are tracked individually")
+@click.pass_obj
+def plans_check(user_mgr: UserManager, database: str, baseline: str,
+                cost_threshold: float, indexing_sql: str):
+    """Diff current plans against the baseline; fails on full scans, lost indexes or cost growth."""
+    try:
+        stored = load_snapshot(baseline)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+
+    current = _capture_plans(user_mgr, database)
+    indexed = indexing_indexes(Path(indexing_sql).read_text(encoding="utf-8"))
+    problems = diff_plans(stored["plans"], current, indexed=indexed, cost_threshold=cost_threshold)
+
+    for name in sorted(current.keys() - stored["plans"].keys()):
+        click.echo(f"[INFO] {name}: not in baseline (run `db137 plans capture` to add it)")
+    if not problems:
+        _print_ok(f"{len(current)} plans match {Path(baseline).name}.")
+        return
+    for name, message in problems:
+        click.echo(f"[REGRESSION] {name}: {message}", err=True)
+    raise click.ClickException(f"{len(problems)} plan regression(s) against {Path(baseline).name}.")
+
+def _parse_switch(ctx, param, values):
+    scenarios = []
+    for raw in values:
+        name, sep, flags = raw.partition(":")
+        if not sep or not name.strip() or "=" not in flags:
+            raise click.BadParameter(f"expected NAME:flag=on|off[,...], got {raw!r}")
+        scenarios.append((name.strip(), flags.strip()))
+    return scenarios or [("as written", None)]
+
+@plans.command("compare")
+@click.argument("queries", nargs=-1, type=int)
+@click.option("--database", default=DEFAULT_DB, show_default=True)
+@click.option("--runs", default=5, show_default=True, type=click.IntRange(min=1),
+              help="Timed runs per plan and scenario")
+@click.option("--warmup", default=1, show_default=True, type=click.IntRange(min=0),
+              help="Discarded warm-up runs per plan and scenario")
+@click.option("--switch", "scenarios", multiple=True, callback=_parse_switch,
+              help="Scenario NAME:optimizer_switch flags, e.g. 'hash:block_nested_loop=on' (repeatable)")
+@click.pass_obj
+def plans_compare(user_mgr: UserManager, queries: tuple[int, ...], database: str,
+                  runs: int, warmup: int, scenarios: list[tuple[str, str | None]]):
+    """Median EXPLAIN ANALYZE time of each PLAN bundle (default: Q04 Q06), winner marked."""
+    for q in queries or (4, 6):
+        sql_path = QUERIES_DIR / f"Q{q:02d}.sql"
+        if not sql_path.exists():
+            click.echo(f"[SKIP] Missing {sql_path.name}")
+            continue
+        results = user_mgr.compare_plan_bundles(sql_path, database=database, runs=runs,
+                                                warmup=warmup, scenarios=scenarios)
+        if not results:
+            click.echo(f"[SKIP] {sql_path.name}: no EXPLAIN ANALYZE statements")
             continue
 
-        else:
-            out_path = QUERIES_DIR / f"Q{q:02d}_out.txt"
-            user_mgr.run_query_to_file(sql_path, out_path,
-                                       database=database)
-            _print_ok(f"{sql_path.name} → {out_path.name}")
+        names = [name for name, _ in scenarios]
+        grid: dict[str, dict[str, float]] = {}
+        for res in results:
+            grid.setdefault(f"plan {res['plan']} – {res['label']}", {})[res["scenario"]] = res["median_ms"]
+        best = min(results, key=lambda r: r["median_ms"])
+        best_row = f"plan {best['plan']} – {best['label']}"
+
+        row_w = max(len("plan"), *(len(r) for r in grid))
+        col_w = max(12, *(len(n) for n in names))
+        click.echo(f"\n{sql_path.name} – median actual time (ms) over {runs} run(s)")
+        click.echo("  ".join(["plan".ljust(row_w), *(n.rjust(col_w) for n in names)]))
+        click.echo("  ".join(["-" * row_w, *("-" * col_w for _ in names)]))
+        for row, cells in grid.items():
+            parts = []
+            for n in names:
+                if n not in cells:
+                    parts.append("–".rjust(col_w))
+                    continue
+                mark = "*" if (row, n) == (best_row, best["scenario"]) else " "
+                parts.append(f"{cells[n]:.3f}{mark}".rjust(col_w))
+            click.echo("  ".join([row.ljust(row_w), *parts]))
+        click.echo(f"* winner: {best_row} ({best['scenario']}, {best['median_ms']:.3f} ms)")
+
+def _run_bench(user_mgr: UserManager, query_ids: list[int], *, database: str, repeat: int,
+               warmup: int, out_path: Path, baseline: str | None, metric: str,
+               threshold: float, min_delta_ms: float) -> None:
+    queries: dict[str, dict] = {}
+    for q in query_ids:
+        sql_path = QUERIES_DIR / f"Q{q:02d}.sql"
+        if not sql_path.exists():
+            click.echo(f"[SKIP] Missing {sql_path.name}")
+            continue
+        results = user_mgr.benchmark_query_file(sql_path, database=database, repeat=repeat,
+                                                warmup=warmup, multi_plan=q in (4, 6))
+        for name, stats in results.items():
+            click.echo(f"[OK] {name:<10} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                       f"p99 {stats['p99_ms']:9.3f} ms  {stats['rows']:>7} rows  {stats['bytes']:>10} B")
+        queries.update(results)
+
+    write_report(out_path, {
+        "database": database,
+        "repeat": repeat,
+        "warmup": warmup,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "queries": queries,
+    })
+    _print_ok(f"Benchmark report → {out_path}")
+
+    if baseline is None:
+        return
+    try:
+        regressions = compare({"queries": queries}, load_report(baseline), metric=metric,
+                              threshold=threshold, min_delta_ms=min_delta_ms)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    if not regressions:
+        _print_ok(f"No {metric} regressions beyond +{threshold:.0%} against {Path(baseline).name}.")
+        return
+    for name, before, after, ratio in regressions:
+        click.echo(f"[REGRESSION] {name}: {metric} {before:.3f} ms → {after:.3f} ms (x{ratio:.2f})", err=True)
+    raise click.ClickException(f"{len(regressions)} query(ies) regressed beyond +{threshold:.0%}.")
 
 if __name__ == "__main__":
     cli()
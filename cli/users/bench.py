@@ -0,0 +1,84 @@
+"""
+cli.users.bench
+===============
+Latency statistics and baseline comparison for `db137 q --bench`.
+
+Public API
+----------
+percentile(samples, pct)                 → linear-interpolated percentile
+summarize(samples_ms, rows, bytes_sent)  → {"runs", "min_ms", "p50_ms", ..., "rows", "bytes"}
+load_report(path) / write_report(path, report)
+compare(current, baseline, metric="p50", threshold=0.2, min_delta_ms=1.0)
+    → [(query, baseline_ms, current_ms, ratio)] for every regression
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Sequence
+
+__all__ = ["percentile", "summarize", "load_report", "write_report", "compare", "METRICS"]
+
+REPORT_VERSION = 1
+METRICS = ("min", "p50", "p95", "p99", "max", "mean")
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks (numpy's default)."""
+    if not samples:
+        raise ValueError("percentile() of an empty sample")
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    lo = int(rank)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+def summarize(samples_ms: Sequence[float], rows: int, bytes_sent: int) -> dict:
+    return {
+        "runs": len(samples_ms),
+        "min_ms": round(min(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 3),
+        "rows": rows,
+        "bytes": bytes_sent,
+    }
+
+
+def write_report(path: str | Path, report: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {"version": REPORT_VERSION, **report}
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def load_report(path: str | Path) -> dict:
+    report = json.loads(Path(path).read_text(encoding="utf-8"))
+    if report.get("version") != REPORT_VERSION or "queries" not in report:
+        raise ValueError(f"{path}: not a db137 benchmark report (version {REPORT_VERSION}).")
+    return report
+
+
+def compare(current: dict, baseline: dict, *, metric: str = "p50",
+            threshold: float = 0.2, min_delta_ms: float = 1.0) -> list[tuple[str, float, float, float]]:
+    """
+    Queries whose *metric* grew by more than *threshold* (0.2 = +20 %) and by
+    at least *min_delta_ms* compared with *baseline*. Queries missing from
+    either report are ignored.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}.")
+    key = f"{metric}_ms"
+    regressions = []
+    for name, stats in current["queries"].items():
+        base = baseline["queries"].get(name)
+        if base is None or key not in base:
+            continue
+        before, after = base[key], stats[key]
+        if after - before >= min_delta_ms and after > before * (1 + threshold):
+            regressions.append((name, before, after, after / before if before else float("inf")))
+    return regressions
@@ -0,0 +1,239 @@
+"""
+cli.users.cache
+===============
+On-disk cache shared by the CLI: query results and parsed .sql scripts.
+
+Entries live under $DB137_CACHE_DIR (default ~/.cache/db137), one
+sub-directory per kind. Writes go through a temp file + os.replace so a
+crashed or concurrent run never leaves a half-written entry behind.
+
+Public API
+----------
+default_cache_dir()                         → Path
+file_sha256(path)                           → hex digest, read in 1 MiB chunks
+normalize_sql(sql_text)                     → comment-free, whitespace-collapsed SQL
+volatility(sql_text)                        → "volatile" (NOW, RAND, …), "date" (CURDATE, …) or None
+ResultCache(root)
+ResultCache.key(*parts)                     → sha256 hex digest of the JSON-encoded parts
+ResultCache.fetch(key, out_path)            → rows (output copied to out_path) or None
+ResultCache.store(key, out_path, rows, **meta)
+ResultCache.clear()                         → number of entries removed
+StatementCache(root)
+StatementCache.load(path, parse, version, sha256=None)
+    → yields parse(lines), or the stored result for an unchanged file
+StatementCache.clear()                      → number of entries removed
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from .compress import open_text
+
+__all__ = ["default_cache_dir", "file_sha256", "normalize_sql", "volatility", "ResultCache", "StatementCache"]
+
+# Bump when the aligned-output format changes so stale entries stop matching
+RESULT_FORMAT_VERSION = 1
+
+# Functions whose result changes while no table does
+_DATE_FUNCS_RE = re.compile(r"\b(?:CURDATE|CURRENT_DATE|UTC_DATE)\b", re.I)
+_VOLATILE_FUNCS_RE = re.compile(
+    r"\b(?:NOW|SYSDATE|CURTIME|CURRENT_TIME|CURRENT_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP|UTC_TIME|UTC_TIMESTAMP"
+    r"|UNIX_TIMESTAMP|RAND|UUID|UUID_SHORT|CONNECTION_ID|LAST_INSERT_ID|CURRENT_USER|SLEEP)\b",
+    re.I,
+)
+
+
+def default_cache_dir() -> Path:
+    return Path(os.getenv("DB137_CACHE_DIR", Path.home() / ".cache" / "db137"))
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fp:
+        while chunk := fp.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_sql(sql_text: str) -> str:
+    """
+    Drop comments and collapse whitespace outside string literals, so
+    cosmetic edits do not invalidate cached results.
+    """
+    out: list[str] = []
+    for m in re.finditer(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)|(/\*.*?\*/|--[^\n]*|#[^\n]*)|(\s+)|([^'\"`\s/#-]+|.)",
+                         sql_text, re.S):
+        literal, comment, space, other = m.groups()
+        if literal:
+            out.append(literal)
+        elif comment or space:
+            if out and out[-1] != " ":
+                out.append(" ")
+        else:
+            out.append(other)
+    return "".join(out).strip().rstrip(";").strip()
+
+
+def volatility(sql_text: str) -> str | None:
+    """
+    "volatile" when *sql_text* calls a function whose result differs from
+    call to call (NOW, RAND, UUID, …), "date" when it only depends on the
+    current date (CURDATE, CURRENT_DATE), else None. Names inside string
+    literals also count, which only costs a cache miss.
+    """
+    if _VOLATILE_FUNCS_RE.search(sql_text):
+        return "volatile"
+    if _DATE_FUNCS_RE.search(sql_text):
+        return "date"
+    return None
+
+
+@contextlib.contextmanager
+def _atomic_open(path: Path):
+    """Binary file handle whose content replaces *path* only once the block succeeds."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            yield fp
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    with _atomic_open(path) as fp:
+        fp.write(data)
+
+
+class ResultCache:
+    """Query output files keyed by SQL + table fingerprints."""
+
+    def __init__(self, root: str | Path | None = None):
+        self._dir = Path(root or default_cache_dir()) / "results"
+        self._lock = threading.Lock()
+        self.hits: set[str] = set()          # names passed to fetch() that were served from cache
+
+    @staticmethod
+    def key(*parts) -> str:
+        blob = json.dumps([RESULT_FORMAT_VERSION, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self._dir / f"{key}.out", self._dir / f"{key}.json"
+
+    def fetch(self, key: str, out_path: str | Path) -> int | None:
+        """Copy a cached output to *out_path* and return its row count; None on a miss."""
+        data_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            shutil.copyfile(data_path, out_path)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.hits.add(Path(out_path).name)
+        return int(meta["rows"])
+
+    def store(self, key: str, out_path: str | Path, rows: int, **meta) -> None:
+        self._dir.mkdir(parents=True, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+        _atomic_write(data_path, Path(out_path).read_bytes())
+        _atomic_write(meta_path, json.dumps({"rows": rows, **meta}, default=str).encode("utf-8"))
+
+    def clear(self) -> int:
+        removed = 0
+        for path in self._dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+            path.with_suffix(".out").unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+class StatementCache:
+    """
+    Parsed statement lists of .sql scripts, one entry per script path.
+
+    An entry is valid while the parser *version* matches and the file's
+    mtime and size do; when only those differ (a touched or copied file),
+    its SHA-256 decides. Otherwise the file is parsed again and the entry
+    replaced. Statements are pickled in batches behind a small header, so
+    both a hit and a miss stream through without holding the whole list,
+    and a stale entry is rejected after reading the header alone.
+    """
+
+    _BATCH = 1000
+
+    def __init__(self, root: str | Path | None = None):
+        self._dir = Path(root or default_cache_dir()) / "statements"
+        self.hits: set[str] = set()          # script names served from cache
+
+    def _entry(self, path: Path) -> Path:
+        return self._dir / f"{hashlib.sha256(str(path).encode('utf-8')).hexdigest()[:32]}.pickle"
+
+    def load(self, path: str | Path, parse: Callable[[Iterable[str]], Iterable], *,
+             version: int, sha256: str | None = None) -> Iterator:
+        """
+        Yield parse(<lines of path>) – from the cache when the entry matches,
+        otherwise from the parser while the new entry is written alongside.
+        The entry is only committed once the parse was consumed completely.
+        *sha256* is the file's digest when the caller already computed it;
+        otherwise it is only computed when mtime or size changed.
+        """
+        path = Path(path).resolve()
+        st = path.stat()
+        header = {"version": version, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": sha256}
+        entry = self._entry(path)
+
+        try:
+            fp = entry.open("rb")
+        except OSError:
+            fp = None
+        if fp is not None:
+            with fp:
+                try:
+                    stored = pickle.load(fp)
+                except (EOFError, pickle.UnpicklingError):
+                    stored = None
+                valid = isinstance(stored, dict) and stored.get("version") == version
+                if valid and (stored.get("mtime_ns"), stored.get("size")) != (st.st_mtime_ns, st.st_size):
+                    header["sha256"] = header["sha256"] or file_sha256(path)
+                    valid = stored.get("sha256") == header["sha256"]
+                if valid:
+                    self.hits.add(path.name)
+                    while batch := pickle.load(fp):      # an empty batch ends the entry
+                        yield from batch
+                    return
+
+        header["sha256"] = header["sha256"] or file_sha256(path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with open_text(path) as src, _atomic_open(entry) as out:
+            pickle.dump(header, out, pickle.HIGHEST_PROTOCOL)
+            batch: list = []
+            for item in parse(src):
+                batch.append(item)
+                if len(batch) >= self._BATCH:
+                    pickle.dump(batch, out, pickle.HIGHEST_PROTOCOL)
+                    yield from batch
+                    batch = []
+            if batch:
+                pickle.dump(batch, out, pickle.HIGHEST_PROTOCOL)
+                yield from batch
+            pickle.dump([], out, pickle.HIGHEST_PROTOCOL)
+
+    def clear(self) -> int:
+        removed = 0
+        for path in self._dir.glob("*.pickle"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
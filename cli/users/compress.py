@@ -0,0 +1,66 @@
+"""
+cli.users.compress
+==================
+Compressed .sql scripts (load.sql.gz / .xz / .zst), chosen by file suffix
+and (de)compressed while streaming – no temporary files.
+
+.gz and .xz use the standard library; .zst needs the optional
+`zstandard` package.
+
+Public API
+----------
+COMPRESSED_SUFFIXES           → (".gz", ".xz", ".zst")
+is_compressed(path)           → True for a compressed suffix
+open_text(path, mode="rt")    → text stream, (de)compressed on the fly
+resolve_script(path)          → newest of path, path.gz, path.xz, path.zst that exists
+"""
+
+from __future__ import annotations
+
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO
+
+import click
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for .zst scripts
+    zstandard = None
+
+__all__ = ["COMPRESSED_SUFFIXES", "is_compressed", "open_text", "resolve_script"]
+
+COMPRESSED_SUFFIXES = (".gz", ".xz", ".zst")
+
+
+def is_compressed(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in COMPRESSED_SUFFIXES
+
+
+def open_text(path: str | Path, mode: str = "rt", *, encoding: str = "utf-8") -> IO[str]:
+    """Open *path* in text *mode* ("rt" / "wt"), compressing by suffix."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        return gzip.open(path, mode, encoding=encoding)
+    if suffix == ".xz":
+        return lzma.open(path, mode, encoding=encoding)
+    if suffix == ".zst":
+        if zstandard is None:
+            raise click.ClickException(f"{path.name}: .zst scripts need the zstandard package "
+                                       "(pip install zstandard).")
+        return zstandard.open(path, mode, encoding=encoding)
+    return path.open(mode, encoding=encoding)
+
+
+def resolve_script(path: str | Path) -> Path:
+    """
+    The most recently written of *path* and its compressed variants, so a
+    regenerated load.sql.gz wins over an older load.sql. Returns *path*
+    unchanged when none exists (the caller reports the missing file).
+    """
+    path = Path(path)
+    candidates = [p for p in (path, *(path.with_name(path.name + s) for s in COMPRESSED_SUFFIXES))
+                  if p.is_file()]
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns, default=path)
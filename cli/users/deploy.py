@@ -0,0 +1,217 @@
+"""
+cli.users.deploy
+================
+Dependency analysis for deploying the post-install scripts concurrently
+(`db137 create-db --jobs N`).
+
+Statements of indexing.sql, procedures.sql, triggers.sql, views.sql … are
+grouped into *objects* – every statement that targets the same procedure,
+function, trigger, view or event, and all index / ALTER TABLE statements
+of one table (including CALL helper('<table>', …) lines such as
+indexing.sql's DropIndexIfExists) – and each object keeps its statements
+in script order, so DROP … IF EXISTS still precedes its CREATE.
+
+An object waits for:
+  * the routines and views its statements mention that are already
+    created at that point of the serial order (a view selecting from a
+    view, a trigger calling a procedure, a CALL of a helper procedure);
+  * the previous generation of its own name and everything that used it,
+    when a name is dropped again after its CREATE (the helper procedure
+    dropped at the end of indexing.sql);
+  * every statement before it that could not be classified (SET, INSERT,
+    CALL without a table argument, …) – those run as barriers.
+
+Edges only ever point to earlier objects, so the graph is acyclic and a
+serial walk in object order reproduces the scripts' semantics.
+
+Public API
+----------
+DeployObject                                    → kind, name, database, members, after, weight
+deploy_plan(scripts, database=None, tables=())  → [DeployObject, ...] in serial order
+critical_path(objects)                          → objects on the longest dependency chain
+secondary_indexes(statements, database=None)    → {(schema, table): [(line, index, "ADD INDEX …"), ...]}
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+__all__ = ["DeployObject", "deploy_plan", "critical_path", "secondary_indexes"]
+
+_NAME = r"(?:`?(\w+)`?\s*\.\s*)?`?(\w+)`?"
+_ROUTINE_KINDS = ("PROCEDURE", "FUNCTION", "VIEW")      # objects other statements refer to by name
+_DROP_RE = re.compile(
+    rf"\s*DROP\s+(PROCEDURE|FUNCTION|TRIGGER|VIEW|EVENT)\s+(?:IF\s+EXISTS\s+)?{_NAME}\s*$", re.I
+)
+_CREATE_RE = re.compile(
+    r"\s*CREATE\s+(?:OR\s+REPLACE\s+)?(?:ALGORITHM\s*=\s*\w+\s+)?"
+    r"(?:DEFINER\s*=\s*(?:CURRENT_USER(?:\s*\(\s*\))?|(?:'[^']*'|`[^`]*`|[\w.%-]+)"
+    r"(?:\s*@\s*(?:'[^']*'|`[^`]*`|[\w.%-]+))?)\s+)?"
+    r"(?:SQL\s+SECURITY\s+\w+\s+)?(?:AGGREGATE\s+)?"
+    rf"(PROCEDURE|FUNCTION|TRIGGER|VIEW|EVENT)\s+(?:IF\s+NOT\s+EXISTS\s+)?{_NAME}",
+    re.I,
+)
+_TABLE_DDL_RES = [
+    re.compile(rf"\s*CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+`?\w+`?\s+(?:USING\s+\w+\s+)?ON\s+{_NAME}", re.I),
+    re.compile(rf"\s*DROP\s+INDEX\s+`?\w+`?\s+ON\s+{_NAME}", re.I),
+    re.compile(rf"\s*ALTER\s+TABLE\s+{_NAME}", re.I),
+    re.compile(rf"\s*(?:ANALYZE|OPTIMIZE)\s+(?:NO_WRITE_TO_BINLOG\s+|LOCAL\s+)?TABLE\s+{_NAME}\s*$", re.I),
+]
+_CALL_TABLE_RE = re.compile(rf"\s*CALL\s+{_NAME}\s*\(\s*(['\"])(\w+)\3", re.I)
+_CREATE_INDEX_RE = re.compile(
+    rf"\s*CREATE\s+(UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+`?(\w+)`?\s+(USING\s+\w+\s+)?ON\s+{_NAME}\s*(\(.*)$",
+    re.I | re.S,
+)
+_ONLINE_DDL_RE = re.compile(r"\s+(?:ALGORITHM|LOCK)\s*=?\s*\w+", re.I)     # CREATE INDEX-only options
+_USE_RE = re.compile(r"\s*USE\s+`?(\w+)`?\s*$", re.I)
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class DeployObject:
+    index: int                  # position in the serial order
+    kind: str                   # PROCEDURE, TRIGGER, VIEW, …, TABLE (index DDL) or STATEMENTS (barrier)
+    name: str
+    database: str | None
+    members: list[tuple[Path, int, str]] = field(default_factory=list)    # (script, line, statement)
+    after: set[int] = field(default_factory=set)                          # indexes of prerequisites
+    weight: int = 0             # scheduling priority (bytes of the table for index DDL)
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind} {self.name}"
+
+
+def _classify(stmt: str, tables: dict[str, str]) -> tuple[str, str | None, str, bool, bool] | None:
+    """(kind, schema, name, is_drop, is_create) of the object *stmt* belongs to; None for a barrier."""
+    m = _DROP_RE.match(stmt)
+    if m:
+        return m.group(1).upper(), m.group(2), m.group(3), True, False
+    m = _CREATE_RE.match(stmt)
+    if m:
+        return m.group(1).upper(), m.group(2), m.group(3), False, True
+    for rx in _TABLE_DDL_RES:
+        m = rx.match(stmt)
+        if m:
+            return "TABLE", m.group(1), tables.get(m.group(2).lower(), m.group(2)), False, False
+    m = _CALL_TABLE_RE.match(stmt)
+    if m and m.group(4).lower() in tables:
+        return "TABLE", None, tables[m.group(4).lower()], False, False
+    return None
+
+
+def deploy_plan(
+    scripts: Iterable[tuple[Path, Iterable[tuple[int, str]]]],
+    *,
+    database: str | None = None,
+    tables: Iterable[str] = (),
+) -> list[DeployObject]:
+    """
+    Group the statements of *scripts* – (path, [(line, statement), ...]) in
+    deployment order – into DeployObjects with their prerequisites. *tables*
+    are the names a CALL's first string argument is matched against.
+    *database* is the schema in effect before a script's first USE.
+    """
+    canonical = {t.lower(): t for t in tables}
+    objects: list[DeployObject] = []
+    latest: dict[tuple, DeployObject] = {}          # current generation per (schema, kind, name)
+    created: set[int] = set()                       # objects whose CREATE already ran
+    users: dict[int, set[int]] = {}                 # object → objects that referred to it
+    referable: dict[tuple[str | None, str], list[DeployObject]] = {}
+    barrier: DeployObject | None = None
+
+    def new_object(kind: str, name: str, schema: str | None) -> DeployObject:
+        obj = DeployObject(len(objects), kind, name, schema)
+        if barrier is not None:
+            obj.after.add(barrier.index)
+        objects.append(obj)
+        return obj
+
+    for path, statements in scripts:
+        current_db = database
+        for line, stmt in statements:
+            muse = _USE_RE.match(stmt)
+            if muse:
+                current_db = muse.group(1)
+                continue
+
+            target = _classify(stmt, canonical)
+            if target is None:
+                # unknown side effects: runs after everything before it, everything after waits for it
+                if barrier is None or barrier.index != len(objects) - 1 or barrier.database != current_db:
+                    barrier = new_object("STATEMENTS", f"{path.name}:{line}", current_db)
+                    barrier.after.update(range(barrier.index))
+                barrier.members.append((path, line, stmt))
+                continue
+
+            kind, schema, name, is_drop, is_create = target
+            schema = schema or current_db
+            key = (schema and schema.lower(), kind, name.lower())
+
+            needs = {obj.index
+                     for word in set(_WORD_RE.findall(stmt.lower())) - {name.lower()}
+                     for obj in referable.get((key[0], word), ())
+                     if obj.index in created}
+            obj = latest.get(key)
+            if (obj is None or (is_drop and obj.index in created)
+                    or (needs and max(needs) > obj.index)
+                    or (barrier is not None and barrier.index > obj.index)):
+                previous = obj
+                obj = new_object(kind, name, schema)
+                if previous is not None:
+                    obj.after |= {previous.index} | users.get(previous.index, set())
+                latest[key] = obj
+                if kind in _ROUTINE_KINDS:
+                    referable.setdefault((key[0], key[2]), []).append(obj)
+
+            obj.members.append((path, line, stmt))
+            obj.after |= needs
+            for i in needs:
+                users.setdefault(i, set()).add(obj.index)
+            if is_create:
+                created.add(obj.index)
+    return objects
+
+
+def critical_path(objects: list[DeployObject]) -> list[DeployObject]:
+    """The longest chain of prerequisites (by object count), first object first."""
+    best: dict[int, tuple[int, int | None]] = {}        # index → (chain length, predecessor)
+    for obj in objects:                                 # prerequisites always come first
+        prev = max(obj.after, key=lambda i: best[i][0], default=None)
+        best[obj.index] = (best[prev][0] + 1 if prev is not None else 1, prev)
+    if not best:
+        return []
+    i: int | None = max(best, key=lambda k: best[k][0])
+    chain = []
+    while i is not None:
+        chain.append(objects[i])
+        i = best[i][1]
+    return chain[::-1]
+
+
+def secondary_indexes(statements: Iterable[tuple[int, str]], *,
+                      database: str | None = None) -> dict[tuple[str | None, str], list[tuple[int, str, str]]]:
+    """
+    Every CREATE INDEX in *statements*, rewritten as an ALTER TABLE clause
+    ("ADD UNIQUE INDEX `name` (cols) …") and grouped by (schema, table) in
+    script order, so all indexes of a table can be built by one ALTER TABLE.
+    Other statements (e.g. indexing.sql's DropIndexIfExists helper) are
+    ignored; USE selects the schema, *database* is the one before it.
+    """
+    indexes: dict[tuple[str | None, str], list[tuple[int, str, str]]] = {}
+    current_db = database
+    for line, stmt in statements:
+        muse = _USE_RE.match(stmt)
+        if muse:
+            current_db = muse.group(1)
+            continue
+        m = _CREATE_INDEX_RE.match(stmt)
+        if not m:
+            continue
+        prefix, name, using, schema, table, rest = m.groups()
+        clause = f"ADD {(prefix or '').upper()}INDEX `{name}` {using or ''}{_ONLINE_DDL_RE.sub('', rest).strip()}"
+        indexes.setdefault((schema or current_db, table), []).append((line, name, clause))
+    return indexes
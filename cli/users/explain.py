@@ -0,0 +1,187 @@
+"""
+cli.users.explain
+=================
+Helpers for the text produced by MySQL's EXPLAIN ANALYZE.
+
+Public API
+----------
+actual_times(text)            → [(first_row_ms, last_row_ms, rows, loops), ...] per plan node
+root_actual_ms(text)          → total wall time of the plan's top node in ms
+parse_explain_analyze(text)   → PlanNode tree (operator, estimated vs actual rows, loops, times)
+self_time_ranking(root)       → [(node, self_ms), ...] slowest first
+format_ranking(root, top=20)  → printable self-time table
+folded_stacks(root)           → "frame;frame;frame <µs>" lines for flamegraph.pl / speedscope
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+__all__ = [
+    "PlanNode",
+    "actual_times",
+    "root_actual_ms",
+    "parse_explain_analyze",
+    "self_time_ranking",
+    "format_ranking",
+    "folded_stacks",
+]
+
+_NUM = r"[\d.]+(?:e[+-]?\d+)?"
+_ACTUAL_RE = re.compile(
+    rf"\(actual time=(?P<first>{_NUM})\.\.(?P<last>{_NUM})\s+rows=(?P<rows>{_NUM})\s+loops=(?P<loops>\d+)\)"
+)
+_COST_RE = re.compile(rf"\(cost=(?P<cost>{_NUM})(?:\.\.{_NUM})?\s+rows=(?P<rows>{_NUM})\)")
+_NODE_RE = re.compile(r"^(?P<indent>\s*)->\s*(?P<body>.*)$")
+_ANNOTATION_RE = re.compile(r"\s+\((?:cost=|actual time=|never executed)")
+
+
+def actual_times(text: str) -> list[tuple[float, float, float, int]]:
+    """Every "(actual time=a..b rows=r loops=n)" annotation, in plan order."""
+    return [
+        (float(m["first"]), float(m["last"]), float(m["rows"]), int(m["loops"]))
+        for m in _ACTUAL_RE.finditer(text)
+    ]
+
+
+def root_actual_ms(text: str) -> float:
+    """
+    Time spent in the top-most executed node: its last-row time multiplied
+    by its loop count. Raises ValueError when the text holds no actual times
+    (plain EXPLAIN, or a plan that was never executed).
+    """
+    for line in text.splitlines():
+        m = _ACTUAL_RE.search(line)
+        if m:
+            return float(m["last"]) * int(m["loops"])
+    raise ValueError("No '(actual time=…)' annotation found – not EXPLAIN ANALYZE output?")
+
+
+# ---------------------------------------------------------------------------- #
+# Plan tree
+# ---------------------------------------------------------------------------- #
+@dataclass
+class PlanNode:
+    operator: str
+    est_cost: float | None = None
+    est_rows: float | None = None
+    first_ms: float | None = None       # time to first row, per loop
+    last_ms: float | None = None        # time to last row, per loop
+    actual_rows: float | None = None    # rows per loop
+    loops: int = 0
+    executed: bool = True
+    children: list[PlanNode] = field(default_factory=list)
+
+    @property
+    def timed(self) -> bool:
+        return self.last_ms is not None
+
+    @property
+    def total_ms(self) -> float:
+        """Inclusive time: last-row time × loops, or the children's sum for untimed nodes (e.g. "Hash")."""
+        if self.timed:
+            return self.last_ms * self.loops
+        return sum(child.total_ms for child in self.children)
+
+    @property
+    def self_ms(self) -> float:
+        """Exclusive time; clipped at 0 because MySQL's per-loop averages are not exactly additive."""
+        return max(self.total_ms - sum(child.total_ms for child in self.children), 0.0)
+
+    def walk(self, stack: tuple[PlanNode, ...] = ()):
+        """Yield (node, ancestors) depth-first, root first."""
+        yield self, stack
+        for child in self.children:
+            yield from child.walk(stack + (self,))
+
+    def to_dict(self) -> dict:
+        return {
+            "operator": self.operator,
+            "est_cost": self.est_cost,
+            "est_rows": self.est_rows,
+            "actual_rows": self.actual_rows,
+            "loops": self.loops,
+            "first_ms": self.first_ms,
+            "last_ms": self.last_ms,
+            "total_ms": round(self.total_ms, 4),
+            "self_ms": round(self.self_ms, 4),
+            "executed": self.executed,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def _parse_node(body: str) -> PlanNode:
+    cut = _ANNOTATION_RE.search(body)
+    node = PlanNode(operator=(body[:cut.start()] if cut else body).strip())
+    if m := _COST_RE.search(body):
+        node.est_cost, node.est_rows = float(m["cost"]), float(m["rows"])
+    if m := _ACTUAL_RE.search(body):
+        node.first_ms, node.last_ms = float(m["first"]), float(m["last"])
+        node.actual_rows, node.loops = float(m["rows"]), int(m["loops"])
+    elif "(never executed)" in body:
+        node.executed = False
+    return node
+
+
+def parse_explain_analyze(text: str) -> PlanNode:
+    """
+    Build the plan tree from EXPLAIN ANALYZE (FORMAT=TREE) text. Nesting is
+    taken from the indentation of the "->" lines; continuation lines are
+    appended to the operator text. Several top-level nodes are wrapped in a
+    synthetic "plan" root.
+    """
+    roots: list[PlanNode] = []
+    stack: list[tuple[int, PlanNode]] = []
+    last: PlanNode | None = None
+
+    for line in text.splitlines():
+        m = _NODE_RE.match(line)
+        if not m:
+            if last is not None and line.strip():
+                last.operator += " " + line.strip()
+            continue
+        indent = len(m["indent"].expandtabs(4))
+        node = _parse_node(m["body"])
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        (stack[-1][1].children if stack else roots).append(node)
+        stack.append((indent, node))
+        last = node
+
+    if not roots:
+        raise ValueError("No '->' plan lines found – not EXPLAIN ANALYZE output?")
+    return roots[0] if len(roots) == 1 else PlanNode("plan", children=roots)
+
+
+def self_time_ranking(root: PlanNode) -> list[tuple[PlanNode, float]]:
+    return sorted(((node, node.self_ms) for node, _ in root.walk()), key=lambda item: -item[1])
+
+
+def format_ranking(root: PlanNode, top: int | None = 20) -> str:
+    """Self-time table, slowest node first; row counts are per loop, like MySQL's own output."""
+    total = root.total_ms or 1.0
+    lines = [
+        f"{'self ms':>10}  {'%':>5}  {'total ms':>10}  {'est rows':>10}  {'act rows':>10}  {'loops':>6}  operator",
+        f"{'-' * 10}  {'-' * 5}  {'-' * 10}  {'-' * 10}  {'-' * 10}  {'-' * 6}  --------",
+    ]
+    for node, self_ms in self_time_ranking(root)[:top]:
+        est = "" if node.est_rows is None else f"{node.est_rows:g}"
+        act = "" if node.actual_rows is None else f"{node.actual_rows:g}"
+        lines.append(
+            f"{self_ms:10.3f}  {self_ms / total:5.1%}  {node.total_ms:10.3f}  {est:>10}  {act:>10}  "
+            f"{node.loops:>6}  {node.operator}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def folded_stacks(root: PlanNode) -> str:
+    """One "root;…;node <self µs>" line per node with non-zero self time."""
+    lines = []
+    for node, ancestors in root.walk():
+        micros = round(node.self_ms * 1000)
+        if micros <= 0:
+            continue
+        frames = [n.operator.replace(";", ",") for n in (*ancestors, node)]
+        lines.append(f"{';'.join(frames)} {micros}")
+    return "\n".join(lines) + ("\n" if lines else "")
@@ -0,0 +1,158 @@
+"""
+cli.users.incremental
+=====================
+Per-object fingerprints of the create-db scripts (`db137 create-db --incremental`).
+
+Every object the scripts define gets a SHA-256 of its normalised SQL (see
+cache.normalize_sql, so comments and whitespace do not count):
+
+  TABLE      one per CREATE TABLE of install.sql
+  DATA       the rest of install.sql (lookup rows, …) as one object
+  INDEX      one per CREATE INDEX of indexing.sql, named "<table>.<index>"
+  PROCEDURE, FUNCTION, TRIGGER, VIEW, EVENT
+             the DROP … IF EXISTS / CREATE statements of each object of
+             procedures / triggers / views.sql (see cli.users.deploy);
+             helpers a script drops again (DropIndexIfExists) are left out
+
+create-db stores them in the metadata table OBJECTS_TABLE of the schema. An
+incremental run redeploys what changed, plus everything that refers to a
+changed routine or view, in script order.
+
+Public API
+----------
+SchemaObject                                          → kind, name, script, database, statements, fingerprint, needs
+OBJECTS_TABLE / OBJECTS_DDL                           → metadata table of the deployed fingerprints
+schema_objects(install, scripts, database=None)       → {(kind, name): SchemaObject} in script order
+plan_changes(objects, recorded)                       → (redeploy keys in order, removed keys)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from .cache import normalize_sql
+from .deploy import _CREATE_INDEX_RE, _USE_RE, deploy_plan
+
+__all__ = ["SchemaObject", "OBJECTS_TABLE", "OBJECTS_DDL", "schema_objects", "plan_changes"]
+
+OBJECTS_TABLE = "_db137_objects"
+OBJECTS_DDL = (
+    f"CREATE TABLE IF NOT EXISTS `{OBJECTS_TABLE}` ("
+    "kind VARCHAR(16) NOT NULL, "
+    "name VARCHAR(160) NOT NULL, "
+    "fingerprint CHAR(64) NOT NULL, "
+    "script VARCHAR(255) NOT NULL, "
+    "deployed_at DATETIME NOT NULL, "
+    "PRIMARY KEY (kind, name))"
+)
+
+_CREATE_TABLE_RE = re.compile(r"\s*CREATE\s+(?:TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?", re.I)
+_SCHEMA_ONLY_RE = re.compile(r"\s*(?:DROP\s+TABLE|(?:DROP|CREATE)\s+(?:DATABASE|SCHEMA)|USE)\b", re.I)
+_ROUTINE_KINDS = ("PROCEDURE", "FUNCTION", "TRIGGER", "VIEW", "EVENT")
+
+
+@dataclass
+class SchemaObject:
+    kind: str
+    name: str
+    script: Path
+    database: str | None = None
+    statements: list[tuple[int, str]] = field(default_factory=list)    # (line, statement)
+    needs: set[tuple[str, str]] = field(default_factory=set)            # keys of the objects it refers to
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.kind, self.name
+
+    @property
+    def fingerprint(self) -> str:
+        digest = hashlib.sha256()
+        for _, stmt in self.statements:
+            digest.update(normalize_sql(stmt).encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+
+def schema_objects(
+    install: tuple[Path, Iterable[tuple[int, str]]],
+    scripts: Iterable[tuple[Path, Iterable[tuple[int, str]]]],
+    *,
+    database: str | None = None,
+) -> dict[tuple[str, str], SchemaObject]:
+    """
+    The objects of *install* (path, statements) and of the *scripts* that
+    follow it, keyed by (kind, name) in deployment order; *database* is
+    the schema before the first USE.
+    """
+    objects: dict[tuple[str, str], SchemaObject] = {}
+    path, statements = install
+    current_db = database
+    data = SchemaObject("DATA", path.name, path, database)
+    for line, stmt in statements:
+        muse = _USE_RE.match(stmt)
+        if muse:
+            current_db = data.database = muse.group(1)
+        m = _CREATE_TABLE_RE.match(stmt)
+        if m:
+            objects[("TABLE", m.group(1))] = SchemaObject("TABLE", m.group(1), path, current_db, [(line, stmt)])
+        elif not _SCHEMA_ONLY_RE.match(stmt):
+            data.statements.append((line, stmt))
+    objects[data.key] = data
+
+    scripts = [(p, list(stmts)) for p, stmts in scripts]
+    for p, stmts in scripts:
+        current_db = database
+        for line, stmt in stmts:
+            muse = _USE_RE.match(stmt)
+            if muse:
+                current_db = muse.group(1)
+            m = _CREATE_INDEX_RE.match(stmt)
+            if m:
+                name = f"{m.group(5)}.{m.group(2)}"
+                objects[("INDEX", name)] = SchemaObject("INDEX", name, p, m.group(4) or current_db, [(line, stmt)])
+
+    # the last generation of each routine / view decides whether it exists afterwards
+    plan = [obj for obj in deploy_plan(scripts, database=database) if obj.kind in _ROUTINE_KINDS]
+    final = {(obj.kind, obj.name.lower()): obj for obj in plan}
+    by_index = {obj.index: obj for obj in final.values()}
+    for obj in final.values():
+        if not any(_is_create(stmt) for _, _, stmt in obj.members):
+            continue
+        routine = SchemaObject(obj.kind, obj.name, obj.members[0][0], obj.database,
+                               [(line, stmt) for _, line, stmt in obj.members])
+        routine.needs = {(by_index[i].kind, by_index[i].name) for i in obj.after if i in by_index}
+        objects[routine.key] = routine
+    return objects
+
+
+def _is_create(stmt: str) -> bool:
+    return stmt.lstrip()[:6].upper() == "CREATE"
+
+
+def plan_changes(
+    objects: dict[tuple[str, str], SchemaObject],
+    recorded: dict[tuple[str, str], str],
+) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """
+    Compare *objects* with the *recorded* {(kind, name): fingerprint}.
+    Returns (keys to redeploy in deployment order – new or changed
+    objects plus, transitively, the routines and views that refer to
+    one of them –, recorded keys that no longer exist).
+    """
+    changed = {key for key, obj in objects.items() if recorded.get(key) != obj.fingerprint}
+    users: dict[tuple[str, str], set[tuple[str, str]]] = {}
+    for key, obj in objects.items():
+        for need in obj.needs:
+            users.setdefault(need, set()).add(key)
+    pending = list(changed)
+    while pending:
+        for user in users.get(pending.pop(), ()):
+            if user not in changed:
+                changed.add(user)
+                pending.append(user)
+    redeploy = [key for key in objects if key in changed]
+    removed = [key for key in recorded if key not in objects]
+    return redeploy, removed
@@ -0,0 +1,66 @@
+"""
+cli.users.journal
+=================
+Checkpoint journal for long script runs (`db137 load-db --resume`).
+
+One JSON file per (script, database) under $DB137_CACHE_DIR/journals
+records how many statements of the script are committed, the source line
+of the last of them and the script's SHA-256, so a resumed run can refuse a script
+that changed since the checkpoint was written.
+
+Public API
+----------
+ScriptJournal(script, database, root=None, interval=1.0)
+ScriptJournal.load()                                → checkpoint dict or None
+ScriptJournal.checkpoint(sha256, statements, line, force=False)
+    → written at most every *interval* seconds unless forced
+ScriptJournal.clear()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .cache import _atomic_write, default_cache_dir
+
+__all__ = ["ScriptJournal"]
+
+
+class ScriptJournal:
+    def __init__(self, script: str | Path, database: str | None, root: str | Path | None = None,
+                 *, interval: float = 1.0):
+        self.script = Path(script).resolve()
+        self.database = database
+        name = hashlib.sha256(f"{self.script}\0{database}".encode("utf-8")).hexdigest()[:32]
+        self.path = Path(root or default_cache_dir()) / "journals" / f"{name}.json"
+        self._interval = interval
+        self._written = 0.0
+
+    def load(self) -> dict | None:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def checkpoint(self, sha256: str, statements: int, line: int, *, force: bool = False) -> None:
+        """Record that the first *statements* statements are committed; *line* is the last one's."""
+        now = time.monotonic()
+        if not force and now - self._written < self._interval:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.path, json.dumps({
+            "script": str(self.script),
+            "database": self.database,
+            "sha256": sha256,
+            "statements": statements,
+            "line": line,
+            "updated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, indent=2).encode("utf-8"))
+        self._written = now
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
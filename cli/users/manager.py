@@ -22,11 +22,73 @@ UserManager.list_users()
 UserManager.list_raw_users()
 UserManager.whoami()
 
+Identity cache:
+---------------
+UserManager(..., identity_ttl=300)
+    → whoami / grant lookups are cached per session for identity_ttl seconds
+      (also $DB_IDENTITY_TTL; 0 disables the cache)
+UserManager.schema_privileges(username, db, host="%")
+UserManager.invalidate_identity(username=None)
+    → Called automatically after register / rename / password change / grant / revoke / drop
+
+Connections:
+------------
+UserManager(..., pool_min=1, pool_max=8)
+    → One ConnectionPool per (user, host, port, database); also $DB_POOL_MIN / $DB_POOL_MAX
+UserManager.pool_max
+UserManager.close()
+    → Closes every pooled connection
+
 Script execution:
 -----------------
-UserManager.execute_sql_file(path, database=None)
+UserManager.execute_sql_file(path, database=None, single_session=False, batch_size=1000,
+                             coalesce_inserts=False, journal=None, resume=False, timings=None)
+    → UserManager(..., statement_cache=StatementCache()) reuses the parsed
+      statement list of unchanged files instead of re-splitting them
+    → path may be .sql.gz / .sql.xz / .sql.zst (decompressed while streaming)
+    → journal=ScriptJournal(path, database) checkpoints committed statements;
+      resume=True continues an unchanged script after its checkpoint
+    → timings=ScriptTimings() records time / rows / warnings per statement
+    → session_sql="SET SESSION …" runs on every connection of the script (own pool)
+UserManager.deploy_scripts(paths, database=., tables=(), jobs=4, timings=None)
+    → independent objects of indexing / procedures / triggers / views.sql
+      (see cli.users.deploy) deployed concurrently on up to jobs connections
+UserManager.build_indexes(indexing_sql, database=., jobs=4, timings=None)
+    → every CREATE INDEX of indexing_sql that does not exist yet, as one
+      ALTER TABLE … ADD INDEX, ADD INDEX per table, tables in parallel
+UserManager.record_schema_objects(install_sql, paths, database=.) / deploy_incremental(install_sql, paths, database=., jobs=4)
+    → per-object fingerprints (cli.users.incremental) kept in the schema; only
+      changed objects and their dependents redeployed, in dependency order
+UserManager.suspend_triggers(names, database=.) / restore_triggers(triggers_sql, names, database=., jobs=4)
+    → drop the validation triggers for a trusted load, recreate them from triggers.sql
+UserManager.validate_data(database, delete=False)
+    → set-based checks of cli.users.validation.RULES; {rule: violating rows left}
+UserManager.global_settings(settings)
+    → context manager: SET GLOBAL where permitted, previous values restored on exit
+UserManager.probe_settings(database, settings, rows=500)
+    → [(label, ms), ...] baseline, then each cli.users.profile setting alone
 UserManager.truncate_tables(database)
-UserManager.run_query_to_file(sql, out, database=.)
+UserManager.save_snapshot(database, name, jobs=4, replace=False) / restore_snapshot(name, database, jobs=4)
+    → base tables copied to / from the side database db137_snap_<name>, one table per connection
+UserManager.list_snapshots() / drop_snapshot(name)
+UserManager.export_tables(database, out_dir)
+    → One <Table>.tsv per base table (input format of bulk_load_tables)
+UserManager.bulk_load_tables(data_dir, database=., install_sql=., jobs=1, session_sql=None)
+    → LOAD DATA LOCAL INFILE in FK order; batched INSERTs when local_infile is off;
+      jobs > 1 loads each dependency level on a process pool
+UserManager.run_multi_plan_query_to_files(sql, prefix, database=., save_traces=False)
+    → save_traces=True also writes <prefix><n>_stmt<k>.trace.json + <prefix><n>_trace.txt
+UserManager.run_query_to_file(sql, out, database=., stream=False, cache=None, fingerprint="marker")
+    → stream=True fetches in batches and spools to a temp file (bounded memory)
+    → cache=ResultCache() reuses the output while the tables it reads are unchanged
+UserManager.benchmark_query_file(sql, database=., repeat=10, warmup=2, multi_plan=False)
+    → {name: {"runs", "min_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "mean_ms", "rows", "bytes"}}
+UserManager.explain_query_file(sql, database=., multi_plan=False)
+    → {name: normalised EXPLAIN FORMAT=JSON plan}
+UserManager.compare_plan_bundles(sql, database=., runs=5, warmup=1, scenarios=[(name, switches)])
+    → median EXPLAIN ANALYZE time per plan / label / optimizer_switch scenario
+UserManager.profile_sql(sql, database=.) / profile_query_file(sql, database=., multi_plan=False)
+    → parsed EXPLAIN ANALYZE PlanNode trees (see explain.format_ranking / folded_stacks)
 
 Utilities:
 ----------
@@ -37,21 +99,49 @@ parse_priv_list("FULL")          → ["ALL PRIVILEGES"]
 from __future__ import annotations
 
 import contextlib
+import csv
+import heapq
+import itertools
+import json
 import logging
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, Iterator, List, Sequence
 import os
+import pickle
+import tempfile
 import click
 import mysql.connector
 from mysql.connector import errorcode
 from mysql.connector.cursor_cext import CMySQLCursor
 
+from .bench import percentile, summarize
+from .cache import ResultCache, StatementCache, file_sha256, normalize_sql, volatility
+from .compress import is_compressed, open_text
+from .deploy import DeployObject, critical_path, deploy_plan, secondary_indexes
+from .explain import PlanNode, parse_explain_analyze, root_actual_ms
+from .incremental import OBJECTS_DDL, OBJECTS_TABLE, SchemaObject, plan_changes, schema_objects
+from .journal import ScriptJournal
+from .plans import is_query, normalize_plan, split_statements
+from .profile import SessionSetting, init_command
+from .pool import ConnectionPool
+from .snapshot import META_DDL, META_TABLE, SNAPSHOT_PREFIX, snapshot_name, snapshot_schema
+from .schema import dependency_levels, load_order, table_dependencies, trigger_dependencies
+from .splitter import SPLITTER_VERSION, iter_statements
+from .timing import ScriptTimings
+from .trace import format_trace_summary, summarize_trace
+from .validation import FIXUPS, RULES
+
 DEFAULT_DB = os.getenv("DB_NAME", "pulse_university")
 
 __all__ = ["UserManager", "parse_priv_list"]
 HOSTS = ('%', 'localhost')
 
+_USE_RE = re.compile(r"^\s*USE\s+`?(\w+)`?\s*$", re.I)
+
 def _foreach_host(fn):
     for h in HOSTS:
         fn(h)
@@ -73,6 +163,286 @@ def parse_priv_list(raw: str | Iterable[str]) -> List[str]:
         return ["ALL PRIVILEGES"]
     return cleaned
 
+# ---------------------------------------------------------------------------- #
+# Script helpers – error reporting and multi-row INSERT coalescing
+# ---------------------------------------------------------------------------- #
+# Errors after which the server has already discarded the open transaction
+_TXN_LOST_ERRNOS = {1205, 1213, 2006, 2013, 2055}
+_SETTING_DENIED_ERRNOS = {1227, 1238}       # missing SYSTEM_VARIABLES_ADMIN, read-only variable
+
+_INSERT_HEAD_RE = re.compile(
+    r"^\s*INSERT\s+INTO\s+(`?[\w.]+`?)\s*(\([^()]*\))?\s*VALUES\s*(?=\()",
+    re.I,
+)
+
+
+def _statement_error(path: Path, line: int, stmt: str, err, *, members: int = 1) -> click.ClickException:
+    where = f"line {line}" if members == 1 else f"lines {line}+ ({members} coalesced statements)"
+    exc = click.ClickException(
+        f"\nStatement failed in `{path.name}` ({where}):\n"
+        f"{stmt[:300]}...\n"
+        f"Error {err.errno}: {err.msg}"
+    )
+    exc.errno = err.errno
+    return exc
+
+
+def _tuple_end(text: str, start: int) -> int:
+    """
+    Index just past the parenthesised tuple opening at text[start],
+    honouring quoted strings ('…', "…", `…`) and backslash escapes. -1 if unbalanced.
+    """
+    depth = 0
+    quote = None
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                if i + 1 < len(text) and text[i + 1] == quote:
+                    i += 1
+                else:
+                    quote = None
+        elif ch in "'\"`":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+def _single_row_insert(stmt: str) -> tuple[tuple[str, str], str, str] | None:
+    """
+    Recognise `INSERT INTO t (cols) VALUES (…)` carrying exactly one row and
+    nothing else (no IGNORE, ON DUPLICATE KEY, SELECT …).
+    Returns ((table, columns) key, head, values tuple) or None.
+    """
+    m = _INSERT_HEAD_RE.match(stmt)
+    if not m:
+        return None
+    end = _tuple_end(stmt, m.end())
+    if end < 0 or stmt[end:].strip():
+        return None
+    table = m.group(1).strip("`").lower()
+    cols = re.sub(r"[\s`]", "", m.group(2) or "").lower()
+    head = f"INSERT INTO {m.group(1)} {m.group(2) or ''} VALUES "
+    return (table, cols), head, stmt[m.end():end]
+
+
+def _coalesce_inserts(statements: Iterable[tuple[int, str]], max_bytes: int):
+    """
+    Yield execution units (sql, [(line, statement), ...]). Consecutive
+    single-row INSERTs sharing table and column list are merged into one
+    multi-row INSERT whose encoded size stays below *max_bytes*; every other
+    statement passes through unchanged, so the overall order is preserved.
+    """
+    key = head = None
+    rows: list[str] = []
+    members: list[tuple[int, str]] = []
+    size = 0
+
+    def flush():
+        nonlocal key, head, rows, members, size
+        if members:
+            sql = members[0][1] if len(members) == 1 else head + ",\n".join(rows)
+            yield sql, members
+        key = head = None
+        rows, members, size = [], [], 0
+
+    for line, stmt in statements:
+        parsed = _single_row_insert(stmt)
+        if parsed is None:
+            yield from flush()
+            yield stmt, [(line, stmt)]
+            continue
+
+        k, h, values = parsed
+        row_bytes = len(values.encode("utf-8")) + 2
+        if k != key or size + row_bytes > max_bytes:
+            yield from flush()
+            key, head, size = k, h, len(h.encode("utf-8"))
+        rows.append(values)
+        members.append((line, stmt))
+        size += row_bytes
+
+    yield from flush()
+
+
+def _record_timing(timings: ScriptTimings, cur, path: Path, line: int, sql: str,
+                   started: float, statements: int) -> None:
+    timings.record(path.name, line, sql, (time.perf_counter() - started) * 1000,
+                   cur.rowcount, getattr(cur, "warning_count", 0), statements=statements)
+
+
+def _skip_statements(statements: Iterable[tuple[int, str]], count: int,
+                     database: str | None) -> tuple[Iterator[tuple[int, str]], str | None]:
+    """Drop the first *count* statements, keeping the schema their USE statements selected."""
+    rest = iter(statements)
+    for _, stmt in itertools.islice(rest, count):
+        muse = _USE_RE.match(stmt)
+        if muse:
+            database = muse.group(1)
+    return rest, database
+
+
+class _Checkpoints:
+    """Committed-statement counter of one script run, mirrored into a ScriptJournal."""
+
+    def __init__(self, journal: ScriptJournal, sha256: str):
+        self.journal = journal
+        self.sha256 = sha256
+        self.done = 0           # statements committed, counted from the top of the script
+        self.line = 0           # source line of the last committed statement
+        self.resumed = False    # continuing after a checkpoint of an earlier run
+
+    def advance(self, members: Sequence[tuple[int, str]]) -> None:
+        if members:
+            self.done += len(members)
+            self.line = members[-1][0]
+
+    def save(self, failure: BaseException | None = None, *, force: bool = False) -> None:
+        """Throttled checkpoint; forced (and a resume hint added) on *failure*."""
+        self.journal.checkpoint(self.sha256, self.done, self.line, force=force or failure is not None)
+        if isinstance(failure, click.ClickException):
+            failure.message += (f"\n(checkpoint: {self.done} statements committed – "
+                                "fix the cause and resume to continue from there)")
+
+
+# ---------------------------------------------------------------------------- #
+# Bulk data helpers – per-table TSV / CSV files
+# ---------------------------------------------------------------------------- #
+# local_infile disabled on the server / rejected by the client
+_LOCAL_INFILE_ERRNOS = {1148, 2068, 3948, 3950}
+
+_TSV_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"}
+_TSV_UNESCAPES = {"t": "\t", "n": "\n", "r": "\r", "0": "\0", "\\": "\\"}
+
+
+def _tsv_escape(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    text = str(value)
+    if not any(ch in text for ch in _TSV_ESCAPES):
+        return text
+    return "".join(_TSV_ESCAPES.get(ch, ch) for ch in text)
+
+
+def _tsv_unescape(field: str):
+    if field == "\\N":
+        return None
+    if "\\" not in field:
+        return field
+    return re.sub(r"\\(.)", lambda m: _TSV_UNESCAPES.get(m.group(1), m.group(1)), field)
+
+
+def _data_files(data_dir: Path) -> dict[str, Path]:
+    """{lower-case table name: file} for every .tsv / .csv in *data_dir* (TSV wins)."""
+    found: dict[str, Path] = {}
+    for path in sorted(data_dir.glob("*.csv")) + sorted(data_dir.glob("*.tsv")):
+        found[path.stem.lower()] = path
+    return found
+
+
+def _data_file_header(path: Path) -> list[str]:
+    return next(_read_data_file(path))
+
+
+def _read_data_file(path: Path):
+    """Yield the header (list of columns), then every row as a tuple with None for NULL."""
+    with path.open(encoding="utf-8", newline="") as fp:
+        if path.suffix.lower() == ".csv":
+            reader = csv.reader(fp)
+            yield [c.strip() for c in next(reader)]
+            for row in reader:
+                yield tuple(None if v in ("NULL", "\\N") else v for v in row)
+        else:
+            yield fp.readline().rstrip("\r\n").split("\t")
+            for line in fp:
+                line = line.rstrip("\r\n")
+                if line:
+                    yield tuple(_tsv_unescape(v) for v in line.split("\t"))
+
+
+
+def _load_data_infile(cnx, table: str, path: Path) -> tuple[int, int]:
+    fmt = path.suffix.lower().lstrip(".")
+    columns = _data_file_header(path)
+    cols = ", ".join(f"`{c}`" for c in columns)
+    if fmt == "csv":
+        fields = "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY ''"
+    else:
+        fields = "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'"
+    sql = (f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` CHARACTER SET utf8mb4 "
+           f"{fields} LINES TERMINATED BY '\\n' IGNORE 1 LINES ({cols})")
+
+    with cnx.cursor() as cur:
+        cur.execute(sql, (str(path.resolve()),))
+        return cur.rowcount, getattr(cur, "warning_count", 0) or 0
+
+
+def _load_data_inserts(cnx, table: str, path: Path, batch_size: int) -> tuple[int, int]:
+    rows_iter = _read_data_file(path)
+    columns = next(rows_iter)
+    sql = (f"INSERT IGNORE INTO `{table}` ({', '.join(f'`{c}`' for c in columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+    rows = warnings = 0
+    with cnx.cursor() as cur:
+        batch: list[tuple] = []
+        for row in rows_iter:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cur.executemany(sql, batch)
+                rows += cur.rowcount
+                warnings += getattr(cur, "warning_count", 0) or 0
+                batch.clear()
+        if batch:
+            cur.executemany(sql, batch)
+            rows += cur.rowcount
+            warnings += getattr(cur, "warning_count", 0) or 0
+    return rows, warnings
+
+
+def _load_table(cnx, table: str, path: Path, local_infile: bool, batch_size: int) -> tuple[int, int, str]:
+    """
+    Load one data file on *cnx* → (rows, warnings, method). LOAD DATA LOCAL
+    is tried first when *local_infile*; a rejection falls back to INSERTs.
+    """
+    if local_infile:
+        try:
+            return (*_load_data_infile(cnx, table, path), "LOAD DATA")
+        except mysql.connector.Error as err:
+            if err.errno not in _LOCAL_INFILE_ERRNOS:
+                raise click.ClickException(f"LOAD DATA into `{table}` failed: {err}")
+            click.echo(f"[WARN] LOAD DATA LOCAL rejected ({err.errno}) – falling back to batched INSERTs.")
+    try:
+        return (*_load_data_inserts(cnx, table, path, batch_size), "INSERT")
+    except mysql.connector.Error as err:
+        raise click.ClickException(f"INSERT into `{table}` failed: {err}")
+
+
+def _load_table_worker(dsn: dict, table: str, path: Path, local_infile: bool,
+                       batch_size: int) -> tuple[str, int, int, str, float]:
+    """Process-pool entry point: own connection, one table → (table, rows, warnings, method, seconds)."""
+    started = time.perf_counter()
+    try:
+        cnx = mysql.connector.connect(**dsn)
+    except mysql.connector.Error as err:
+        raise click.ClickException(f"Worker for `{table}` could not connect: {err}")
+    try:
+        rows, warnings, via = _load_table(cnx, table, path, local_infile, batch_size)
+    finally:
+        cnx.close()
+    return table, rows, warnings, via, time.perf_counter() - started
+
 # ---------------------------------------------------------------------------- #
 # Core class – manages users, privileges, and database scripts
 # ---------------------------------------------------------------------------- #
@@ -95,7 +465,9 @@ class UserManager:
         )
     }
 
-    def __init__(self, root_user, root_pass, host="127.0.0.1", port=3306):
+    def __init__(self, root_user, root_pass, host="127.0.0.1", port=3306,
+                 *, pool_min: int | None = None, pool_max: int | None = None,
+                 identity_ttl: float | None = None, statement_cache: StatementCache | None = None):
         self._user = root_user
         self._pass = root_pass
         self._log = logging.getLogger(__name__)
@@ -107,6 +479,107 @@ class UserManager:
             "autocommit": True,
             "unix_socket": None
         }
+        self._pool_min = pool_min if pool_min is not None else int(os.getenv("DB_POOL_MIN", 1))
+        self._pool_max = pool_max if pool_max is not None else int(os.getenv("DB_POOL_MAX", 8))
+        self._pools: dict[tuple, ConnectionPool] = {}
+        self._pools_lock = threading.Lock()
+        self._identity_ttl = (identity_ttl if identity_ttl is not None
+                              else float(os.getenv("DB_IDENTITY_TTL", 300)))
+        self._identity: dict[tuple, tuple[float, object]] = {}
+        self._identity_lock = threading.Lock()
+        self._statement_cache = statement_cache
+
+    # ------------------------------------------------------------------------ #
+    # 0. CONNECTIONS (pooled per user / host / port / database)
+    # ------------------------------------------------------------------------ #
+    def _params(self, database: str | None = None, **options) -> dict:
+        dsn = self._dsn.copy()
+        dsn["host"] = os.getenv("DB_HOST", dsn["host"])
+        dsn["port"] = int(os.getenv("DB_PORT", dsn["port"]))
+        if database:
+            dsn["database"] = database
+        dsn.update(options)
+        return dsn
+
+    def _pool(self, database: str | None = None, **options) -> ConnectionPool:
+        dsn = self._params(database, **options)
+        key = (dsn["user"], dsn["host"], dsn["port"], dsn.get("database"),
+               tuple(sorted(options.items())))
+        with self._pools_lock:
+            pool = self._pools.get(key)
+        if pool is not None:
+            return pool
+        # opening min_size connections must not hold up threads that need another pool
+        pool = ConnectionPool(dsn, min_size=self._pool_min, max_size=self._pool_max)
+        with self._pools_lock:
+            published = self._pools.setdefault(key, pool)
+        if published is not pool:
+            pool.close()                # another thread won the race
+        return published
+
+    @contextlib.contextmanager
+    def _connect(self, database: str | None = None, **options):
+        """
+        Borrow a health-checked connection; it is reset and returned on exit.
+        Extra connector *options* (e.g. allow_local_infile) get their own pool.
+        """
+        with self._pool(database, **options).acquire() as cnx:
+            yield cnx
+
+    @property
+    def pool_max(self) -> int:
+        """Upper bound of connections per pool (callers size thread pools with it)."""
+        return self._pool_max
+
+    def close(self) -> None:
+        """Close every pooled connection (idempotent)."""
+        with self._pools_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    # ------------------------------------------------------------------------ #
+    # 0b. IDENTITY / GRANT CACHE (per session, TTL-bound)
+    # ------------------------------------------------------------------------ #
+    def _cached(self, key: tuple, load):
+        """
+        Return the cached value for *key*, calling *load()* when it is missing
+        or older than the identity TTL (0 disables caching).
+        """
+        now = time.monotonic()
+        with self._identity_lock:
+            hit = self._identity.get(key)
+            if hit is not None and now - hit[0] < self._identity_ttl:
+                return hit[1]
+        value = load()
+        if self._identity_ttl > 0:
+            with self._identity_lock:
+                self._identity[key] = (now, value)
+        return value
+
+    def invalidate_identity(self, username: str | None = None) -> None:
+        """
+        Forget cached identity and grant lookups – everything, or only the
+        entries concerning *username* plus the connected user's own entries.
+        """
+        with self._identity_lock:
+            if username is None:
+                self._identity.clear()
+                return
+            for key in [k for k in self._identity if k[0] == "whoami" or username in k[1:]]:
+                del self._identity[key]
+
+    def schema_privileges(self, username: str, database: str, host: str = "%") -> list[str]:
+        """Privileges of `username`@`host` on *database*, sorted (cached)."""
+        def load():
+            with self._connect() as cnx, cnx.cursor() as cur:
+                cur.execute("""
+                    SELECT privilege_type
+                    FROM information_schema.schema_privileges
+                    WHERE grantee = %s AND table_schema = %s
+                """, (f"'{username}'@'{host}'", database))
+                return sorted(row[0] for row in cur.fetchall())
+        return list(self._cached(("schema_privs", username, host, database), load))
 
     # ------------------------------------------------------------------------ #
     # 1. USER ACCOUNT MANAGEMENT
@@ -143,28 +616,12 @@ class UserManager:
                             raise
 
                 cnx.commit()
+                self.invalidate_identity(username)
                 click.echo(f"[OK] Registered `{username}` with privileges on `{default_db}` for % and localhost")
 
         except mysql.connector.Error as err:
             raise click.ClickException(f"[DB Error] {err}")
 
-    @contextlib.contextmanager
-    def _connect(self, database: str | None = None):
-        dsn = self._dsn.copy()
-        dsn["host"] = os.getenv("DB_HOST", dsn["host"])
-        dsn["port"] = int(os.getenv("DB_PORT", dsn["port"]))
-        env_db = os.getenv("DB_NAME")
-        if database:
-            dsn["database"] = database
-        elif env_db:
-            dsn["database"] = env_db
-
-        cnx = mysql.connector.connect(**dsn)
-        try:
-            yield cnx
-        finally:
-            cnx.close()
-
     def drop_user(self, username: str) -> None:
         dropped = False
         for host in ('%', 'localhost'):
@@ -176,6 +633,7 @@ class UserManager:
                 if cur.fetchone()[0] > 0:
                     cur.execute(f"DROP USER `{username}`@'{host}'")
                     dropped = True
+        self.invalidate_identity(username)
 
         if not dropped:
             click.echo(f"[WARN] User `{username}` not found on '%' or 'localhost'.")
@@ -209,6 +667,7 @@ class UserManager:
                     click.echo(f"[SKIP] Could not drop {user}@{host}: {e}")
 
             cnx.commit()
+        self.invalidate_identity()
 
     def change_username(self, old: str, new: str) -> None:
         """
@@ -229,6 +688,8 @@ class UserManager:
         else:
             # Stored‑procedure path for self‑rename (unchanged)
             self._execute_sql("CALL sp_rename_self(%(new)s);", {"new": new})
+        self.invalidate_identity(old)
+        self.invalidate_identity(new)
 
     def change_password(self, username: str, new_password: str) -> None:
         current_user = self.connected_user().split("@")[0]
@@ -242,6 +703,7 @@ class UserManager:
                     f"ALTER USER %(u)s@'{host}' IDENTIFIED BY %(p)s;",
                     {"u": username, "p": new_password}
                 )
+        self.invalidate_identity(username)
 
     def list_users(self) -> list[str]:
         if not self.is_root():
@@ -267,9 +729,11 @@ class UserManager:
             return [row[0] for row in cur.fetchall()]
 
     def whoami(self) -> str:
-        with self._connect() as cnx, cnx.cursor() as cur:
-            cur.execute("SELECT CURRENT_USER();")
-            return cur.fetchone()[0]
+        def load():
+            with self._connect() as cnx, cnx.cursor() as cur:
+                cur.execute("SELECT CURRENT_USER();")
+                return cur.fetchone()[0]
+        return self._cached(("whoami",), load)
 
     # ------------------------------------------------------------------------ #
     # 2. PRIVILEGE CONTROL
@@ -313,6 +777,7 @@ class UserManager:
                 )
 
         _foreach_host(grant_for_host)
+        self.invalidate_identity(username)
 
     def revoke_privileges(
         self,
@@ -353,121 +818,1035 @@ class UserManager:
 
                 _foreach_host(revoke_for_host)
             conn.commit()
+        self.invalidate_identity(username)
 
     # ------------------------------------------------------------------------ #
     # 3. SQL FILE EXECUTION / DATA MANAGEMENT
     # ------------------------------------------------------------------------ #
-    def execute_sql_file(self, path: str | Path, *, database: str | None = None, show_progress: bool = False) -> None:
+    def execute_sql_file(
+        self,
+        path: str | Path,
+        *,
+        database: str | None = None,
+        show_progress: bool = False,
+        single_session: bool = False,
+        batch_size: int = 1000,
+        coalesce_inserts: bool = False,
+        journal: ScriptJournal | None = None,
+        resume: bool = False,
+        timings: ScriptTimings | None = None,
+        session_sql: str | None = None,
+    ) -> None:
         """
         Run every statement in a .sql file.
 
-        * Still works without DELIMITER directives.
-        * Correctly buffers CREATE {PROCEDURE|FUNCTION|TRIGGER|EVENT} bodies even
-        when they contain nested BEGIN … END blocks.
-        * Splits ordinary DDL/DML on the terminating semicolon.
+        * Statements come from a single-pass tokenizer (see cli.users.splitter):
+        quotes, backticks, comments and DELIMITER directives are understood, and
+        CREATE {PROCEDURE|FUNCTION|TRIGGER|EVENT} bodies are kept together even
+        without DELIMITER. The file is streamed, never loaded as a whole.
+        * .sql.gz / .sql.xz / .sql.zst scripts are decompressed while streaming.
         * Optionally displays a progress bar using Click.
+        * single_session=True streams the whole file through one connection:
+        USE switches the session schema in place and changes are committed every
+        *batch_size* statements (0 = once at the end) instead of per row.
+        * coalesce_inserts=True merges runs of single-row INSERTs into the same
+        table/column list into multi-row INSERTs (bounded by max_allowed_packet);
+        failures are still reported against the original source line.
+        * With a *journal*, the number of committed statements and the script's
+        SHA-256 are checkpointed: after every coalesced INSERT and every batch
+        commit with single_session, at most once per second for single
+        autocommitted statements, and on failure. resume=True skips the
+        committed statements of an unchanged script; single statements right
+        after the checkpoint that fail on a duplicate key were committed after
+        the last throttled write and are skipped too. The journal is cleared
+        once the script completed. A hard kill (SIGKILL, OOM, power loss)
+        between a coalesced INSERT or a batch commit and its journal write
+        still leaves that unit to be replayed, which fails on its duplicate keys.
+        * With *timings*, wall time, affected rows and warnings of every executed
+        unit are recorded (see cli.users.timing); one collector may span scripts.
+        * *session_sql* (e.g. cli.users.profile.init_command) is the init_command
+        of the connections the script runs on; they come from a pool of their own.
         """
-        sql_text = Path(path).read_text(encoding="utf-8")
+        path = Path(path)
+        sha256 = file_sha256(path) if journal is not None else None
+        statements = self._script_statements(path, sha256=sha256)
+
+        tracker = None
+        if journal is not None:
+            tracker = _Checkpoints(journal, sha256)
+            if resume:
+                state = journal.load()
+                if state is None:
+                    raise click.ClickException(f"No checkpoint for {path.name} on `{database}` – nothing to resume.")
+                if state["sha256"] != tracker.sha256:
+                    raise click.ClickException(
+                        f"{path.name} changed since its checkpoint of {state['updated']}; "
+                        "it cannot be resumed – reset the database and load it again.")
+                statements, database = _skip_statements(statements, state["statements"], database)
+                tracker.done, tracker.line = state["statements"], state["line"]
+                tracker.resumed = True
+                click.echo(f"[INFO] Resuming {path.name} after statement {tracker.done} (line {tracker.line}).")
+        elif resume:
+            raise ValueError("resume=True needs a journal")
+
+        # Group statements into execution units: (sql, [(line, original), ...]);
+        # everything stays lazy, so only the statement in flight is in memory
+        if coalesce_inserts:
+            max_bytes = self._max_packet_bytes(database)
+            units = _coalesce_inserts(statements, max_bytes)
+        else:
+            units = ((stmt, [(n, stmt)]) for n, stmt in statements)
+
+        options = {"init_command": session_sql} if session_sql else {}
+        if single_session:
+            self._execute_single_session(path, units, database=database, batch_size=batch_size,
+                                         show_progress=show_progress, tracker=tracker, timings=timings,
+                                         options=options)
+        else:
+            self._execute_per_statement(path, units, database=database, show_progress=show_progress,
+                                        tracker=tracker, timings=timings, options=options)
+        if journal is not None:
+            journal.clear()
 
-        # Strip /* ... */ comments (multi-line)
-        sql_text = re.sub(r"/\*.*?\*/", "\n", sql_text, flags=re.S)
+    def _execute_per_statement(
+        self,
+        path: Path,
+        units: Iterable[tuple[str, list[tuple[int, str]]]],
+        *,
+        database: str | None,
+        show_progress: bool,
+        tracker: _Checkpoints | None,
+        timings: ScriptTimings | None,
+        options: dict | None = None,
+    ) -> None:
+        """Default runner: every unit on a pooled connection, autocommitted."""
+        current_db = database
 
-        statements: list[str] = []
-        buf: list[str] = []
+        def run_unit(unit: tuple[str, list[tuple[int, str]]]):
+            nonlocal current_db
+            muse = _USE_RE.match(unit[0])
+            if muse:
+                current_db = muse.group(1)
+                return
 
-        depth = 0
-        in_routine = False
+            with self._connect(current_db, **(options or {})) as cnx, cnx.cursor() as cur:
+                self._run_unit(cur, path, unit, timings)
 
-        routine_start_re = re.compile(
-            r"^\s*CREATE\s+(?:DEFINER\s*=\s*\S+\s+)?"
-            r"(PROCEDURE|FUNCTION|TRIGGER|EVENT)\b",
-            re.I,
-        )
+        # on resume, single statements committed after the last throttled checkpoint
+        # come first; they fail on their own duplicate keys and count as done
+        replaying = tracker is not None and tracker.resumed
+        skipped = 0
+        with self._progress(path, units, show_progress) as units:
+            for unit in units:
+                try:
+                    run_unit(unit)
+                except BaseException as exc:
+                    if (replaying and len(unit[1]) == 1
+                            and getattr(exc, "errno", None) == errorcode.ER_DUP_ENTRY):
+                        tracker.advance(unit[1])
+                        skipped += 1
+                        continue
+                    if tracker is not None:
+                        # members replayed before the failing one were autocommitted
+                        done = getattr(exc, "members_done", 0)
+                        if done:
+                            tracker.advance(unit[1][:done])
+                        tracker.save(exc)
+                    raise
+                replaying = replaying and bool(_USE_RE.match(unit[0]))
+                if tracker is not None:
+                    tracker.advance(unit[1])
+                    tracker.save(force=len(unit[1]) > 1)
+        if skipped:
+            click.echo(f"[INFO] {path.name}: {skipped} statements after the checkpoint were "
+                       "already committed – skipped.")
+
+    def _script_statements(self, path: Path, *, sha256: str | None = None) -> Iterator[tuple[int, str]]:
+        """
+        (first line, statement) for *path*, through the statement cache when one
+        is set; *sha256* spares the cache hashing the file again.
+        """
+        if self._statement_cache is not None:
+            yield from self._statement_cache.load(path, iter_statements, version=SPLITTER_VERSION, sha256=sha256)
+            return
+        with open_text(path) as fp:
+            yield from iter_statements(fp)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _progress(path: Path, units: Iterable[tuple[str, list[tuple[int, str]]]], show: bool):
+        """
+        Progress bar over lazily produced units, measured in characters of
+        the script (the number of statements is unknown up front). Compressed
+        scripts have no usable size, so their bar only counts units.
+        """
+        if not show:
+            yield units
+            return
+        if is_compressed(path):
+            with click.progressbar(units, label=f"Executing {path.name}") as bar:
+                yield bar
+            return
 
-        for raw in sql_text.splitlines():
-            line = raw.rstrip()
+        with click.progressbar(length=path.stat().st_size, label=f"Executing {path.name}") as bar:
+            def advance():
+                for unit in units:
+                    yield unit
+                    bar.update(sum(len(stmt) + 1 for _, stmt in unit[1]))
+                bar.update(bar.length - bar.pos)
+            yield advance()
+
+    def _max_packet_bytes(self, database: str | None) -> int:
+        """Server max_allowed_packet minus headroom for protocol framing."""
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT @@max_allowed_packet;")
+            packet = int(cur.fetchone()[0])
+        return max(packet - 1024, 1024)
+
+    def _run_unit(self, cur, path: Path, unit: tuple[str, list[tuple[int, str]]],
+                  timings: ScriptTimings | None = None) -> None:
+        """
+        Execute one unit. If a coalesced INSERT fails, its original statements
+        are replayed one by one so the error names the offending source line.
+        The failed multi-row INSERT was rolled back as a whole, so the replay
+        leaves the same rows behind as a plain statement-by-statement run; the
+        raised error's members_done counts the members that ran before it.
+        """
+        sql, members = unit
+        try:
+            started = time.perf_counter()
+            cur.execute(sql)
+            while cur.nextset():
+                pass
+            if timings is not None:
+                _record_timing(timings, cur, path, members[0][0], sql, started, len(members))
+            return
+        except mysql.connector.Error as err:
+            if len(members) == 1 or err.errno in _TXN_LOST_ERRNOS:
+                line, stmt = members[0]
+                raise _statement_error(path, line, stmt, err, members=len(members))
 
-            if re.match(r"^\s*(--|#)", line):
+        for done, (line, stmt) in enumerate(members):
+            try:
+                started = time.perf_counter()
+                cur.execute(stmt)
+                while cur.nextset():
+                    pass
+                if timings is not None:
+                    _record_timing(timings, cur, path, line, stmt, started, 1)
+            except mysql.connector.Error as err:
+                exc = _statement_error(path, line, stmt, err)
+                exc.members_done = done
+                raise exc
+
+    def _execute_single_session(
+        self,
+        path: Path,
+        units: Iterable[tuple[str, list[tuple[int, str]]]],
+        *,
+        database: str | None,
+        batch_size: int,
+        show_progress: bool,
+        tracker: _Checkpoints | None = None,
+        timings: ScriptTimings | None = None,
+        options: dict | None = None,
+    ) -> None:
+        """
+        Streaming runner behind execute_sql_file(single_session=True).
+        One connection, explicit transactions, commit every *batch_size* statements.
+        Checkpoints are taken at commits only, so they never count rolled-back work.
+        """
+        executed = committed = round_trips = 0
+        started = time.perf_counter()
+        uncommitted: list[tuple[int, str]] = []     # statements since the last commit (tracker only)
+
+        def commit():
+            nonlocal committed
+            cnx.commit()
+            committed = executed
+            if tracker is not None:
+                tracker.advance(uncommitted)
+                tracker.save(force=True)
+                uncommitted.clear()
+
+        with self._connect(database, **(options or {})) as cnx, cnx.cursor() as cur:
+            cnx.autocommit = False
+
+            def run_all(batch: Iterable[tuple[str, list[tuple[int, str]]]]):
+                nonlocal executed, committed, round_trips
+                pending = 0
+                for unit in batch:
+                    if tracker is not None:
+                        uncommitted.extend(unit[1])
+                    muse = _USE_RE.match(unit[0])
+                    if muse:
+                        cnx.database = muse.group(1)
+                        continue
+                    try:
+                        self._run_unit(cur, path, unit, timings)
+                    except click.ClickException as exc:
+                        with contextlib.suppress(mysql.connector.Error):
+                            cnx.rollback()
+                        exc.message += (f"\n({committed} statements committed, "
+                                        f"{executed - committed} rolled back)")
+                        raise
+                    executed += len(unit[1])
+                    pending += len(unit[1])
+                    round_trips += 1
+                    if batch_size and pending >= batch_size:
+                        commit()
+                        pending = 0
+                commit()
+
+            with self._progress(path, units, show_progress) as batch:
+                try:
+                    run_all(batch)
+                except BaseException as exc:
+                    if tracker is not None:
+                        tracker.save(exc)
+                    raise
+
+        elapsed = time.perf_counter() - started
+        rate = executed / elapsed if elapsed > 0 else float("inf")
+        trips = f", {round_trips} round-trips" if round_trips != executed else ""
+        click.echo(f"[INFO] {path.name}: {executed} statements in {elapsed:.2f}s "
+                   f"({rate:,.0f} stmt/s{trips})")
+
+    def deploy_scripts(
+        self,
+        paths: Sequence[str | Path],
+        *,
+        database: str | None = None,
+        tables: Iterable[str] = (),
+        jobs: int = 4,
+        timings: ScriptTimings | None = None,
+    ) -> list[DeployObject]:
+        """
+        Deploy *paths* (run after install.sql, in this order) with up to *jobs*
+        objects in flight, each on its own pooled connection. Objects become
+        ready once their prerequisites are deployed (see cli.users.deploy);
+        among the ready ones, index DDL on the largest tables starts first so
+        the long builds overlap. *tables* lets CALL helper('<table>', …) lines
+        join that table's index object. After a failure no new object is
+        started; the ones in flight finish and the first error is raised.
+        """
+        paths = [Path(p) for p in paths]
+        objects = deploy_plan(((p, self._script_statements(p)) for p in paths),
+                              database=database, tables=tables)
+        if objects:
+            click.echo(f"[INFO] {len(objects)} objects from {len(paths)} scripts, "
+                       f"longest dependency chain {len(critical_path(objects))}.")
+            self._deploy_objects(objects, jobs=jobs, timings=timings)
+        return objects
+
+    def build_indexes(
+        self,
+        indexing_sql: str | Path,
+        *,
+        database: str | None = None,
+        jobs: int = 4,
+        timings: ScriptTimings | None = None,
+    ) -> dict[str, list[str]]:
+        """
+        Build the secondary indexes of *indexing_sql* after a load that
+        skipped it: the CREATE INDEX statements of each table become one
+        ALTER TABLE with an ADD INDEX clause per index, so InnoDB scans and
+        sorts the table once, and tables are built on up to *jobs*
+        connections, largest first. Indexes that already exist (by name) are
+        skipped, so a failed build can simply be run again; the
+        DropIndexIfExists helper of indexing.sql is not needed and not
+        created. Returns {table: [index, ...]} of what was built.
+        """
+        path = Path(indexing_sql)
+        indexes = secondary_indexes(self._script_statements(path), database=database)
+        schemas = {schema for schema, _ in indexes if schema}
+        existing: set[tuple[str, str, str]] = set()
+        if schemas:
+            with self._connect() as cnx, cnx.cursor() as cur:
+                cur.execute(
+                    "SELECT DISTINCT TABLE_SCHEMA, TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS "
+                    f"WHERE TABLE_SCHEMA IN ({', '.join(['%s'] * len(schemas))});",
+                    tuple(schemas),
+                )
+                existing = {tuple(v.lower() for v in row) for row in cur.fetchall()}
+
+        objects: list[DeployObject] = []
+        built: dict[str, list[str]] = {}
+        for (schema, table), defs in indexes.items():
+            missing = [(line, name, clause) for line, name, clause in defs
+                       if ((schema or "").lower(), table.lower(), name.lower()) not in existing]
+            if not missing:
                 continue
+            sql = f"ALTER TABLE `{table}` " + ", ".join(clause for _, _, clause in missing)
+            objects.append(DeployObject(len(objects), "TABLE", table, schema, [(path, missing[0][0], sql)]))
+            built[table] = [name for _, name, _ in missing]
+
+        skipped = sum(map(len, indexes.values())) - sum(map(len, built.values()))
+        click.echo(f"[INFO] Building {sum(map(len, built.values()))} indexes on {len(objects)} tables"
+                   + (f" ({skipped} already exist)" if skipped else "") + ".")
+        if objects:
+            self._deploy_objects(objects, jobs=jobs, timings=timings)
+        return built
+
+    def record_schema_objects(
+        self,
+        install_sql: str | Path,
+        paths: Sequence[str | Path],
+        *,
+        database: str,
+    ) -> int:
+        """
+        Store the fingerprint of every object of *install_sql* and *paths*
+        (see cli.users.incremental) in the metadata table of *database*,
+        replacing what was recorded – the state the next create-db
+        --incremental compares against. Returns the number of objects.
+        """
+        objects = self._schema_objects(install_sql, paths, database=database)
+        self._write_fingerprints(database, objects.values(), clear=True)
+        return len(objects)
 
-            if not in_routine and routine_start_re.match(line):
-                in_routine = True
-                depth = 0
-
-            buf.append(line)
-
-            if in_routine:
-                if re.search(r"\bBEGIN\b", line, re.I):
-                    depth += 1
-                if re.search(r"\bEND\s*;\s*$", line, re.I):
-                    depth -= 1
-                    if depth == 0:
-                        statements.append("\n".join(buf).strip())
-                        buf.clear()
-                        in_routine = False
+    def recorded_objects(self, database: str) -> dict[tuple[str, str], str] | None:
+        """{(kind, name): fingerprint} recorded in *database*; None when it has no metadata table."""
+        with self._connect() as cnx, cnx.cursor() as cur:
+            try:
+                cur.execute(f"SELECT kind, name, fingerprint FROM `{database}`.`{OBJECTS_TABLE}`;")
+            except mysql.connector.Error as err:
+                if err.errno in (errorcode.ER_BAD_DB_ERROR, errorcode.ER_NO_SUCH_TABLE):
+                    return None
+                raise
+            return {(kind, name): fingerprint for kind, name, fingerprint in cur.fetchall()}
+
+    def deploy_incremental(
+        self,
+        install_sql: str | Path,
+        paths: Sequence[str | Path],
+        *,
+        database: str,
+        jobs: int = 4,
+        timings: ScriptTimings | None = None,
+    ) -> tuple[list[str], list[str]] | None:
+        """
+        Bring *database* up to date with the create-db scripts by redeploying
+        only the objects whose fingerprint differs from the recorded one,
+        plus the routines and views that refer to them, on up to *jobs*
+        connections in dependency order. Changed indexes of a table are
+        rebuilt by one ALTER TABLE, objects gone from the scripts are
+        dropped and new tables created. A changed or removed table (or other
+        changed install.sql statements) cannot be applied without losing
+        rows and raises instead. Returns the (redeployed, dropped) labels, or
+        None when *database* has no recorded fingerprints.
+        """
+        recorded = self.recorded_objects(database)
+        if recorded is None:
+            return None
+        objects = self._schema_objects(install_sql, paths, database=database)
+        redeploy, removed = plan_changes(objects, recorded)
+        blocked = [f"{kind} {name}" for kind, name in redeploy
+                   if kind == "DATA" or (kind == "TABLE" and (kind, name) in recorded)]
+        blocked += [f"{kind} {name}" for kind, name in removed if kind in ("TABLE", "DATA")]
+        if blocked:
+            raise click.ClickException(
+                f"install.sql changed since the last create-db ({', '.join(blocked)}); applying it would drop "
+                "rows. Run create-db without --incremental (and load-db) instead."
+            )
+
+        # new tables one after the other, in install.sql order (foreign keys)
+        deploy: list[DeployObject] = []
+        for key in redeploy:
+            obj = objects[key]
+            if obj.kind == "TABLE":
+                deploy.append(DeployObject(len(deploy), "TABLE", obj.name, obj.database or database,
+                                           [(obj.script, line, stmt) for line, stmt in obj.statements],
+                                           after={len(deploy) - 1} if deploy else set()))
+        created = set(range(len(deploy)))
+
+        # changed, new and removed indexes: one ALTER TABLE per table
+        index_keys = [key for key in [*redeploy, *removed] if key[0] == "INDEX"]
+        if index_keys:
+            with self._connect() as cnx, cnx.cursor() as cur:
+                cur.execute("SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS "
+                            "WHERE TABLE_SCHEMA = %s;", (database,))
+                existing = {(table.lower(), name.lower()) for table, name in cur.fetchall()}
+            clauses: dict[str, list[str]] = {}
+            for key in index_keys:
+                table, name = key[1].split(".", 1)
+                if (table.lower(), name.lower()) in existing:
+                    clauses.setdefault(table, []).append(f"DROP INDEX `{name}`")
+                if key in objects:
+                    obj = objects[key]
+                    for defs in secondary_indexes(obj.statements, database=obj.database).values():
+                        clauses.setdefault(table, []).extend(clause for _, _, clause in defs)
+            for table, parts in clauses.items():
+                path = Path(f"{database}.{OBJECTS_TABLE}")
+                deploy.append(DeployObject(len(deploy), "TABLE", table, database,
+                                           [(path, 1, f"ALTER TABLE `{table}` " + ", ".join(parts))],
+                                           after=set(created)))
+
+        # routines and views: their DROP … IF EXISTS / CREATE statements, after what they refer to
+        position: dict[tuple[str, str], int] = {}
+        for key in redeploy:
+            obj = objects[key]
+            if obj.kind in ("TABLE", "INDEX"):
                 continue
+            position[key] = len(deploy)
+            deploy.append(DeployObject(len(deploy), obj.kind, obj.name, obj.database or database,
+                                       [(obj.script, line, stmt) for line, stmt in obj.statements],
+                                       after={position[need] for need in obj.needs if need in position} | created))
+        for kind, name in removed:
+            if kind != "INDEX":
+                deploy.append(DeployObject(len(deploy), kind, name, database, [
+                    (Path(f"{database}.{OBJECTS_TABLE}"), 1, f"DROP {kind} IF EXISTS `{name}`;"),
+                ]))
+
+        # forget the fingerprints first: after a failure the next run retries these objects
+        self._write_fingerprints(database, (), forget=[*redeploy, *removed])
+        if deploy:
+            self._deploy_objects(deploy, jobs=jobs, timings=timings)
+        self._write_fingerprints(database, (objects[key] for key in redeploy))
+        return [f"{kind} {name}" for kind, name in redeploy], [f"{kind} {name}" for kind, name in removed]
+
+    def _schema_objects(self, install_sql: str | Path, paths: Sequence[str | Path], *,
+                        database: str) -> dict[tuple[str, str], SchemaObject]:
+        install_sql = Path(install_sql)
+        return schema_objects((install_sql, self._script_statements(install_sql)),
+                              [(Path(p), self._script_statements(Path(p))) for p in paths], database=database)
+
+    def _write_fingerprints(self, database: str, objects: Iterable[SchemaObject], *,
+                            forget: Iterable[tuple[str, str]] = (), clear: bool = False) -> None:
+        """Upsert *objects* into the metadata table of *database* after deleting *forget* (or all rows)."""
+        rows = [(obj.kind, obj.name, obj.fingerprint, obj.script.name) for obj in objects]
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute(OBJECTS_DDL)
+            if clear:
+                cur.execute(f"DELETE FROM `{OBJECTS_TABLE}`;")
+            for kind, name in forget:
+                cur.execute(f"DELETE FROM `{OBJECTS_TABLE}` WHERE kind = %s AND name = %s;", (kind, name))
+            if rows:
+                cur.executemany(f"REPLACE INTO `{OBJECTS_TABLE}` (kind, name, fingerprint, script, deployed_at) "
+                                "VALUES (%s, %s, %s, %s, NOW());", rows)
+            cnx.commit()
 
-            if line.endswith(";"):
-                buf[-1] = buf[-1][:-1]
-                statements.append("\n".join(buf).strip())
-                buf.clear()
+    def suspend_triggers(self, names: Iterable[str], *, database: str) -> list[str]:
+        """
+        Drop the triggers *names* of *database* that exist (a trusted load
+        runs without them). Returns the ones dropped; restore_triggers puts
+        them back.
+        """
+        wanted = {name.lower() for name in names}
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = %s;",
+                        (database,))
+            dropped = [name for (name,) in cur.fetchall() if name.lower() in wanted]
+            for name in dropped:
+                cur.execute(f"DROP TRIGGER IF EXISTS `{name}`;")
+        return dropped
+
+    def restore_triggers(
+        self,
+        triggers_sql: str | Path,
+        names: Iterable[str],
+        *,
+        database: str,
+        jobs: int = 4,
+        timings: ScriptTimings | None = None,
+    ) -> int:
+        """
+        Re-run the DROP / CREATE statements of *triggers_sql* that belong to
+        the triggers *names*, on up to *jobs* connections. The procedures
+        and functions they call are still deployed, so only the trigger
+        objects are taken from the plan. Returns the number of triggers.
+        """
+        path = Path(triggers_sql)
+        wanted = {name.lower() for name in names}
+        selected = [obj for obj in deploy_plan([(path, self._script_statements(path))], database=database)
+                    if obj.kind == "TRIGGER" and obj.name.lower() in wanted]
+        objects = [DeployObject(i, obj.kind, obj.name, obj.database, obj.members)
+                   for i, obj in enumerate(selected)]
+        if objects:
+            self._deploy_objects(objects, jobs=jobs, timings=timings)
+        return len(objects)
+
+    def validate_data(self, database: str, *, delete: bool = False, sample: int = 5) -> dict[str, int]:
+        """
+        Run every rule of cli.users.validation.RULES once over *database*
+        and report the violating rows (with up to *sample* keys each). With
+        *delete*, each rule's violators are removed as the trigger would
+        have rejected them – ON DELETE CASCADE takes their dependent rows
+        along – before the next rule runs; rows a RESTRICT foreign key
+        protects are kept and reported. The FIXUPS are applied last.
+        Returns {rule: violating rows left} for the rules that have any.
+        """
+        started = time.perf_counter()
+        left: dict[str, int] = {}
+        removed = 0
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            for rule in RULES:
+                cur.execute(rule.sql)
+                keys = cur.fetchall()
+                if rule.replay is not None:
+                    keys = rule.replay(keys)
+                if not keys:
+                    continue
+                shown = ", ".join("/".join(str(v) for v in key) for key in keys[:sample])
+                more = f", … {len(keys) - sample} more" if len(keys) > sample else ""
+                click.echo(f"[WARN] {rule.name} ({rule.table}): {len(keys)} rows violate it "
+                           f"[{'/'.join(rule.keys)} = {shown}{more}]")
+                if not delete:
+                    left[rule.name] = len(keys)
+                    continue
+                try:
+                    removed += self._delete_rows(cur, rule.table, rule.keys, keys)
+                    cnx.commit()
+                except mysql.connector.Error as err:
+                    cnx.rollback()
+                    click.echo(f"[WARN] {rule.name}: violating rows kept ({err.msg}).")
+                    left[rule.name] = len(keys)
+            for _, sql in FIXUPS:
+                cur.execute(sql)
+            cnx.commit()
 
-        if buf:
-            statements.append("\n".join(buf).strip())
+        verdict = (f"{sum(left.values())} violating rows left" if left else "no violations left" if removed
+                   else "no violations")
+        click.echo(f"[INFO] {len(RULES)} validation rules in {time.perf_counter() - started:.2f}s: "
+                   + (f"{removed} violating rows removed, " if removed else "") + f"{verdict}.")
+        return left
+
+    @staticmethod
+    def _delete_rows(cur, table: str, columns: Sequence[str], keys: Sequence[tuple], batch: int = 1000) -> int:
+        """DELETE the rows of *table* whose *columns* match one of *keys*, *batch* keys per statement."""
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        target = "(" + ", ".join(f"`{c}`" for c in columns) + ")"
+        deleted = 0
+        for i in range(0, len(keys), batch):
+            chunk = keys[i:i + batch]
+            cur.execute(f"DELETE FROM `{table}` WHERE {target} IN ({', '.join([row] * len(chunk))});",
+                        tuple(itertools.chain.from_iterable(chunk)))
+            deleted += max(cur.rowcount, 0)
+        return deleted
+
+    def _deploy_objects(self, objects: list[DeployObject], *, jobs: int,
+                        timings: ScriptTimings | None) -> None:
+        """
+        Scheduler behind deploy_scripts / build_indexes: ready objects run on
+        up to *jobs* pooled connections, the largest tables' DDL first.
+        """
+        self._weigh_tables(objects)
+        waiting = {obj.index: set(obj.after) for obj in objects}
+        dependents: dict[int, list[int]] = {}
+        for obj in objects:
+            for i in obj.after:
+                dependents.setdefault(i, []).append(obj.index)
+        ready = [(-obj.weight, obj.index) for obj in objects if not obj.after]
+        heapq.heapify(ready)
+
+        workers = max(min(jobs, self.pool_max), 1)
+        if workers < jobs:
+            click.echo(f"[INFO] --jobs {jobs} capped at the pool size ({workers} connections).")
+        started = time.perf_counter()
+        deployed = 0
+        failed: click.ClickException | None = None
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deploy") as pool:
+            running: dict = {}
+            while ready or running:
+                while ready and failed is None and len(running) < workers:
+                    _, i = heapq.heappop(ready)
+                    running[pool.submit(self._deploy_object, objects[i], timings)] = i
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = running.pop(fut)
+                    try:
+                        fut.result()
+                    except click.ClickException as exc:
+                        failed = failed or exc
+                        continue
+                    deployed += 1
+                    for j in dependents.get(i, ()):
+                        waiting[j].discard(i)
+                        if not waiting[j]:
+                            heapq.heappush(ready, (-objects[j].weight, j))
+
+        if failed is not None:
+            failed.message += f"\n({deployed} of {len(objects)} objects deployed before the failure)"
+            raise failed
+        click.echo(f"[INFO] {deployed} objects deployed on {workers} connections "
+                   f"in {time.perf_counter() - started:.2f}s.")
+
+    def _deploy_object(self, obj: DeployObject, timings: ScriptTimings | None) -> None:
+        """Run the statements of one object in order on one pooled connection."""
+        with self._connect(obj.database) as cnx, cnx.cursor() as cur:
+            for path, line, stmt in obj.members:
+                self._run_unit(cur, path, (stmt, [(line, stmt)]), timings)
+
+    def _weigh_tables(self, objects: list[DeployObject]) -> None:
+        """Table size (data + indexes) as the priority of each table's index DDL."""
+        schemas = {obj.database for obj in objects if obj.kind == "TABLE" and obj.database}
+        if not schemas:
+            return
+        with self._connect() as cnx, cnx.cursor() as cur:
+            cur.execute(
+                "SELECT TABLE_SCHEMA, TABLE_NAME, COALESCE(DATA_LENGTH, 0) + COALESCE(INDEX_LENGTH, 0) "
+                "FROM information_schema.TABLES "
+                f"WHERE TABLE_SCHEMA IN ({', '.join(['%s'] * len(schemas))});",
+                tuple(schemas),
+            )
+            sizes = {(schema.lower(), table.lower()): int(size) for schema, table, size in cur.fetchall()}
+        for obj in objects:
+            if obj.kind == "TABLE" and obj.database:
+                obj.weight = sizes.get((obj.database.lower(), obj.name.lower()), obj.weight)
 
-        # Execute statements (with optional progress bar)
-        current_db = database
+    @contextlib.contextmanager
+    def global_settings(self, settings: Iterable[SessionSetting], *, quiet: bool = False):
+        """
+        SET GLOBAL each of the GLOBAL *settings* the account may change and
+        yield the applied ones; on exit every applied variable gets its
+        previous value back. Refused settings are skipped (with a note
+        unless *quiet*), other errors propagate.
+        """
+        applied: list[tuple[SessionSetting, object]] = []
+        with self._connect() as cnx, cnx.cursor() as cur:
+            for setting in settings:
+                if setting.scope != "GLOBAL":
+                    continue
+                cur.execute(f"SELECT @@GLOBAL.{setting.name};")
+                previous = cur.fetchone()[0]
+                try:
+                    cur.execute(f"SET GLOBAL {setting.label};")
+                except mysql.connector.Error as err:
+                    if err.errno not in _SETTING_DENIED_ERRNOS:
+                        raise click.ClickException(f"SET GLOBAL {setting.label} failed: {err}")
+                    if not quiet:
+                        click.echo(f"[INFO] {setting.name} left unchanged ({err.msg}).")
+                    continue
+                applied.append((setting, previous))
+        try:
+            yield [setting for setting, _ in applied]
+        finally:
+            if applied:
+                with self._connect() as cnx, cnx.cursor() as cur:
+                    for setting, previous in reversed(applied):
+                        cur.execute(f"SET GLOBAL {setting.name} = %s;", (previous,))
 
-        def run_statement(stmt: str):
-            nonlocal current_db
-            muse = re.match(r"^\s*USE\s+`?(\w+)`?\s*$", stmt, re.I)
-            if muse:
-                current_db = muse.group(1)
-                return
+    def probe_settings(self, database: str, settings: Sequence[SessionSetting], *,
+                       rows: int = 500) -> list[tuple[str, float]]:
+        """
+        Measure each of *settings* on its own: *rows* autocommitted
+        single-row INSERTs (the shape of load.sql) into a scratch table with
+        a UNIQUE key and a FOREIGN KEY, first with the current settings, then
+        once per setting. Returns [(label, ms), ...], baseline first; GLOBAL
+        settings the account may not change are left out. The scratch
+        tables are dropped again.
+        """
+        parent, child = "_db137_probe_parent", "_db137_probe_child"
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS `{child}`, `{parent}`;")
+            cur.execute(f"CREATE TABLE `{parent}` (id INT PRIMARY KEY) ENGINE=InnoDB;")
+            cur.execute(f"CREATE TABLE `{child}` (id INT AUTO_INCREMENT PRIMARY KEY, parent_id INT NOT NULL, "
+                        f"code CHAR(13) NOT NULL, UNIQUE KEY (code), "
+                        f"FOREIGN KEY (parent_id) REFERENCES `{parent}` (id)) ENGINE=InnoDB;")
+            cur.execute(f"INSERT INTO `{parent}` VALUES " + ", ".join(f"({i})" for i in range(100)) + ";")
+
+        def run(session_sql: str | None = None) -> float:
+            options = {"init_command": session_sql} if session_sql else {}
+            with self._connect(database, **options) as cnx, cnx.cursor() as cur:
+                cur.execute(f"DELETE FROM `{child}`;")
+                started = time.perf_counter()
+                for i in range(rows):
+                    cur.execute(f"INSERT INTO `{child}` (parent_id, code) VALUES (%s, %s);",
+                                (i % 100, f"{i:013d}"))
+                return (time.perf_counter() - started) * 1000
+
+        results = []
+        try:
+            results.append(("baseline", run()))
+            for setting in settings:
+                if setting.scope != "GLOBAL":
+                    results.append((setting.label, run(init_command([setting]))))
+                    continue
+                with self.global_settings([setting], quiet=True) as applied:
+                    if applied:
+                        results.append((setting.label, run()))
+        finally:
+            with self._connect(database) as cnx, cnx.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS `{child}`, `{parent}`;")
+        return results
 
-            params = self._dsn.copy()
-            params["autocommit"] = True
-            if current_db:
-                params["database"] = current_db
+    # ------------------------------------------------------------------------ #
+    # 4. BULK DATA FILES (one TSV / CSV per table)
+    # ------------------------------------------------------------------------ #
+    def export_tables(self, database: str, out_dir: str | Path, *, batch_size: int = 5000) -> dict[str, int]:
+        """
+        Dump every base table of *database* (but the create-db fingerprints) to <out_dir>/<Table>.tsv
+        (header row, MySQL escaping, \\N for NULL) – the input format of
+        bulk_load_tables(). Returns {table: rows}.
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        counts: dict[str, int] = {}
 
-            try:
-                with mysql.connector.connect(**params) as cnx, cnx.cursor() as cur:
-                    cur.execute(stmt)
-                    while cur.nextset():
-                        pass
-            except mysql.connector.Error as err:
-                raise click.ClickException(
-                    f"\nStatement failed in `{Path(path).name}`:\n"
-                    f"{stmt[:300]}...\n"
-                    f"Error {err.errno}: {err.msg}"
-                )
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE';")
+            tables = [row[0] for row in cur.fetchall() if row[0] != OBJECTS_TABLE]
 
-        if show_progress:
-            with click.progressbar(statements, label=f"Executing {path.name}") as bar:
-                for stmt in bar:
-                    run_statement(stmt)
-        else:
-            for stmt in statements:
-                run_statement(stmt)
+            for tbl in tables:
+                cur.execute(f"SELECT * FROM `{tbl}`;")
+                columns = [desc[0] for desc in cur.description]
+                rows = 0
+                with (out_dir / f"{tbl}.tsv").open("w", encoding="utf-8", newline="\n") as fp:
+                    fp.write("\t".join(columns) + "\n")
+                    while batch := cur.fetchmany(batch_size):
+                        fp.writelines("\t".join(_tsv_escape(v) for v in row) + "\n" for row in batch)
+                        rows += len(batch)
+                counts[tbl] = rows
+                click.echo(f"[OK] {tbl:<24} {rows:>8} rows → {tbl}.tsv")
+        return counts
+
+    def bulk_load_tables(
+        self,
+        data_dir: str | Path,
+        *,
+        database: str,
+        install_sql: str | Path,
+        batch_size: int = 1000,
+        jobs: int = 1,
+        session_sql: str | None = None,
+    ) -> dict[str, int]:
+        """
+        Load <data_dir>/<Table>.tsv|.csv files with LOAD DATA LOCAL INFILE,
+        parents first (FK order read from install.sql). Target tables are
+        emptied first, children before parents. When the server has
+        local_infile disabled the same files are replayed as batched
+        INSERT IGNORE statements, which skip duplicate keys just like
+        LOAD DATA LOCAL does. Returns {table: rows}.
+
+        With *jobs* > 1 tables are loaded by dependency level on a process
+        pool. Besides foreign keys, tables linked by a trigger in the
+        triggers.sql next to *install_sql* keep their install.sql order,
+        since those triggers read or write the other table. *session_sql* is
+        the init_command of every loading connection (see execute_sql_file).
+        """
+        data_dir = Path(data_dir)
+        install_sql = Path(install_sql)
+        deps = table_dependencies(install_sql.read_text(encoding="utf-8"))
+        order = load_order(deps)
+        triggers_sql = install_sql.with_name("triggers.sql")
+        if triggers_sql.exists():
+            for tbl, refs in trigger_dependencies(triggers_sql.read_text(encoding="utf-8"), order).items():
+                deps[tbl] |= refs
+
+        files = _data_files(data_dir)
+        plan = [(tbl, files.pop(tbl.lower())) for tbl in order if tbl.lower() in files]
+        for leftover in files.values():
+            click.echo(f"[WARN] {leftover.name}: no matching table in install.sql, skipped.")
+        if not plan:
+            raise click.ClickException(f"No <Table>.tsv / <Table>.csv files found in {data_dir}.")
+
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT @@GLOBAL.local_infile;")
+            local_infile = bool(int(cur.fetchone()[0]))
+            for tbl, _ in reversed(plan):
+                cur.execute(f"DELETE FROM `{tbl}`;")
+
+        if not local_infile:
+            click.echo("[WARN] local_infile is disabled on the server – falling back to batched INSERTs.")
+
+        counts: dict[str, int] = {}
+
+        def report(tbl: str, rows: int, warnings: int, via: str, elapsed: float) -> None:
+            rate = rows / elapsed if elapsed > 0 else float("inf")
+            note = f", {warnings} warnings" if warnings else ""
+            click.echo(f"[OK] {tbl:<24} {rows:>8} rows in {elapsed:6.2f}s "
+                       f"({rate:>10,.0f} rows/s, {via}{note})")
+            counts[tbl] = rows
+
+        options = {"init_command": session_sql} if session_sql else {}
+        if jobs > 1:
+            self._bulk_load_parallel(plan, deps, database=database, jobs=jobs, local_infile=local_infile,
+                                     batch_size=batch_size, report=report, options=options)
+            return counts
+
+        with self._connect(database, allow_local_infile=True, **options) as cnx:
+            for tbl, path in plan:
+                started = time.perf_counter()
+                rows, warnings, via = _load_table(cnx, tbl, path, local_infile, batch_size)
+                if local_infile and via != "LOAD DATA":
+                    local_infile = False
+                report(tbl, rows, warnings, via, time.perf_counter() - started)
+        return counts
+
+    def _bulk_load_parallel(self, plan, deps, *, database, jobs, local_infile, batch_size, report,
+                            options=None) -> None:
+        """
+        Load *plan* level by level: every table of a level only depends on
+        tables of earlier levels, so a level is spread over *jobs* worker
+        processes (one connection each) and must finish before the next starts.
+        """
+        paths = dict(plan)
+        levels = dependency_levels({t: deps.get(t, set()) & paths.keys() for t in paths})
+        dsn = self._params(database, allow_local_infile=True, **(options or {}))
+
+        with ProcessPoolExecutor(max_workers=min(jobs, max(map(len, levels)))) as pool:
+            for depth, level in enumerate(levels):
+                click.echo(f"[INFO] level {depth}: {', '.join(level)}")
+                futures = [pool.submit(_load_table_worker, dsn, tbl, paths[tbl], local_infile, batch_size)
+                           for tbl in level]
+                failed = None
+                for fut in as_completed(futures):
+                    try:
+                        tbl, rows, warnings, via, elapsed = fut.result()
+                    except click.ClickException as exc:
+                        failed = failed or exc
+                        continue
+                    local_infile = local_infile and via == "LOAD DATA"
+                    report(tbl, rows, warnings, via, elapsed)
+                if failed:
+                    raise failed
 
     def truncate_tables(self, database: str) -> None:
         """
-        Truncates all base tables in the schema.
+        Truncates all base tables in the schema (the create-db fingerprints are kept).
         WARNING: FOREIGN_KEY_CHECKS are disabled temporarily – do not use on production data!
         Logs number of tables truncated.
         """
-        params = self._dsn.copy()
-        params["database"] = database
-        with mysql.connector.connect(**params) as cnx, cnx.cursor() as cur:
+        with self._connect(database) as cnx, cnx.cursor() as cur:
             cur.execute("SET FOREIGN_KEY_CHECKS = 0;")
             cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE';")
-            tables = [row[0] for row in cur.fetchall()]
+            tables = [row[0] for row in cur.fetchall() if row[0] != OBJECTS_TABLE]
             for tbl in tables:
                 cur.execute(f"TRUNCATE TABLE `{tbl}`;")
             cur.execute("SET FOREIGN_KEY_CHECKS = 1;")
             cnx.commit()
             print(f"[INFO] Truncated {len(tables)} tables in `{database}`")  # Simple stdout logging
 
+    def save_snapshot(self, database: str, name: str, *, jobs: int = 4, replace: bool = False,
+                      install_sha256: str | None = None) -> list[str]:
+        """
+        Copy every base table of *database* into the snapshot schema of
+        *name* (see cli.users.snapshot), up to *jobs* tables at once, and
+        record the source, time and *install_sha256* in its metadata table.
+        An existing snapshot is only overwritten with *replace*. Returns the
+        copied tables.
+        """
+        schema = self._snapshot_schema(name)
+        if self._schema_exists(schema):
+            if not replace:
+                raise click.ClickException(f"Snapshot {name!r} already exists (use --replace to overwrite it).")
+            self._execute_sql(f"DROP DATABASE `{schema}`;")
+        self._create_schema_like(database, schema)
+        try:
+            tables, size = self._copy_tables(database, schema, jobs=jobs)
+            with self._connect(schema) as cnx, cnx.cursor() as cur:
+                cur.execute(META_DDL)
+                cur.execute(f"INSERT INTO `{META_TABLE}` VALUES (%s, NOW(), %s, %s, %s);",
+                            (database, install_sha256, len(tables), size))
+        except BaseException:
+            # a half-written snapshot must not be restored later
+            with contextlib.suppress(mysql.connector.Error):
+                self._execute_sql(f"DROP DATABASE IF EXISTS `{schema}`;")
+            raise
+        return tables
+
+    def restore_snapshot(self, name: str, database: str, *, jobs: int = 4) -> dict:
+        """
+        Recreate *database* with the tables and rows of snapshot *name*, up
+        to *jobs* tables at once. The schema is dropped first; procedures,
+        triggers and views are left to the caller (create-db's scripts).
+        Returns the snapshot's metadata row as a dict.
+        """
+        schema = self._snapshot_schema(name)
+        if not self._schema_exists(schema):
+            raise click.ClickException(f"No snapshot named {name!r} (see `db137 snapshot list`).")
+        if snapshot_name(database) is not None:
+            raise click.ClickException(f"`{database}` is a snapshot schema; restore into another database.")
+        meta = self._snapshot_meta(schema)
+        self._execute_sql(f"DROP DATABASE IF EXISTS `{database}`;")
+        self._create_schema_like(schema, database)
+        self._copy_tables(schema, database, jobs=jobs, skip=(META_TABLE,))
+        return meta
+
+    def list_snapshots(self) -> list[dict]:
+        """Metadata of every snapshot schema, oldest first ({"name", "source", "saved_at", ...})."""
+        with self._connect() as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT SCHEMA_NAME FROM information_schema.SCHEMATA WHERE SCHEMA_NAME LIKE %s;",
+                        (SNAPSHOT_PREFIX.replace("_", r"\_") + "%",))
+            schemas = [row[0] for row in cur.fetchall()]
+        snapshots = [{"name": snapshot_name(schema), **self._snapshot_meta(schema)} for schema in schemas]
+        return sorted(snapshots, key=lambda snap: str(snap.get("saved_at") or ""))
+
+    def drop_snapshot(self, name: str) -> None:
+        schema = self._snapshot_schema(name)
+        if not self._schema_exists(schema):
+            raise click.ClickException(f"No snapshot named {name!r}.")
+        self._execute_sql(f"DROP DATABASE `{schema}`;")
+
+    @staticmethod
+    def _snapshot_schema(name: str) -> str:
+        try:
+            return snapshot_schema(name)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+
+    def _schema_exists(self, schema: str) -> bool:
+        with self._connect() as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT 1 FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = %s;", (schema,))
+            return cur.fetchone() is not None
+
+    def _snapshot_meta(self, schema: str) -> dict:
+        """The metadata row of a snapshot schema ({} when it has none)."""
+        with self._connect(schema) as cnx, cnx.cursor() as cur:
+            try:
+                cur.execute(f"SELECT source, saved_at, install_sha256, tables, bytes FROM `{META_TABLE}`;")
+            except mysql.connector.Error:
+                return {}
+            row = cur.fetchone()
+        return dict(zip(("source", "saved_at", "install_sha256", "tables", "bytes"), row)) if row else {}
+
+    def _create_schema_like(self, source: str, target: str) -> None:
+        """CREATE DATABASE *target* with the character set and collation of *source*."""
+        with self._connect() as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT DEFAULT_CHARACTER_SET_NAME, DEFAULT_COLLATION_NAME "
+                        "FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = %s;", (source,))
+            row = cur.fetchone()
+            if row is None:
+                raise click.ClickException(f"Schema `{source}` does not exist.")
+            cur.execute(f"CREATE DATABASE `{target}` CHARACTER SET {row[0]} COLLATE {row[1]};")
+
+    def _copy_tables(self, source: str, target: str, *, jobs: int,
+                     skip: Iterable[str] = ()) -> tuple[list[str], int]:
+        """
+        Copy the base tables of *source* into the existing schema *target*:
+        SHOW CREATE TABLE run inside *target* (unlike CREATE TABLE … LIKE it
+        keeps the foreign keys, which then point at *target*'s tables), then
+        INSERT … SELECT, with foreign key and unique checks off on that
+        connection since the rows were already consistent. Tables run on up
+        to *jobs* connections, largest first. Returns (tables, bytes).
+        """
+        skipped = {t.lower() for t in skip}
+        with self._connect(source) as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT TABLE_NAME, COALESCE(DATA_LENGTH, 0) + COALESCE(INDEX_LENGTH, 0) "
+                        "FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE';",
+                        (source,))
+            sizes = {table: int(size) for table, size in cur.fetchall() if table.lower() not in skipped}
+            ddl = {}
+            for table in sizes:
+                cur.execute(f"SHOW CREATE TABLE `{table}`;")
+                ddl[table] = cur.fetchone()[1]
+
+        objects = []
+        for table, size in sizes.items():
+            path = Path(f"{source}.{table}")
+            objects.append(DeployObject(len(objects), "TABLE", table, target, [
+                (path, 1, "SET SESSION foreign_key_checks = 0, unique_checks = 0;"),
+                (path, 2, ddl[table]),
+                (path, 3, f"INSERT INTO `{table}` SELECT * FROM `{source}`.`{table}`;"),
+            ], weight=size))
+        click.echo(f"[INFO] Copying {len(objects)} tables ({sum(sizes.values()) / 2**20:,.1f} MiB) "
+                   f"from `{source}` to `{target}`.")
+        if objects:
+            self._deploy_objects(objects, jobs=jobs, timings=None)
+        return list(sizes), sum(sizes.values())
+
     # ------------------------------------------------------------------
     #  Pretty printer shared by both runners
     # ------------------------------------------------------------------
@@ -489,20 +1868,90 @@ class UserManager:
             for i, cell in enumerate(row):
                 widths[i] = max(widths[i], len(str(cell)) if cell is not None else 4)
 
+        self._write_aligned_header(fp, columns, widths)
+        for row in rows:
+            self._write_aligned_row(fp, row, widths)
+
+    @staticmethod
+    def _write_aligned_header(fp, columns: Sequence[str], widths: list[int]) -> None:
         fp.write("  ".join(col.ljust(widths[i]) for i, col in enumerate(columns)) + "\n")
         fp.write("  ".join("-" * widths[i] for i in range(len(columns))) + "\n")
 
-        for row in rows:
-            parts = []
-            for i, cell in enumerate(row):
-                txt = "NULL" if cell is None else str(cell)
-                parts.append(txt.ljust(widths[i]) if i < len(columns) - 1 else txt)
-            fp.write("  ".join(parts) + "\n")
+    @staticmethod
+    def _write_aligned_row(fp, row: Sequence, widths: list[int]) -> None:
+        last = len(widths) - 1
+        parts = []
+        for i, cell in enumerate(row):
+            txt = "NULL" if cell is None else str(cell)
+            parts.append(txt.ljust(widths[i]) if i < last else txt)
+        fp.write("  ".join(parts) + "\n")
+
+    def _write_aligned_stream(self, fp, columns: Sequence[str], cur, batch_size: int = 5000) -> int:
+        """
+        Same output as _write_aligned(), but rows are pulled from *cur* with
+        fetchmany(). The first pass computes the column widths while pickling
+        each batch (already converted to text) into a temporary spool file;
+        the second pass replays the spool, so memory stays at one batch.
+        Returns the number of rows written.
+        """
+        if len(columns) == 1:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                fp.write("(no rows)\n")
+                return 0
+            fp.write(f"{columns[0]}\n")
+            fp.write("-" * len(columns[0]) + "\n")
+            rows = 0
+            while batch:
+                fp.writelines(f"{'' if r is None else r}\n" for r, in batch)
+                rows += len(batch)
+                batch = cur.fetchmany(batch_size)
+            return rows
+
+        widths = [len(c) for c in columns]
+        rows = 0
+        with tempfile.TemporaryFile() as spool:
+            while batch := cur.fetchmany(batch_size):
+                text = [tuple(None if c is None else str(c) for c in row) for row in batch]
+                for row in text:
+                    for i, cell in enumerate(row):
+                        widths[i] = max(widths[i], len(cell) if cell is not None else 4)
+                pickle.dump(text, spool, protocol=pickle.HIGHEST_PROTOCOL)
+                rows += len(batch)
+
+            if not rows:
+                fp.write("(no rows)\n")
+                return 0
+
+            self._write_aligned_header(fp, columns, widths)
+            spool.seek(0)
+            while True:
+                try:
+                    batch = pickle.load(spool)
+                except EOFError:
+                    break
+                for row in batch:
+                    self._write_aligned_row(fp, row, widths)
+        return rows
 
     # ------------------------------------------------------------------
     #  Single‑query runner (unchanged logic, but reuses _write_aligned)
     # ------------------------------------------------------------------
-    def run_query_to_file(self, sql_path: str | Path, out_path: str | Path, *, database: str) -> None:
+    def run_query_to_file(self, sql_path: str | Path, out_path: str | Path, *, database: str,
+                          stream: bool = False, fetch_size: int = 5000,
+                          cache: ResultCache | None = None, fingerprint: str = "marker") -> int:
+        """
+        Run one query file and write its aligned result to *out_path*;
+        returns the number of rows. With *stream* the rows are fetched in
+        *fetch_size* batches and never held in memory all at once
+        (see _write_aligned_stream).
+
+        With a *cache*, the output is keyed by the normalised SQL plus the
+        fingerprint of every base table it reads (see _table_fingerprints)
+        and copied from the cache when nothing changed. Queries whose result
+        changes without any table changing (NOW(), RAND(), … in the query or
+        a view it reads) are never cached; CURDATE() adds the date to the key.
+        """
         sql_path = Path(sql_path).resolve()
         out_path = Path(out_path).resolve()
 
@@ -512,16 +1961,99 @@ class UserManager:
 
         sql = sql_path.read_text(encoding="utf-8")
 
-        params = self._dsn.copy()
-        params["database"] = database
-
-        with mysql.connector.connect(**params) as cnx, cnx.cursor() as cur:
+        key = None
+        if cache is not None:
+            normalized = normalize_sql(sql)
+            dsn = self._params(database)
+            marks = self._table_fingerprints(normalized, database=database, mode=fingerprint)
+            if marks is not None:
+                key = cache.key(dsn["host"], dsn["port"], database, normalized, marks)
+                rows = cache.fetch(key, out_path)
+                if rows is not None:
+                    return rows
+
+        rows = self._run_query_uncached(sql, out_path, database=database, stream=stream, fetch_size=fetch_size)
+        if key is not None:
+            cache.store(key, out_path, rows, query=sql_path.name, database=database)
+        return rows
+
+    def _run_query_uncached(self, sql: str, out_path: Path, *, database: str,
+                            stream: bool, fetch_size: int) -> int:
+        if stream:
+            with self._connect(database) as cnx, cnx.cursor() as cur, \
+                 out_path.open("w", encoding="utf-8") as f:
+                cur.execute(sql)
+                return self._write_aligned_stream(f, [desc[0] for desc in cur.description], cur, fetch_size)
+
+        with self._connect(database) as cnx, cnx.cursor() as cur:
             cur.execute(sql)
             rows = cur.fetchall()
             columns = [desc[0] for desc in cur.description]
 
         with out_path.open("w", encoding="utf-8") as f:
             self._write_aligned(f, columns, rows)
+        return len(rows)
+
+    def _table_fingerprints(self, sql: str, *, database: str, mode: str = "marker") -> dict[str, str] | None:
+        """
+        {base table: change marker} for every table *sql* reads, views
+        expanded through information_schema.VIEW_TABLE_USAGE. Tables are
+        found by matching identifiers against the schema, so an extra match
+        only costs an extra invalidation, never a stale hit. None when *sql*
+        or one of those views is volatile (see cache.volatility); a
+        date-dependent one adds {"@curdate": today}.
+
+        mode="marker":   COUNT(*) + MAX(updated_at); CHECKSUM TABLE for tables
+                         without updated_at (Genre)
+        mode="checksum": CHECKSUM TABLE for every table (catches edits that
+                         land in the same second as the current maximum)
+        """
+        words = {w.lower() for w in re.findall(r"\w+", sql)}
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute("SELECT TABLE_NAME, TABLE_TYPE FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = %s;", (database,))
+            kinds = {name: kind for name, kind in cur.fetchall()}
+            cur.execute("SELECT VIEW_NAME, TABLE_NAME FROM information_schema.VIEW_TABLE_USAGE "
+                        "WHERE VIEW_SCHEMA = %s AND TABLE_SCHEMA = %s;", (database, database))
+            uses: dict[str, set[str]] = {}
+            for view, table in cur.fetchall():
+                uses.setdefault(view.lower(), set()).add(table)
+            cur.execute("SELECT TABLE_NAME FROM information_schema.COLUMNS "
+                        "WHERE TABLE_SCHEMA = %s AND COLUMN_NAME = 'updated_at';", (database,))
+            stamped = {row[0] for row in cur.fetchall()}
+
+            pending = [name for name in kinds if name.lower() in words]
+            seen: set[str] = set()
+            while pending:
+                name = pending.pop()
+                if name in seen:
+                    continue
+                seen.add(name)
+                pending.extend(uses.get(name.lower(), ()))
+
+            definitions = [sql]
+            views = sorted(t for t in seen if kinds.get(t) == "VIEW")
+            if views:
+                cur.execute("SELECT VIEW_DEFINITION FROM information_schema.VIEWS WHERE TABLE_SCHEMA = %s "
+                            f"AND TABLE_NAME IN ({', '.join(['%s'] * len(views))});", (database, *views))
+                definitions += [row[0] or "" for row in cur.fetchall()]
+            kinds_used = {volatility(text) for text in definitions}
+            if "volatile" in kinds_used:
+                return None
+
+            marks: dict[str, str] = {}
+            if "date" in kinds_used:
+                cur.execute("SELECT CURDATE();")
+                marks["@curdate"] = str(cur.fetchone()[0])
+            for table in sorted(t for t in seen if kinds.get(t) == "BASE TABLE"):
+                if mode == "marker" and table in stamped:
+                    cur.execute(f"SELECT COUNT(*), MAX(updated_at) FROM `{table}`;")
+                    count, latest = cur.fetchone()
+                    marks[table] = f"{count}|{latest}"
+                else:
+                    cur.execute(f"CHECKSUM TABLE `{table}`;")
+                    marks[table] = f"checksum|{cur.fetchone()[1]}"
+        return marks
 
     # ------------------------------------------------------------------
     #  Position-based splitter: never misses a  "-- PLAN"  header
@@ -564,39 +2096,303 @@ class UserManager:
     # ------------------------------------------------------------------
     #  Multi‑plan runner (handles Q04, Q06)
     # ------------------------------------------------------------------
-    def run_multi_plan_query_to_files(self, sql_path: str | Path, out_prefix: str | Path, *, database: str) -> int:
+    def run_multi_plan_query_to_files(self, sql_path: str | Path, out_prefix: str | Path, *, database: str,
+                                      stream: bool = False, fetch_size: int = 5000,
+                                      rows_out: list[int] | None = None,
+                                      save_traces: bool = False) -> int:
+        """
+        Run every "-- PLAN" bundle of *sql_path* into <out_prefix><n>_out.txt.
+        All bundles share one session (optimizer_trace is session-scoped), so
+        they always run one after another. When *rows_out* is given, the row
+        count of each plan's RESULT step is appended to it.
+
+        With *save_traces* the optimizer trace of every traced statement is
+        also written to <out_prefix><n>_stmt<k>.trace.json (query, raw trace,
+        summary) and the summaries of a plan to <out_prefix><n>_trace.txt.
+        """
         sql_path = Path(sql_path).resolve()
         sql_text = sql_path.read_text(encoding="utf-8")
         bundles = self._split_trace_plans(sql_text)
 
-        params = self._dsn.copy()
-        params["database"] = database
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            if save_traces:
+                cur.execute("SET SESSION optimizer_trace_max_mem_size = 16777216;")
+            for idx, bundle in enumerate(bundles, start=1):
+                labels = self._LABELS_BY_PLAN.get(idx, self._LABELS_DEFAULT)
+                result_step = 0
+                traces: list[tuple[int, str, dict]] = []
+
+                out_path = Path(f"{out_prefix}{idx}_out.txt").resolve()
+                with out_path.open("w", encoding="utf-8") as fp:
+                    cur.execute("SET optimizer_trace='enabled=on';")
+
+                    for stmt in bundle:
+                        cur.execute(stmt)
+                        if not cur.with_rows:  # SET / ALTER etc.
+                            continue
+
+                        cols = cur.column_names
+                        label = labels[result_step % len(labels)]
+                        result_step += 1
+
+                        fp.write(f"\n## PLAN {idx} — {label} ##\n")
+                        if stream:
+                            rows = self._write_aligned_stream(fp, cols, cur, fetch_size)
+                        else:
+                            result = cur.fetchall()
+                            self._write_aligned(fp, cols, result)
+                            rows = len(result)
+                        if rows_out is not None and result_step == 1:
+                            rows_out.append(rows)
 
-        for idx, bundle in enumerate(bundles, start=1):
-            labels = self._LABELS_BY_PLAN.get(idx, self._LABELS_DEFAULT)
-            result_step = 0
+                        if save_traces and "optimizer_trace" not in stmt.lower():
+                            record = self._read_trace(cur)
+                            if record is not None:
+                                traces.append((len(traces) + 1, label, record))
 
-            out_path = Path(f"{out_prefix}{idx}_out.txt").resolve()
-            with mysql.connector.connect(**params) as cnx, \
-                 cnx.cursor() as cur, \
-                 out_path.open("w", encoding="utf-8") as fp:
+                if save_traces:
+                    self._write_traces(out_prefix, idx, traces)
 
-                cur.execute("SET optimizer_trace='enabled=on';")
+        return len(bundles)  # caller prints the filename list based on this
 
-                for stmt in bundle:
-                    cur.execute(stmt)
-                    if not cur.with_rows:  # SET / ALTER etc.
-                        continue
+    @staticmethod
+    def _read_trace(cur) -> dict | None:
+        """The session's last optimizer trace as {"query", "trace", "summary"} (None when empty)."""
+        cur.execute("SELECT QUERY, TRACE, MISSING_BYTES_BEYOND_MAX_MEM_SIZE "
+                    "FROM information_schema.OPTIMIZER_TRACE;")
+        row = cur.fetchone()
+        cur.fetchall()
+        if row is None:
+            return None
+        query, raw, missing = row
+        record = {"query": query, "missing_bytes": int(missing or 0)}
+        try:
+            record["trace"] = json.loads(raw)
+            record["summary"] = summarize_trace(record["trace"])
+        except ValueError:  # truncated at optimizer_trace_max_mem_size
+            record["trace"] = raw
+            record["summary"] = None
+        return record
+
+    @staticmethod
+    def _write_traces(out_prefix: str | Path, idx: int, traces: list[tuple[int, str, dict]]) -> None:
+        summary_path = Path(f"{out_prefix}{idx}_trace.txt").resolve()
+        with summary_path.open("w", encoding="utf-8") as fp:
+            for k, label, record in traces:
+                json_path = Path(f"{out_prefix}{idx}_stmt{k}.trace.json").resolve()
+                json_path.write_text(json.dumps({"plan": idx, "statement": k, "label": label, **record},
+                                                indent=2) + "\n", encoding="utf-8")
+                fp.write(f"\n## PLAN {idx} — statement {k} ({label}) → {json_path.name} ##\n")
+                fp.write(record["query"].strip() + "\n\n")
+                if record["summary"] is None:
+                    fp.write(f"(trace truncated: {record['missing_bytes']} bytes missing)\n")
+                else:
+                    fp.write(format_trace_summary(record["summary"]))
 
-                    rows = cur.fetchall()
-                    cols = cur.column_names
-                    label = labels[result_step % len(labels)]
-                    result_step += 1
+    # ------------------------------------------------------------------
+    #  Benchmark runner (db137 q --bench)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _bytes_sent(cur) -> int:
+        cur.execute("SHOW SESSION STATUS LIKE 'Bytes_sent';")
+        return int(cur.fetchone()[1])
 
-                    fp.write(f"\n## PLAN {idx} — {label} ##\n")
-                    self._write_aligned(fp, cols, rows)
+    def benchmark_query_file(self, sql_path: str | Path, *, database: str, repeat: int = 10,
+                             warmup: int = 2, multi_plan: bool = False) -> dict[str, dict]:
+        """
+        Execute *sql_path* warmup + repeat times on one pooled session and
+        summarise the timed runs (see bench.summarize). Multi-plan files are
+        benchmarked per "-- PLAN" bundle as <stem>_plan<n>; their EXPLAIN
+        statements are skipped so only the real query work is timed.
+        Bytes are the server's Bytes_sent delta per run, minus the cost of
+        the SHOW STATUS probe itself.
+        """
+        sql_path = Path(sql_path).resolve()
+        sql_text = sql_path.read_text(encoding="utf-8")
+        if multi_plan:
+            cases = [(f"{sql_path.stem}_plan{idx}",
+                      [st for st in bundle if not st.lstrip().upper().startswith("EXPLAIN")])
+                     for idx, bundle in enumerate(self._split_trace_plans(sql_text), start=1)]
+        else:
+            cases = [(sql_path.stem, [sql_text])]
+
+        results: dict[str, dict] = {}
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            first = self._bytes_sent(cur)
+            probe = self._bytes_sent(cur) - first
+            for name, statements in cases:
+                samples: list[float] = []
+                rows = sent = 0
+                for run in range(warmup + repeat):
+                    before = self._bytes_sent(cur)
+                    started = time.perf_counter()
+                    rows = 0
+                    for stmt in statements:
+                        cur.execute(stmt)
+                        if cur.with_rows:
+                            rows += len(cur.fetchall())
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    sent = max(self._bytes_sent(cur) - before - probe, 0)
+                    if run >= warmup:
+                        samples.append(elapsed_ms)
+                results[name] = summarize(samples, rows, sent)
+        return results
 
-        return len(bundles)  # caller prints the filename list based on this
+    # ------------------------------------------------------------------
+    #  Plan comparison harness (db137 plans compare)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _explain_analyze_steps(cur, bundle: list[str], labels: Sequence[str]):
+        """
+        Run the SET and EXPLAIN ANALYZE statements of *bundle* on *cur* and
+        yield (label, tree text) for each EXPLAIN ANALYZE. Other result
+        statements are skipped but still advance the label counter.
+        """
+        result_step = 0
+        for stmt in bundle:
+            body = re.sub(r"^(\s*--[^\n]*\n)*", "", stmt).lstrip()
+            head = body.split(None, 1)[0].upper() if body else ""
+            if head == "SET":
+                cur.execute(stmt)
+                continue
+            label = labels[result_step % len(labels)]
+            result_step += 1
+            if not re.match(r"EXPLAIN\s+ANALYZE\b", body, re.I):
+                continue
+            cur.execute(stmt)
+            yield label, "\n".join(str(row[0]) for row in cur.fetchall())
+
+    def compare_plan_bundles(
+        self,
+        sql_path: str | Path,
+        *,
+        database: str,
+        runs: int = 5,
+        warmup: int = 1,
+        scenarios: Sequence[tuple[str, str | None]] = (("as written", None),),
+    ) -> list[dict]:
+        """
+        Time every EXPLAIN ANALYZE statement of every "-- PLAN" bundle in
+        *sql_path*, *runs* times (after *warmup* discarded runs) under each
+        scenario. A scenario is (name, optimizer_switch flags or None); its
+        flags are set for the session before the bundle and reset to DEFAULT
+        afterwards, so SET statements inside the bundle still apply on top.
+        Plain result / EXPLAIN / trace statements are skipped; they only
+        advance the label counter so names match run_multi_plan_query_to_files.
+
+        Returns one dict per (plan, label, scenario):
+        {"plan", "label", "scenario", "samples_ms", "median_ms"}.
+        """
+        sql_path = Path(sql_path).resolve()
+        bundles = self._split_trace_plans(sql_path.read_text(encoding="utf-8"))
+
+        results: list[dict] = []
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            for idx, bundle in enumerate(bundles, start=1):
+                labels = self._LABELS_BY_PLAN.get(idx, self._LABELS_DEFAULT)
+                for scenario, flags in scenarios:
+                    samples: dict[str, list[float]] = {}
+                    for run in range(warmup + runs):
+                        if flags:
+                            cur.execute("SET SESSION optimizer_switch = %s", (flags,))
+                        for label, text in self._explain_analyze_steps(cur, bundle, labels):
+                            if run >= warmup:
+                                samples.setdefault(label, []).append(root_actual_ms(text))
+                        if flags:
+                            cur.execute("SET SESSION optimizer_switch = DEFAULT")
+
+                    for label, times in samples.items():
+                        results.append({
+                            "plan": idx,
+                            "label": label,
+                            "scenario": scenario,
+                            "samples_ms": times,
+                            "median_ms": percentile(times, 50),
+                        })
+        return results
+
+    # ------------------------------------------------------------------
+    #  Plan-tree profiler (db137 q --profile, /api/profile)
+    # ------------------------------------------------------------------
+    def profile_sql(self, sql: str, *, database: str) -> PlanNode:
+        """
+        EXPLAIN ANALYZE the first statement of *sql* and return the parsed plan
+        tree. EXPLAIN ANALYZE executes the statement, so anything but a SELECT /
+        WITH query raises ValueError, as does *sql* without a statement.
+        """
+        statements = split_statements(sql)
+        if not statements:
+            raise ValueError("No SQL statement to profile.")
+        body = re.sub(r"^\s*EXPLAIN(\s+ANALYZE)?\b", "", statements[0], flags=re.I).strip()
+        if not is_query(body):
+            raise ValueError("Only SELECT / WITH queries can be profiled.")
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            cur.execute(f"EXPLAIN ANALYZE {body}")
+            return parse_explain_analyze("\n".join(str(row[0]) for row in cur.fetchall()))
+
+    def profile_query_file(self, sql_path: str | Path, *, database: str,
+                           multi_plan: bool = False) -> dict[str, PlanNode]:
+        """
+        Plan trees for a query file: {stem: tree} for a single query, or one
+        tree per EXPLAIN ANALYZE of each "-- PLAN" bundle, named
+        <stem>_plan<n> (plus a label suffix such as _hash / _nested_loop when a
+        bundle analyses more than one variant).
+        """
+        sql_path = Path(sql_path).resolve()
+        sql_text = sql_path.read_text(encoding="utf-8")
+        if not multi_plan:
+            return {sql_path.stem: self.profile_sql(sql_text, database=database)}
+
+        trees: dict[str, PlanNode] = {}
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            for idx, bundle in enumerate(self._split_trace_plans(sql_text), start=1):
+                labels = self._LABELS_BY_PLAN.get(idx, self._LABELS_DEFAULT)
+                steps = list(self._explain_analyze_steps(cur, bundle, labels))
+                for label, text in steps:
+                    suffix = re.sub(r"^EXPLAIN ANALYZE\s*", "", label).strip().lower().replace(" ", "_")
+                    name = f"{sql_path.stem}_plan{idx}" + (f"_{suffix}" if len(steps) > 1 and suffix else "")
+                    trees[name] = parse_explain_analyze(text)
+        return trees
+
+    # ------------------------------------------------------------------
+    #  Plan capture (db137 plans capture|check)
+    # ------------------------------------------------------------------
+    def explain_query_file(self, sql_path: str | Path, *, database: str,
+                           multi_plan: bool = False) -> dict[str, dict]:
+        """
+        EXPLAIN FORMAT=JSON every SELECT / WITH statement of *sql_path* and
+        return {name: normalised plan} (see plans.normalize_plan). SET
+        statements are executed so optimizer switches apply to the plans that
+        follow them; existing EXPLAIN statements and optimizer-trace reads
+        are skipped. Names are the
+        file stem (<stem>_plan<n> per "-- PLAN" bundle), with "#k" appended
+        when a bundle holds more than one query.
+        """
+        sql_path = Path(sql_path).resolve()
+        sql_text = sql_path.read_text(encoding="utf-8")
+        if multi_plan:
+            cases = [(f"{sql_path.stem}_plan{idx}", split_statements("\n".join(bundle)))
+                     for idx, bundle in enumerate(self._split_trace_plans(sql_text), start=1)]
+        else:
+            cases = [(sql_path.stem, split_statements(sql_text))]
+
+        plans: dict[str, dict] = {}
+        with self._connect(database) as cnx, cnx.cursor() as cur:
+            for name, statements in cases:
+                # reads of information_schema.optimizer_trace are bookkeeping, not suite queries
+                queries = [is_query(st) and "optimizer_trace" not in st.lower() for st in statements]
+                seen = 0
+                for stmt, query in zip(statements, queries):
+                    if stmt.split(None, 1)[0].upper() == "SET":
+                        cur.execute(stmt)
+                    if not query:
+                        continue
+                    seen += 1
+                    cur.execute(f"EXPLAIN FORMAT=JSON {stmt}")
+                    doc = cur.fetchone()[0]
+                    label = name if sum(queries) == 1 else f"{name}#{seen}"
+                    plans[label] = normalize_plan(doc)
+        return plans
 
     def _execute_sql(self, stmt: str, params: dict | None = None) -> None:
         with self._connect() as cnx, cnx.cursor() as cur:
@@ -609,20 +2405,8 @@ class UserManager:
                 self._log.error(str(exc))
                 raise
 
-    @contextlib.contextmanager
-    def _connect(self, database: str | None = None):
-        dsn = self._dsn.copy()
-        dsn["host"] = os.getenv("DB_HOST", "localhost")
-        if database:
-            dsn["database"] = database
-        cnx = mysql.connector.connect(**dsn)
-        try:
-            yield cnx
-        finally:
-            cnx.close()
-
     def connected_user(self) -> str:
-        """Returns the connected username (e.g., 'root@localhost')"""
+        """Returns the connected username (e.g., 'root@localhost'), cached per session"""
         return self.whoami()
 
     def is_root(self) -> bool:
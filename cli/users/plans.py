@@ -0,0 +1,156 @@
+"""
+cli.users.plans
+===============
+Normalised EXPLAIN FORMAT=JSON snapshots and a baseline diff for the
+query suite (`db137 plans capture|check`).
+
+Public API
+----------
+split_statements(sql_text)           → [statement, ...] without comments / trailing ';'
+is_query(statement)                  → True for a SELECT / WITH statement
+normalize_plan(explain_json)         → {"cost": float, "tables": {alias: {...}}}
+indexing_indexes(sql_text)           → {index names created by indexing.sql}
+diff_plans(baseline, current, indexed=set(), cost_threshold=0.25)
+    → [(statement, message), ...] for every regression
+load_snapshot(path) / write_snapshot(path, snapshot)
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+__all__ = [
+    "split_statements",
+    "is_query",
+    "normalize_plan",
+    "indexing_indexes",
+    "diff_plans",
+    "load_snapshot",
+    "write_snapshot",
+]
+
+SNAPSHOT_VERSION = 1
+
+_CREATE_INDEX_RE = re.compile(r"\bCREATE\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+`?(\w+)`?", re.I)
+_QUERY_RE = re.compile(r"\s*\(*\s*(SELECT|WITH)\b", re.I)
+_ADD_INDEX_RE = re.compile(r"\bADD\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?(?:INDEX|KEY)\s+`?(\w+)`?", re.I)
+
+
+def split_statements(sql_text: str) -> list[str]:
+    """Split a query file on end-of-line semicolons, dropping comments."""
+    text = re.sub(r"/\*.*?\*/", " ", sql_text.lstrip("\ufeff"), flags=re.S)
+    text = re.sub(r"(?m)^\s*--[^\n]*$", "", text)
+    return [s.strip() for s in re.split(r";\s*$", text, flags=re.M) if s.strip()]
+
+
+def is_query(statement: str) -> bool:
+    """True for a SELECT / WITH statement (optionally parenthesised) – the ones EXPLAIN only reads."""
+    return bool(_QUERY_RE.match(statement))
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _walk_tables(node, found: list[dict]) -> None:
+    if isinstance(node, dict):
+        table = node.get("table")
+        if isinstance(table, dict) and "table_name" in table:
+            found.append(table)
+        for value in node.values():
+            _walk_tables(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            _walk_tables(item, found)
+
+
+def normalize_plan(explain_json: dict | str) -> dict:
+    """
+    Reduce an EXPLAIN FORMAT=JSON document to what matters for regressions:
+    the total query cost and, per table alias, access type, chosen and
+    possible keys, estimated rows and read + eval cost. Aliases that occur
+    more than once (sub-queries, derived tables) get a "#n" suffix.
+    """
+    if isinstance(explain_json, str):
+        explain_json = json.loads(explain_json)
+    block = explain_json.get("query_block", {})
+
+    found: list[dict] = []
+    _walk_tables(explain_json, found)
+
+    tables: dict[str, dict] = {}
+    for table in found:
+        alias = table["table_name"]
+        n = 2
+        while alias in tables:
+            alias = f"{table['table_name']}#{n}"
+            n += 1
+        cost = table.get("cost_info", {})
+        tables[alias] = {
+            "access": table.get("access_type", "?"),
+            "key": table.get("key"),
+            "possible_keys": sorted(table.get("possible_keys", [])),
+            "rows": int(_float(table.get("rows_examined_per_scan", 0))),
+            "cost": round(_float(cost.get("read_cost")) + _float(cost.get("eval_cost")), 2),
+        }
+
+    return {
+        "cost": round(_float(block.get("cost_info", {}).get("query_cost")), 2),
+        "tables": tables,
+    }
+
+
+def indexing_indexes(sql_text: str) -> set[str]:
+    """Names of every index indexing.sql creates (CREATE INDEX / ADD INDEX)."""
+    return {m.group(1) for rx in (_CREATE_INDEX_RE, _ADD_INDEX_RE) for m in rx.finditer(sql_text)}
+
+
+def diff_plans(baseline: dict, current: dict, *, indexed: set[str] = frozenset(),
+               cost_threshold: float = 0.25) -> list[tuple[str, str]]:
+    """
+    Compare two {statement: normalised plan} maps and report:
+      • a table that switched to (or newly appears with) a full scan (ALL),
+      • a table that no longer uses the indexing.sql index it used before,
+      • total cost grown by more than *cost_threshold* (0.25 = +25 %).
+    Statements missing from *current* are reported too.
+    """
+    problems: list[tuple[str, str]] = []
+    for name, before in baseline.items():
+        after = current.get(name)
+        if after is None:
+            problems.append((name, "statement missing from the current capture"))
+            continue
+
+        for alias, now in after["tables"].items():
+            was = before["tables"].get(alias)
+            if now["access"] == "ALL" and (was is None or was["access"] != "ALL"):
+                how = f"was {was['access']} via {was['key']}" if was else "new table in plan"
+                problems.append((name, f"full scan on `{alias}` (~{now['rows']} rows, {how})"))
+            if was and was["key"] in indexed and now["key"] != was["key"]:
+                problems.append((name, f"`{alias}` no longer uses {was['key']} "
+                                       f"(now {now['key'] or 'no index'})"))
+
+        if before["cost"] > 0 and after["cost"] > before["cost"] * (1 + cost_threshold):
+            growth = after["cost"] / before["cost"] - 1
+            problems.append((name, f"estimated cost {before['cost']:,.2f} → {after['cost']:,.2f} "
+                                   f"(+{growth:.0%})"))
+    return problems
+
+
+def write_snapshot(path: str | Path, snapshot: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot = {"version": SNAPSHOT_VERSION, **snapshot}
+    path.write_text(json.dumps(snapshot, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def load_snapshot(path: str | Path) -> dict:
+    snapshot = json.loads(Path(path).read_text(encoding="utf-8"))
+    if snapshot.get("version") != SNAPSHOT_VERSION or "plans" not in snapshot:
+        raise ValueError(f"{path}: not a db137 plan snapshot (version {SNAPSHOT_VERSION}).")
+    return snapshot
@@ -0,0 +1,160 @@
+"""
+cli.users.pool
+==============
+Small thread-safe connection pool used by UserManager.
+
+One pool exists per (user, host, port, database) key. Connections are
+health-checked before they are handed out and have their session state
+reset when they are given back, so callers always start from a clean
+session (no leftover user variables, temporary tables or open transactions).
+
+Public API
+----------
+ConnectionPool(dsn, min_size=1, max_size=8, timeout=30.0)
+ConnectionPool.acquire()   → context manager yielding a connection
+ConnectionPool.close()     → closes every idle connection
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+__all__ = ["ConnectionPool"]
+
+
+class ConnectionPool:
+    def __init__(self, dsn: dict, *, min_size: int = 1, max_size: int = 8, timeout: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}.")
+
+        self._dsn = dict(dsn)
+        self._min = min_size
+        self._max = max_size
+        self._timeout = timeout
+        self._log = logging.getLogger(__name__)
+
+        self._idle: deque = deque()
+        self._size = 0                 # idle + checked-out connections
+        self._closed = False
+        self._cond = threading.Condition()
+
+        for _ in range(self._min):
+            self._idle.append(self._open())
+            self._size += 1
+
+    # ------------------------------------------------------------------
+    #  Connection lifecycle
+    # ------------------------------------------------------------------
+    def _open(self):
+        return mysql.connector.connect(**self._dsn)
+
+    def _discard(self, cnx) -> None:
+        with contextlib.suppress(Exception):
+            cnx.close()
+
+    def _healthy(self, cnx) -> bool:
+        """Ping the server; a dead socket is dropped instead of handed out."""
+        try:
+            cnx.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _reset(self, cnx) -> bool:
+        """
+        Clear session state before the connection goes back to the pool.
+        Returns False when the reset failed and the connection must be dropped.
+        """
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+            cnx.reset_session()
+            cnx.autocommit = self._dsn.get("autocommit", False)
+            if self._dsn.get("database"):
+                cnx.database = self._dsn["database"]
+            return True
+        except mysql.connector.Error as exc:
+            self._log.debug("Dropping pooled connection after failed reset: %s", exc)
+            return False
+
+    # ------------------------------------------------------------------
+    #  Checkout / checkin
+    # ------------------------------------------------------------------
+    def _get(self):
+        deadline = time.monotonic() + self._timeout
+        while True:
+            cnx = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise mysql.connector.errors.PoolError("Connection pool is closed.")
+
+                    if self._idle:
+                        cnx = self._idle.popleft()
+                        break
+
+                    if self._size < self._max:
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise mysql.connector.errors.PoolError(
+                            f"No connection available within {self._timeout:.0f}s "
+                            f"(pool max size {self._max})."
+                        )
+
+            if cnx is None:
+                # Open outside the lock so slow handshakes do not block other threads
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            # The popped connection counts as checked out; ping it without the lock
+            # so other threads' checkouts never wait on this round trip
+            if self._healthy(cnx):
+                return cnx
+            self._discard(cnx)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    def _put(self, cnx) -> None:
+        keep = not self._closed and self._reset(cnx)
+        with self._cond:
+            if keep and not self._closed:
+                self._idle.append(cnx)
+            else:
+                self._discard(cnx)
+                self._size -= 1
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def acquire(self):
+        cnx = self._get()
+        try:
+            yield cnx
+        finally:
+            self._put(cnx)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.popleft())
+                self._size -= 1
+            self._cond.notify_all()
+
+    def __del__(self):
+        with contextlib.suppress(Exception):
+            self.close()
@@ -0,0 +1,77 @@
+"""
+cli.users.profile
+=================
+Server settings for loading seed data (`db137 load-db --profile bulk`).
+
+SESSION settings are sent as the connector's init_command of a dedicated
+connection pool, so they hold on every connection of the load (the pool's
+session reset re-runs it) and never leak into the default pools. GLOBAL
+settings need SYSTEM_VARIABLES_ADMIN; they are applied only if the account
+may, and set back to their previous value when the command ends.
+
+Public API
+----------
+SessionSetting                          → name, value, scope, trusted_only, purpose
+PROFILES                                → {"bulk": [SessionSetting, ...]}
+profile_settings(name, trusted=False)   → the settings of a profile that apply
+init_command(settings)                  → "SET SESSION a = 0, b = 1" for the SESSION ones (None if none)
+format_probe(results, settings=())      → printable table of probe timings vs. the baseline
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+__all__ = ["SessionSetting", "PROFILES", "profile_settings", "init_command", "format_probe"]
+
+
+@dataclass(frozen=True)
+class SessionSetting:
+    name: str
+    value: str
+    scope: str = "SESSION"          # SESSION (init_command) or GLOBAL (needs SYSTEM_VARIABLES_ADMIN)
+    trusted_only: bool = False      # only with load-db --trusted
+    purpose: str = ""
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} = {self.value}"
+
+
+PROFILES: dict[str, list[SessionSetting]] = {
+    "bulk": [
+        SessionSetting("unique_checks", "0",
+                       purpose="secondary UNIQUE indexes are not probed per row (change buffering)"),
+        SessionSetting("foreign_key_checks", "0", trusted_only=True,
+                       purpose="no parent lookup per child row"),
+        SessionSetting("bulk_insert_buffer_size", str(256 * 1024 * 1024),
+                       purpose="multi-row INSERT / LOAD DATA cache (MyISAM tables only)"),
+        SessionSetting("innodb_flush_log_at_trx_commit", "2", scope="GLOBAL",
+                       purpose="redo log written per commit, flushed once a second"),
+    ],
+}
+
+
+def profile_settings(name: str, *, trusted: bool = False) -> list[SessionSetting]:
+    """The settings of profile *name*; trusted-only ones are left out unless *trusted*."""
+    return [s for s in PROFILES.get(name, []) if trusted or not s.trusted_only]
+
+
+def init_command(settings: Iterable[SessionSetting]) -> str | None:
+    assignments = [s.label for s in settings if s.scope == "SESSION"]
+    return f"SET SESSION {', '.join(assignments)};" if assignments else None
+
+
+def format_probe(results: list[tuple[str, float]], settings: Iterable[SessionSetting] = ()) -> str:
+    """*results* is [(label, ms), ...] with the baseline first; *settings* supply the purpose column."""
+    if not results:
+        return ""
+    purposes = {s.label: s.purpose for s in settings}
+    base = results[0][1]
+    width = max(len(label) for label, _ in results)
+    lines = ["Probe: autocommitted single-row INSERTs into a table with a UNIQUE key and a FOREIGN KEY"]
+    for i, (label, ms) in enumerate(results):
+        delta = f"{(ms - base) / base:+7.1%}" if i and base else " " * 7
+        lines.append(f"  {label.ljust(width)}  {ms:9.1f} ms  {delta}  {purposes.get(label, '')}".rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,119 @@
+"""
+cli.users.schema
+================
+Static helpers that read table relationships straight out of install.sql.
+
+Public API
+----------
+table_dependencies(sql_text)          → {table: {referenced tables}} in declaration order
+trigger_dependencies(sql_text, order) → extra edges between tables linked by a trigger
+load_order(deps)                      → parents-first list of tables
+dependency_levels(deps)               → [[tables with no pending parents], [next level], ...]
+"""
+
+from __future__ import annotations
+
+import re
+
+__all__ = ["table_dependencies", "trigger_dependencies", "load_order", "dependency_levels"]
+
+_CREATE_TABLE_RE = re.compile(
+    r"\bCREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\(", re.I
+)
+_REFERENCES_RE = re.compile(r"\bREFERENCES\s+`?(\w+)`?", re.I)
+_CREATE_TRIGGER_RE = re.compile(
+    r"\bCREATE\s+(?:DEFINER\s*=\s*\S+\s+)?TRIGGER\s+`?\w+`?\s+"
+    r"(?:BEFORE|AFTER)\s+(?:INSERT|UPDATE|DELETE)\s+ON\s+`?(\w+)`?",
+    re.I,
+)
+
+
+def _strip_comments(sql_text: str) -> str:
+    sql_text = re.sub(r"/\*.*?\*/", " ", sql_text, flags=re.S)
+    return re.sub(r"(?m)(--|#)[^\n]*$", "", sql_text)
+
+
+def table_dependencies(sql_text: str) -> dict[str, set[str]]:
+    """
+    Map every CREATE TABLE in *sql_text* to the tables its FOREIGN KEY
+    clauses reference. Self-references are dropped; names are returned
+    with the spelling of their CREATE TABLE.
+    """
+    text = _strip_comments(sql_text)
+    bodies: dict[str, str] = {}
+    for m in _CREATE_TABLE_RE.finditer(text):
+        end = text.find(";", m.end())
+        bodies[m.group(1)] = text[m.end(): end if end >= 0 else len(text)]
+
+    canonical = {name.lower(): name for name in bodies}
+    deps: dict[str, set[str]] = {}
+    for name, body in bodies.items():
+        refs = {canonical.get(r.lower(), r) for r in _REFERENCES_RE.findall(body)}
+        refs.discard(name)
+        deps[name] = refs
+    return deps
+
+
+def trigger_dependencies(sql_text: str, tables: list[str]) -> dict[str, set[str]]:
+    """
+    Edges implied by triggers: when a trigger on one table reads or writes
+    another (the Review trigger reads Ticket, the Resale_Offer trigger writes
+    Resale_Match_Log), the pair keeps the relative order it has in *tables*.
+    Edges always point from the later table to the earlier one, so they never
+    contradict the given order and cannot create cycles.
+    """
+    text = _strip_comments(sql_text)
+    position = {t.lower(): i for i, t in enumerate(tables)}
+    canonical = {t.lower(): t for t in tables}
+    matches = list(_CREATE_TRIGGER_RE.finditer(text))
+
+    deps: dict[str, set[str]] = {}
+    for i, m in enumerate(matches):
+        owner = m.group(1).lower()
+        if owner not in position:
+            continue
+        body = text[m.end(): matches[i + 1].start() if i + 1 < len(matches) else len(text)]
+        for word in set(re.findall(r"\b\w+\b", body.lower())):
+            if word not in position or word == owner:
+                continue
+            first, later = sorted((word, owner), key=position.__getitem__)
+            deps.setdefault(canonical[later], set()).add(canonical[first])
+    return deps
+
+
+def load_order(deps: dict[str, set[str]]) -> list[str]:
+    """
+    Parents-first topological order. At every step the earliest-declared
+    ready table wins, so an install.sql that is already ordered comes back
+    unchanged. References to tables outside *deps* are ignored.
+    """
+    pending = {t: {d for d in refs if d in deps} for t, refs in deps.items()}
+    order: list[str] = []
+    while pending:
+        ready = next((t for t, refs in pending.items() if not refs), None)
+        if ready is None:
+            raise ValueError(f"Foreign-key cycle between: {', '.join(sorted(pending))}")
+        order.append(ready)
+        del pending[ready]
+        for refs in pending.values():
+            refs.discard(ready)
+    return order
+
+
+def dependency_levels(deps: dict[str, set[str]]) -> list[list[str]]:
+    """
+    Group tables into waves: every table in a level only depends on tables
+    of earlier levels, so a whole level can be loaded concurrently.
+    """
+    pending = {t: {d for d in refs if d in deps} for t, refs in deps.items()}
+    levels: list[list[str]] = []
+    while pending:
+        ready = [t for t, refs in pending.items() if not refs]
+        if not ready:
+            raise ValueError(f"Foreign-key cycle between: {', '.join(sorted(pending))}")
+        levels.append(ready)
+        for t in ready:
+            del pending[t]
+        for refs in pending.values():
+            refs.difference_update(ready)
+    return levels
@@ -0,0 +1,49 @@
+"""
+cli.users.snapshot
+==================
+Naming and metadata of schema snapshots (`db137 snapshot save|restore`).
+
+A snapshot is a side database `db137_snap_<name>` holding a copy of every
+base table of a loaded schema (definitions with their indexes and foreign
+keys, and the rows) plus one metadata table. Procedures, triggers and
+views are not copied: a restore redeploys them from the sql/ scripts, so
+the triggers never fire on the restored rows.
+
+Public API
+----------
+SNAPSHOT_PREFIX           → "db137_snap_"
+META_TABLE                → name of the metadata table inside a snapshot
+META_DDL                  → CREATE TABLE statement of the metadata table
+snapshot_schema(name)     → "db137_snap_<name>" (ValueError for unusable names)
+snapshot_name(schema)     → "<name>" of a snapshot schema, None for other schemas
+"""
+
+from __future__ import annotations
+
+import re
+
+__all__ = ["SNAPSHOT_PREFIX", "META_TABLE", "META_DDL", "snapshot_schema", "snapshot_name"]
+
+SNAPSHOT_PREFIX = "db137_snap_"
+META_TABLE = "_db137_snapshot"
+META_DDL = (
+    f"CREATE TABLE `{META_TABLE}` ("
+    "source VARCHAR(64) NOT NULL, "
+    "saved_at DATETIME NOT NULL, "
+    "install_sha256 CHAR(64), "
+    "tables INT UNSIGNED NOT NULL, "
+    "bytes BIGINT UNSIGNED NOT NULL)"
+)
+
+_NAME_RE = re.compile(rf"\w{{1,{64 - len(SNAPSHOT_PREFIX)}}}", re.ASCII)
+
+
+def snapshot_schema(name: str) -> str:
+    if not _NAME_RE.fullmatch(name):
+        raise ValueError(f"Invalid snapshot name {name!r}: use up to {64 - len(SNAPSHOT_PREFIX)} "
+                         "letters, digits or underscores.")
+    return SNAPSHOT_PREFIX + name
+
+
+def snapshot_name(schema: str) -> str | None:
+    return schema[len(SNAPSHOT_PREFIX):] if schema.startswith(SNAPSHOT_PREFIX) else None
@@ -0,0 +1,191 @@
+"""
+cli.users.splitter
+==================
+Single-pass statement splitter for .sql scripts (install.sql … load.sql).
+
+The input is consumed line by line and scanned once: string literals
+('…', "…" with backslash / doubled-quote escapes), `identifiers`, both
+comment styles (-- / # to end of line, /* … */) and DELIMITER directives
+are recognised, so a ';' inside a caption or a '--' inside a quoted value
+never splits a statement. Without a custom delimiter, the bodies of
+CREATE PROCEDURE / FUNCTION / TRIGGER / EVENT are kept together by
+counting BEGIN / CASE … END (END IF / LOOP / WHILE / REPEAT close blocks
+that never opened one); a routine without BEGIN ends at its first ';'.
+
+Comments are dropped from the statement text, except executable
+/*! … */ and optimizer-hint /*+ … */ comments, which the server needs.
+
+Public API
+----------
+SPLITTER_VERSION                → bumped whenever the output for some input changes
+iter_statements(source)         → yields (first line, statement) lazily;
+                                  source is a str or an iterable of lines (an open file)
+"""
+
+from __future__ import annotations
+
+import io
+import re
+from typing import Iterable, Iterator
+
+__all__ = ["SPLITTER_VERSION", "iter_statements"]
+
+SPLITTER_VERSION = 2
+
+_CLOSE_QUOTE = {
+    "'": re.compile(r"[^'\\]*(?:(?:\\.|'')[^'\\]*)*'", re.S),
+    '"': re.compile(r'[^"\\]*(?:(?:\\.|"")[^"\\]*)*"', re.S),
+    "`": re.compile(r"[^`]*(?:``[^`]*)*`"),
+}
+_DELIMITER_RE = re.compile(r"\s*DELIMITER\s+(\S+)", re.I)
+_ROUTINE_HEAD_RE = re.compile(
+    r"\s*CREATE\s+(?:OR\s+REPLACE\s+)?"
+    r"(?:DEFINER\s*=\s*(?:CURRENT_USER(?:\s*\(\s*\))?|(?:'[^']*'|`[^`]*`|[\w.%-]+)"
+    r"(?:\s*@\s*(?:'[^']*'|`[^`]*`|[\w.%-]+))?)\s+)?"
+    r"(?:AGGREGATE\s+)?(?:PROCEDURE|FUNCTION|TRIGGER|EVENT)\b",
+    re.I,
+)
+_WHOLE_LINE_COMMENT_RE = re.compile(r"[ \t]*--")       # also "--x" header lines (triggers.sql has one)
+_CREATE_RE = re.compile(r"\s*CREATE\b", re.I)
+_BLOCK_CLOSERS_IGNORED = {"IF", "LOOP", "WHILE", "REPEAT"}
+_patterns: dict[tuple[str, bool], re.Pattern] = {}
+
+
+def _pattern(delimiter: str, keywords: bool) -> re.Pattern:
+    """
+    Everything the scanner has to stop at, for one delimiter. The leading
+    look-ahead lets the regex engine skip uninteresting characters cheaply;
+    the block keywords are only searched for in CREATE statements.
+    """
+    key = (delimiter, keywords)
+    if key not in _patterns:
+        first = "-'\"`#/" + delimiter[0] + ("BbCcEe" if keywords else "")
+        _patterns[key] = re.compile(
+            rf"(?=[{re.escape(first)}])(?:"
+            rf"(?P<quote>['\"`])"
+            rf"|(?P<line_comment>--(?=\s|$)|\#)"
+            rf"|(?P<block_comment>/\*[!+]?)"
+            rf"|(?P<delimiter>{re.escape(delimiter)})"
+            + (rf"|(?<![\w.$@`])(?P<keyword>BEGIN|CASE|END(?:\s+(?P<closes>IF|LOOP|WHILE|REPEAT|CASE))?)(?![\w$])"
+               if keywords else "")
+            + ")",
+            re.I,
+        )
+    return _patterns[key]
+
+
+def iter_statements(source: str | Iterable[str]) -> Iterator[tuple[int, str]]:
+    """
+    Yield (first line, statement) for every statement in *source*, without
+    the trailing delimiter and surrounding whitespace. Only the statement
+    being assembled is held in memory.
+    """
+    lines = io.StringIO(source) if isinstance(source, str) else source
+
+    delimiter = ";"
+    plain = _pattern(delimiter, keywords=False)
+    scan = plain
+    parts: list[str] = []
+    first_line = 0              # 0 = nothing but whitespace collected yet
+    routine: bool | None = None # decided at the first BEGIN / CASE / END
+    depth = 0
+    quote = ""                  # open literal spanning lines
+    in_comment = False          # open /* … */ spanning lines
+
+    lineno = 0
+    for lineno, line in enumerate(lines, start=1):
+        if lineno == 1:
+            line = line.lstrip("\ufeff")
+        pos, end = 0, len(line)
+        if not quote and not in_comment and _WHOLE_LINE_COMMENT_RE.match(line):
+            if first_line:
+                parts.append("\n")
+            continue
+
+        while pos < end:
+            if quote:
+                m = _CLOSE_QUOTE[quote].match(line, pos)
+                stop = m.end() if m else end
+                parts.append(line[pos:stop])
+                pos = stop
+                if m:
+                    quote = ""
+                continue
+
+            if in_comment:
+                close = line.find("*/", pos)
+                if close < 0:
+                    pos = end
+                else:
+                    parts.append(" ")
+                    pos, in_comment = close + 2, False
+                continue
+
+            if not first_line:
+                m = _DELIMITER_RE.match(line, pos)
+                if m:
+                    delimiter = m.group(1)
+                    plain = scan = _pattern(delimiter, keywords=False)
+                    parts.clear()
+                    break
+
+            m = scan.search(line, pos)
+            stop = m.start() if m else end
+            if stop > pos:
+                chunk = line[pos:stop]
+                if not first_line and not chunk.isspace():
+                    first_line = lineno
+                    if delimiter == ";" and _CREATE_RE.match(chunk):
+                        # rescan: the chunk may already hold BEGIN on a one-line routine
+                        scan = _pattern(delimiter, keywords=True)
+                        continue
+                parts.append(chunk)
+            if m is None:
+                break
+            pos = m.end()
+
+            if m["quote"]:
+                quote = m["quote"]
+                if not first_line:
+                    first_line = lineno
+                parts.append(quote)
+            elif m["line_comment"]:
+                if line.endswith("\n"):
+                    parts.append("\n")
+                break
+            elif m["block_comment"]:
+                if len(m["block_comment"]) == 3:       # /*! … */ or /*+ … */ is executed
+                    if not first_line:
+                        first_line = lineno
+                    parts.append(m["block_comment"])
+                else:
+                    in_comment = True
+            elif m["delimiter"] is not None and (depth == 0 or delimiter != ";"):
+                statement = "".join(parts).strip()
+                if statement:
+                    yield first_line, statement
+                parts.clear()
+                first_line, routine, depth, scan = 0, None, 0, plain
+            elif m["delimiter"] is not None:
+                parts.append(m["delimiter"])
+            else:
+                word = m["keyword"]
+                parts.append(word)
+                if not first_line:
+                    first_line = lineno
+                if delimiter != ";":
+                    continue
+                if routine is None:
+                    routine = bool(_ROUTINE_HEAD_RE.match("".join(parts)))
+                if not routine:
+                    scan = plain
+                    continue
+                head = word[:5].upper()
+                if head in ("BEGIN", "CASE"):
+                    depth += 1
+                elif (m["closes"] or "").upper() not in _BLOCK_CLOSERS_IGNORED:
+                    depth = max(depth - 1, 0)
+
+    statement = "".join(parts).strip()
+    if statement:
+        yield first_line or lineno, statement
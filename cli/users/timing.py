@@ -0,0 +1,164 @@
+"""
+cli.users.timing
+================
+Per-statement timings of script runs (`db137 create-db|load-db --timings`).
+
+Every executed unit (a statement, or a coalesced multi-row INSERT) is
+classified by kind – CREATE TABLE, CREATE INDEX <table>, CREATE TRIGGER,
+INSERT <table>, … – and its wall time, affected rows and warnings are
+aggregated per kind. Only the *top* slowest units are kept individually,
+so memory stays bounded on multi-million-statement loads.
+
+Public API
+----------
+statement_kind(sql)                         → "INSERT Ticket", "CREATE INDEX Review", "CREATE TRIGGER", …
+ScriptTimings(top=10)
+ScriptTimings.record(script, line, sql, ms, rows, warnings, statements=1)
+ScriptTimings.slowest()                     → [entry, ...] slowest first
+ScriptTimings.kinds()                       → {kind: {"count", "statements", "total_ms", "max_ms", "rows", "warnings"}}
+ScriptTimings.format_report(kinds=20)       → printable top-N table + per-kind histogram
+ScriptTimings.write_report(path)            → JSON with totals, kinds and the slowest units
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import re
+import threading
+from pathlib import Path
+
+__all__ = ["statement_kind", "ScriptTimings"]
+
+REPORT_VERSION = 1
+
+_NAME = r"`?(\w+)`?(?:\s*\.\s*`?(\w+)`?)?"
+_KIND_RES = [
+    (re.compile(rf"\s*(?:INSERT|REPLACE)\s+(?:LOW_PRIORITY\s+|DELAYED\s+|HIGH_PRIORITY\s+)?(?:IGNORE\s+)?(?:INTO\s+)?{_NAME}", re.I), "INSERT"),
+    (re.compile(rf"\s*UPDATE\s+(?:LOW_PRIORITY\s+)?(?:IGNORE\s+)?{_NAME}", re.I), "UPDATE"),
+    (re.compile(rf"\s*DELETE\s+(?:LOW_PRIORITY\s+|QUICK\s+|IGNORE\s+)*FROM\s+{_NAME}", re.I), "DELETE"),
+    (re.compile(rf"\s*CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+`?\w+`?\s+ON\s+{_NAME}", re.I), "CREATE INDEX"),
+    (re.compile(rf"\s*ALTER\s+TABLE\s+{_NAME}", re.I), "ALTER TABLE"),
+    (re.compile(rf"\s*CALL\s+{_NAME}", re.I), "CALL"),
+]
+_CREATE_RE = re.compile(
+    r"\s*CREATE\s+(?:OR\s+REPLACE\s+)?(?:DEFINER\s*=\s*\S+\s+)?(?:TEMPORARY\s+)?(?:ALGORITHM\s*=\s*\w+\s+)?"
+    r"(?:SQL\s+SECURITY\s+\w+\s+)?(?:AGGREGATE\s+)?(\w+)",
+    re.I,
+)
+_VERB_RE = re.compile(r"\s*(\w+)(?:\s+(TABLE|INDEX|TRIGGER|PROCEDURE|FUNCTION|VIEW|EVENT|DATABASE|SCHEMA))?", re.I)
+
+
+def statement_kind(sql: str) -> str:
+    """
+    Histogram bucket for one statement: DML, index and ALTER statements
+    carry their table and CALL its procedure; other DDL only its object type.
+    """
+    for rx, verb in _KIND_RES:
+        m = rx.match(sql)
+        if m:
+            return f"{verb} {m.group(2) or m.group(1)}"
+    m = _CREATE_RE.match(sql)
+    if m:
+        return f"CREATE {m.group(1).upper()}"
+    m = _VERB_RE.match(sql)
+    if not m:
+        return "?"
+    return " ".join(part.upper() for part in m.groups() if part)
+
+
+class ScriptTimings:
+    """Thread-safe: parallel deployments (create-db --jobs) record into one collector."""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self._lock = threading.Lock()
+        self._heap: list[tuple[float, int, dict]] = []      # min-heap of the slowest units
+        self._seq = itertools.count()
+        self._kinds: dict[str, dict] = {}
+        self.units = self.statements = 0
+        self.total_ms = 0.0
+
+    def record(self, script: str, line: int, sql: str, ms: float, rows: int, warnings: int,
+               statements: int = 1) -> None:
+        kind = statement_kind(sql)
+        rows, warnings = max(rows or 0, 0), warnings or 0
+        with self._lock:
+            self._add(script, line, sql, kind, ms, rows, warnings, statements)
+
+    def _add(self, script: str, line: int, sql: str, kind: str, ms: float, rows: int, warnings: int,
+             statements: int) -> None:
+        agg = self._kinds.setdefault(kind, {"count": 0, "statements": 0, "total_ms": 0.0,
+                                            "max_ms": 0.0, "rows": 0, "warnings": 0})
+        agg["count"] += 1
+        agg["statements"] += statements
+        agg["total_ms"] += ms
+        agg["max_ms"] = max(agg["max_ms"], ms)
+        agg["rows"] += rows
+        agg["warnings"] += warnings
+        self.units += 1
+        self.statements += statements
+        self.total_ms += ms
+
+        if self.top <= 0 or (len(self._heap) >= self.top and ms <= self._heap[0][0]):
+            return
+        entry = {"script": script, "line": line, "kind": kind, "ms": round(ms, 3), "rows": rows,
+                 "warnings": warnings, "statements": statements,
+                 "sql": " ".join(sql[:200].split())}
+        item = (ms, next(self._seq), entry)
+        if len(self._heap) < self.top:
+            heapq.heappush(self._heap, item)
+        else:
+            heapq.heapreplace(self._heap, item)
+
+    def slowest(self) -> list[dict]:
+        return [entry for _, _, entry in sorted(self._heap, key=lambda item: -item[0])]
+
+    def kinds(self) -> dict[str, dict]:
+        """Per-kind aggregates, most expensive kind first."""
+        ordered = sorted(self._kinds.items(), key=lambda item: -item[1]["total_ms"])
+        return {kind: {**agg, "total_ms": round(agg["total_ms"], 3), "max_ms": round(agg["max_ms"], 3)}
+                for kind, agg in ordered}
+
+    def format_report(self, kinds: int = 20, width: int = 30) -> str:
+        """Slowest units, then the *kinds* most expensive kinds (all of them are in the JSON report)."""
+        lines = [f"{self.statements} statements in {self.units} executions, "
+                 f"{self.total_ms / 1000:.2f}s executing", ""]
+
+        lines.append(f"Slowest {len(self._heap)}:")
+        lines.append(f"{'ms':>10}  {'rows':>8}  {'warn':>4}  location / statement")
+        for e in self.slowest():
+            where = f"{e['script']}:{e['line']}" + (f" (+{e['statements'] - 1} coalesced)"
+                                                     if e["statements"] > 1 else "")
+            lines.append(f"{e['ms']:10.3f}  {e['rows']:>8}  {e['warnings']:>4}  {where}")
+            lines.append(f"{'':>28}{e['sql'][:90]}")
+
+        lines += ["", "By kind:"]
+        ordered = list(self.kinds().items())
+        shown = ordered[:kinds]
+        name_w = max((len(k) for k, _ in shown), default=4)
+        peak = max((agg["total_ms"] for _, agg in shown), default=0) or 1
+        lines.append(f"{'kind'.ljust(name_w)}  {'count':>7}  {'total ms':>11}  {'ms/stmt':>9}  {'max ms':>9}  {'share':>6}")
+        for kind, agg in shown:
+            share = agg["total_ms"] / self.total_ms if self.total_ms else 0.0
+            bar = "█" * max(round(width * agg["total_ms"] / peak), 1 if agg["total_ms"] else 0)
+            lines.append(f"{kind.ljust(name_w)}  {agg['statements']:>7}  {agg['total_ms']:11.3f}  "
+                         f"{agg['total_ms'] / agg['statements']:9.3f}  {agg['max_ms']:9.3f}  {share:6.1%}  {bar}")
+        if len(ordered) > len(shown):
+            rest = sum(agg["total_ms"] for _, agg in ordered[len(shown):])
+            lines.append(f"… {len(ordered) - len(shown)} more kinds, {rest:.3f} ms together")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "version": REPORT_VERSION,
+            "units": self.units,
+            "statements": self.statements,
+            "total_ms": round(self.total_ms, 3),
+            "kinds": self.kinds(),
+            "slowest": self.slowest(),
+        }
+        path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
@@ -0,0 +1,118 @@
+"""
+cli.users.trace
+===============
+Summaries of MySQL optimizer traces (information_schema.OPTIMIZER_TRACE).
+
+Public API
+----------
+summarize_trace(trace)          → {"access_paths", "rejected_indexes", "join_order"}
+format_trace_summary(summary)   → printable text block
+"""
+
+from __future__ import annotations
+
+import json
+
+__all__ = ["summarize_trace", "format_trace_summary"]
+
+
+def _walk(node, table: str | None = None, select: int | None = None):
+    """Yield (dict, enclosing table, enclosing select#) for every dict in the trace."""
+    if isinstance(node, dict):
+        if isinstance(node.get("table"), str):
+            table = node["table"]
+        if isinstance(node.get("select#"), int):
+            select = node["select#"]
+        yield node, table, select
+        for value in node.values():
+            yield from _walk(value, table, select)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item, table, select)
+
+
+def _append_unique(bucket: list[dict], entry: dict) -> None:
+    if entry not in bucket:
+        bucket.append(entry)
+
+
+def summarize_trace(trace: dict | str) -> dict:
+    """
+    Pull the decision points out of an optimizer trace:
+
+    • access_paths     – every path considered by best_access_path, per table
+                         (access type, index, rows, cost, chosen, cause)
+    • rejected_indexes – range alternatives and access paths that were not
+                         chosen, plus indexes found unusable, with cost / cause
+    • join_order       – {select#: [tables in final order]} from refine_plan
+    Entries repeated by rest_of_plan exploration are reported once.
+    """
+    if isinstance(trace, str):
+        trace = json.loads(trace)
+
+    access_paths: list[dict] = []
+    rejected: list[dict] = []
+    join_order: dict[str, list[str]] = {}
+
+    for node, table, select in _walk(trace):
+        for path in node.get("considered_access_paths", []):
+            index = path.get("index") or path.get("range_details", {}).get("used_index")
+            entry = {
+                "table": table,
+                "access_type": path.get("access_type"),
+                "index": index,
+                "rows": path.get("rows_to_scan", path.get("rows")),
+                "cost": path.get("cost"),
+                "chosen": bool(path.get("chosen")),
+            }
+            if "cause" in path:
+                entry["cause"] = path["cause"]
+            _append_unique(access_paths, entry)
+            if not entry["chosen"] and index:
+                _append_unique(rejected, {"table": table, "index": index, "via": "access path",
+                                          "rows": entry["rows"], "cost": entry["cost"],
+                                          "cause": path.get("cause")})
+
+        for alt in node.get("range_scan_alternatives", []):
+            if not alt.get("chosen", True):
+                _append_unique(rejected, {"table": table, "index": alt.get("index"), "via": "range scan",
+                                          "rows": alt.get("rows"), "cost": alt.get("cost"),
+                                          "cause": alt.get("cause")})
+
+        for idx in node.get("potential_range_indexes", []):
+            if idx.get("usable") is False:
+                _append_unique(rejected, {"table": table, "index": idx.get("index"), "via": "unusable",
+                                          "rows": None, "cost": None, "cause": idx.get("cause")})
+
+        if isinstance(node.get("refine_plan"), list):
+            key = str(select if select is not None else len(join_order) + 1)
+            join_order.setdefault(key, [step.get("table") for step in node["refine_plan"] if "table" in step])
+
+    return {"access_paths": access_paths, "rejected_indexes": rejected, "join_order": join_order}
+
+
+def _num(value) -> str:
+    return "" if value is None else f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def format_trace_summary(summary: dict) -> str:
+    lines = ["Join order:"]
+    for select, tables in summary["join_order"].items():
+        lines.append(f"  select#{select}: {' → '.join(tables) or '(none)'}")
+
+    lines.append("Considered access paths:")
+    for p in summary["access_paths"]:
+        mark = "✔" if p["chosen"] else " "
+        cause = f"  ({p['cause']})" if p.get("cause") else ""
+        figures = "".join(f" {k}={_num(p[k])}" for k in ("rows", "cost") if p[k] is not None)
+        lines.append(f"  {mark} {p['table'] or '?'}: {p['access_type']}"
+                     f"{' ' + p['index'] if p['index'] else ''}{figures}{cause}")
+
+    lines.append("Rejected indexes:")
+    if not summary["rejected_indexes"]:
+        lines.append("  (none)")
+    for r in summary["rejected_indexes"]:
+        cost = f" rows={_num(r['rows'])} cost={_num(r['cost'])}" if r["cost"] is not None else ""
+        lines.append(f"  ✘ {r['table'] or '?'}: {r['index']} [{r['via']}]{cost}"
+                     f"{'  (' + r['cause'] + ')' if r.get('cause') else ''}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,267 @@
+"""
+cli.users.validation
+====================
+Set-based replacements for the row-level validation triggers of
+triggers.sql (`db137 load-db --trusted`).
+
+During a trusted load the INSERT-time triggers that only check rows (plus
+trg_ticket_capacity_check, whose one side effect – Event.is_full – is
+recomputed by a fix-up) are dropped. Afterwards every rule below runs once
+over the loaded data as a single window / aggregate query that returns the
+keys of the violating rows. Where a rule depends on insertion order (the
+ticket that exceeded a capacity, the later of two overlapping
+performances), the row with the lower id is taken to have come first,
+which is the order load.sql inserts in. Stage overlaps are replayed in that
+order in Python (see ValidationRule.replay), since a rejected performance
+must not block the ones after it.
+
+Public API
+----------
+ValidationRule                → name, triggers, table, keys, sql, replay
+RULES                         → [ValidationRule, ...] in dependency order (parents first)
+TRUSTED_TRIGGERS              → names of the triggers the rules replace
+FIXUPS                        → [(name, sql), ...] side effects of the dropped triggers, applied in bulk
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+__all__ = ["ValidationRule", "RULES", "TRUSTED_TRIGGERS", "FIXUPS"]
+
+
+@dataclass(frozen=True)
+class ValidationRule:
+    name: str
+    triggers: tuple[str, ...]       # triggers.sql triggers this rule stands in for
+    table: str                      # table of the violating rows
+    keys: tuple[str, ...]           # key columns returned by sql (in this order)
+    sql: str                        # SELECT <keys> FROM … – one row per violating row
+    # when the verdict of a row depends on which earlier rows were rejected, sql returns the
+    # candidate rows and replay picks the violators from them in insertion order
+    replay: Callable[[Sequence[tuple]], list[tuple]] | None = None
+
+
+def _ean_checksum(column: str) -> str:
+    """EAN-13 check digit of the 13-character string *column*, as trg_validate_ticket_ean computes it."""
+    weighted = " + ".join(f"SUBSTRING({column}, {i}, 1) * {3 if i % 2 == 0 else 1}" for i in range(1, 13))
+    return f"(10 - ({weighted}) % 10) % 10"
+
+
+def _first_come_per_stage(rows: Sequence[tuple]) -> list[tuple]:
+    """
+    trg_no_stage_overlap in perf_id order: *rows* are (perf_id, stage_id,
+    start, end); a performance is rejected when it overlaps one accepted
+    before it on its stage, and a rejected one blocks nothing.
+    """
+    accepted: dict = {}
+    rejected = []
+    for perf_id, stage_id, start, end in sorted(rows, key=lambda row: row[0]):
+        booked = accepted.setdefault(stage_id, [])
+        if any(start < other_end and end > other_start for other_start, other_end in booked):
+            rejected.append((perf_id,))
+        else:
+            booked.append((start, end))
+    return rejected
+
+
+# Consecutive festival years per artist, numbered inside each run (islands and gaps)
+_ARTIST_RUNS = """
+    WITH years AS (
+        SELECT DISTINCT pa.artist_id, e.fest_year AS y
+        FROM   Performance_Artist pa
+        JOIN   Performance p ON p.perf_id  = pa.perf_id
+        JOIN   Event       e ON e.event_id = p.event_id
+    ),
+    runs AS (
+        SELECT artist_id, y, ROW_NUMBER() OVER (PARTITION BY artist_id, grp ORDER BY y) AS pos
+        FROM  (SELECT artist_id, y,
+                      CAST(y AS SIGNED) - ROW_NUMBER() OVER (PARTITION BY artist_id ORDER BY y) AS grp
+               FROM years) g
+    )"""
+
+RULES: list[ValidationRule] = [
+    ValidationRule(
+        "event inside festival dates", ("trg_event_within_festival_dates",), "Event", ("event_id",),
+        """SELECT e.event_id
+           FROM   Event e JOIN Festival f ON f.fest_year = e.fest_year
+           WHERE  DATE(e.start_dt) < f.start_date OR DATE(e.start_dt) > f.end_date""",
+    ),
+    ValidationRule(
+        "performance inside event window", ("trg_performance_inside_event",), "Performance", ("perf_id",),
+        """SELECT p.perf_id
+           FROM   Performance p JOIN Event e ON e.event_id = p.event_id
+           WHERE  p.datetime < e.start_dt
+              OR  ADDDATE(p.datetime, INTERVAL p.duration MINUTE) > e.end_dt""",
+    ),
+    ValidationRule(
+        "no stage overlap", ("trg_no_stage_overlap",), "Performance", ("perf_id",),
+        # every performance that overlaps another one on its stage; the replay keeps the
+        # lower perf_id of each clash and lets a rejected one block nothing, as the trigger did
+        """SELECT p.perf_id, p.stage_id, p.datetime, ADDDATE(p.datetime, INTERVAL p.duration MINUTE)
+           FROM   Performance p
+           WHERE  EXISTS (SELECT 1
+                          FROM   Performance o
+                          WHERE  o.stage_id = p.stage_id
+                            AND  o.perf_id <> p.perf_id
+                            AND  p.datetime < ADDDATE(o.datetime, INTERVAL o.duration MINUTE)
+                            AND  ADDDATE(p.datetime, INTERVAL p.duration MINUTE) > o.datetime)""",
+        replay=_first_come_per_stage,
+    ),
+    ValidationRule(
+        "band on one stage at a time", ("trg_no_double_stage_band",), "Performance_Band", ("perf_id",),
+        """SELECT perf_id
+           FROM  (SELECT pb.perf_id, p.stage_id,
+                         FIRST_VALUE(p.stage_id) OVER (
+                             PARTITION BY pb.band_id, p.datetime ORDER BY pb.perf_id) AS first_stage
+                  FROM   Performance_Band pb JOIN Performance p ON p.perf_id = pb.perf_id) x
+           WHERE  stage_id <> first_stage""",
+    ),
+    ValidationRule(
+        "band members within 3 consecutive years", ("trg_max_consecutive_years_band",),
+        "Performance_Band", ("perf_id",),
+        _ARTIST_RUNS + """
+           SELECT DISTINCT pb.perf_id
+           FROM   Performance_Band pb
+           JOIN   Performance p  ON p.perf_id  = pb.perf_id
+           JOIN   Event       e  ON e.event_id = p.event_id
+           JOIN   Band_Member bm ON bm.band_id = pb.band_id
+           JOIN   runs        r  ON r.artist_id = bm.artist_id AND r.y = e.fest_year
+           WHERE  r.pos >= 4""",
+    ),
+    ValidationRule(
+        "artists belong to the performance's band",
+        ("trg_band_validate_before_ins", "trg_artist_validate_before_ins"), "Performance_Artist",
+        ("perf_id", "artist_id"),
+        """SELECT pa.perf_id, pa.artist_id
+           FROM   Performance_Artist pa
+           JOIN   Performance_Band   pb ON pb.perf_id = pa.perf_id
+           WHERE  NOT EXISTS (SELECT 1 FROM Band_Member bm
+                              WHERE bm.band_id = pb.band_id AND bm.artist_id = pa.artist_id)""",
+    ),
+    ValidationRule(
+        "band-less artists share a band", ("trg_artist_validate_before_ins",), "Performance_Artist",
+        ("perf_id", "artist_id"),
+        """WITH solo AS (
+               SELECT pa.perf_id, COUNT(*) AS artists, MIN(pa.artist_id) AS first_artist
+               FROM   Performance_Artist pa
+               WHERE  NOT EXISTS (SELECT 1 FROM Performance_Band pb WHERE pb.perf_id = pa.perf_id)
+               GROUP BY pa.perf_id
+               HAVING COUNT(*) > 1
+           ),
+           shared AS (
+               SELECT DISTINCT s.perf_id
+               FROM   solo s
+               JOIN   Performance_Artist pa ON pa.perf_id   = s.perf_id
+               JOIN   Band_Member        bm ON bm.artist_id = pa.artist_id
+               GROUP BY s.perf_id, bm.band_id, s.artists
+               HAVING COUNT(*) = s.artists
+           )
+           SELECT pa.perf_id, pa.artist_id
+           FROM   Performance_Artist pa JOIN solo s ON s.perf_id = pa.perf_id
+           WHERE  pa.artist_id <> s.first_artist
+             AND  pa.perf_id NOT IN (SELECT perf_id FROM shared)""",
+    ),
+    ValidationRule(
+        "artist on one stage at a time", ("trg_no_double_stage_artist",), "Performance_Artist",
+        ("perf_id", "artist_id"),
+        """SELECT perf_id, artist_id
+           FROM  (SELECT pa.perf_id, pa.artist_id, p.stage_id,
+                         FIRST_VALUE(p.stage_id) OVER (
+                             PARTITION BY pa.artist_id, p.datetime ORDER BY pa.perf_id) AS first_stage
+                  FROM   Performance_Artist pa JOIN Performance p ON p.perf_id = pa.perf_id) x
+           WHERE  stage_id <> first_stage""",
+    ),
+    ValidationRule(
+        "artist within 3 consecutive years", ("trg_max_consecutive_years_artist",), "Performance_Artist",
+        ("perf_id", "artist_id"),
+        _ARTIST_RUNS + """
+           SELECT pa.perf_id, pa.artist_id
+           FROM   Performance_Artist pa
+           JOIN   Performance p ON p.perf_id  = pa.perf_id
+           JOIN   Event       e ON e.event_id = p.event_id
+           JOIN   runs        r ON r.artist_id = pa.artist_id AND r.y = e.fest_year
+           WHERE  r.pos >= 4""",
+    ),
+    ValidationRule(
+        "artist sub-genre matches a genre", ("trg_artist_subgenre_consistency",), "Artist_SubGenre",
+        ("artist_id", "sub_genre_id"),
+        """SELECT asg.artist_id, asg.sub_genre_id
+           FROM   Artist_SubGenre asg JOIN SubGenre sg ON sg.sub_genre_id = asg.sub_genre_id
+           WHERE  NOT EXISTS (SELECT 1 FROM Artist_Genre ag
+                              WHERE ag.artist_id = asg.artist_id AND ag.genre_id = sg.genre_id)""",
+    ),
+    ValidationRule(
+        "band sub-genre matches a genre", ("trg_band_subgenre_consistency",), "Band_SubGenre",
+        ("band_id", "sub_genre_id"),
+        """SELECT bsg.band_id, bsg.sub_genre_id
+           FROM   Band_SubGenre bsg JOIN SubGenre sg ON sg.sub_genre_id = bsg.sub_genre_id
+           WHERE  NOT EXISTS (SELECT 1 FROM Band_Genre bg
+                              WHERE bg.band_id = bsg.band_id AND bg.genre_id = sg.genre_id)""",
+    ),
+    ValidationRule(
+        "valid EAN-13", ("trg_validate_ticket_ean",), "Ticket", ("ticket_id",),
+        f"""SELECT ticket_id
+            FROM  (SELECT ticket_id, LPAD(ean_number, 13, '0') AS ean FROM Ticket) t
+            WHERE  ean NOT REGEXP '^[0-9]{{13}}$'
+               OR  {_ean_checksum("ean")} <> SUBSTRING(ean, 13, 1)""",
+    ),
+    ValidationRule(
+        "ticket bought before the event", ("trg_validate_ticket_purchase_date",), "Ticket", ("ticket_id",),
+        """SELECT t.ticket_id
+           FROM   Ticket t JOIN Event e ON e.event_id = t.event_id
+           WHERE  t.purchase_date >= e.start_dt""",
+    ),
+    ValidationRule(
+        "event capacity", ("trg_ticket_capacity_check",), "Ticket", ("ticket_id",),
+        """SELECT ticket_id
+           FROM  (SELECT t.ticket_id, s.capacity,
+                         ROW_NUMBER() OVER (PARTITION BY t.event_id ORDER BY t.ticket_id) AS nth
+                  FROM   Ticket t
+                  JOIN   Event  e ON e.event_id = t.event_id
+                  JOIN   Stage  s ON s.stage_id = e.stage_id) x
+           WHERE  nth > capacity""",
+    ),
+    ValidationRule(
+        "VIP tickets at most 10 % of capacity", ("trg_check_vip_ticket_limit",), "Ticket", ("ticket_id",),
+        """SELECT ticket_id
+           FROM  (SELECT t.ticket_id, s.capacity,
+                         ROW_NUMBER() OVER (PARTITION BY t.event_id ORDER BY t.ticket_id) AS nth
+                  FROM   Ticket t
+                  JOIN   Ticket_Type tt ON tt.type_id  = t.type_id AND tt.name = 'VIP'
+                  JOIN   Event       e  ON e.event_id  = t.event_id
+                  JOIN   Stage       s  ON s.stage_id  = e.stage_id) x
+           WHERE  nth > CEIL(capacity * 0.10)""",
+    ),
+    ValidationRule(
+        "resale only of active tickets", ("trg_resale_offer_only_active",), "Resale_Offer", ("offer_id",),
+        """SELECT ro.offer_id
+           FROM   Resale_Offer ro
+           JOIN   Ticket        t  ON t.ticket_id = ro.ticket_id
+           JOIN   Ticket_Status ts ON ts.status_id = t.status_id
+           WHERE  ts.name <> 'active'""",
+    ),
+    ValidationRule(
+        "review needs a used ticket", ("trg_review_only_with_used_ticket",), "Review", ("review_id",),
+        """SELECT r.review_id
+           FROM   Review r JOIN Performance p ON p.perf_id = r.perf_id
+           WHERE  NOT EXISTS (SELECT 1
+                              FROM   Ticket t JOIN Ticket_Status ts ON ts.status_id = t.status_id
+                              WHERE  t.attendee_id = r.attendee_id
+                                AND  t.event_id    = p.event_id
+                                AND  ts.name       = 'used')""",
+    ),
+]
+
+TRUSTED_TRIGGERS: tuple[str, ...] = tuple(dict.fromkeys(t for rule in RULES for t in rule.triggers))
+
+FIXUPS: list[tuple[str, str]] = [
+    # trg_ticket_capacity_check marks an event full when its last seat is sold
+    ("Event.is_full", """UPDATE Event e
+                         JOIN   Stage s ON s.stage_id = e.stage_id
+                         JOIN  (SELECT event_id, COUNT(*) AS sold FROM Ticket GROUP BY event_id) t
+                                ON t.event_id = e.event_id
+                         SET    e.is_full = TRUE
+                         WHERE  t.sold >= s.capacity AND NOT e.is_full"""),
+]
@@ -9,6 +9,8 @@ faker.py – Pulse University demo seeder (2024-2025)
 """
 
 from __future__ import annotations
+import gzip
+import lzma
 import os
 import sys
 import random
@@ -58,16 +60,32 @@ STAGES_PER_YEAR          = 3          # 3 stages × 12 yrs = 36 ≥ 30
 N_ART, N_BAND            = 45, 10     # 55 performers ≥ 50
 N_SEC, N_SUP, N_ATT      = 20, 10, 2000
 
+# "" writes plain load.sql; gz / xz / zst write load.sql.<ext> (db137 load-db reads all four)
+LOAD_SQL_COMPRESS        = os.getenv("LOAD_SQL_COMPRESS", "").strip().lower().lstrip(".")
+if LOAD_SQL_COMPRESS not in ("", "gz", "xz", "zst"):
+    sys.exit(f"LOAD_SQL_COMPRESS must be gz, xz or zst (got {LOAD_SQL_COMPRESS!r})")
+
 random.seed(SEED)
 
 # ───────────────────────── CONNECT, CURSOR & PREPARE LOAD.SQL
 cnx = mysql.connector.connect(**DB)
 cur = cnx.cursor(dictionary=True)
 
+def open_load_sql(path: str):
+    """Text stream for load.sql, compressed by suffix while it is written."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if path.endswith(".xz"):
+        return lzma.open(path, "wt", encoding="utf-8")
+    if path.endswith(".zst"):
+        import zstandard  # optional, only needed for LOAD_SQL_COMPRESS=zst
+        return zstandard.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
 load_sql_path = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../../sql/load.sql")
-)
-f = open(load_sql_path, "w", encoding="utf-8")
+) + (f".{LOAD_SQL_COMPRESS}" if LOAD_SQL_COMPRESS else "")
+f = open_load_sql(load_sql_path)
 f.write("USE pulse_university;\n")
 
 def write_sql(stmt: str, params: tuple = None):
@@ -1615,7 +1633,7 @@ f.close()
 cnx.commit()
 cur.close()
 cnx.close()
-print("\nAll SQL written to sql/load.sql\n")
+print(f"\nAll SQL written to sql/{os.path.basename(load_sql_path)}\n")
 
 # ───────────────────────── SUMMARY LOG TO db_data.txt
 print("→ logging DB row counts to db_data.txt")
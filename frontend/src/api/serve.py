@@ -15,6 +15,7 @@ cli_path = Path(__file__).resolve().parents[3] / "cli"
 sys.path.append(str(cli_path))
 
 from users.manager import UserManager
+from users.explain import folded_stacks, self_time_ranking
 from table_defs import get_create_statement
 from sql_parser import get_definition
 from cli.db137 import cli
@@ -28,6 +29,7 @@ app.register_blueprint(cli_bp)
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = int(os.getenv("DB_PORT", "3306"))
 DEFAULT_DB = os.getenv("DB_NAME", "pulse_university")
+QUERIES_DIR = cli_path.parent / "sql" / "queries"
 
 @app.route("/api/login", methods=["POST"])
 def login():
@@ -35,17 +37,19 @@ def login():
 	username = data.get("username")
 	password = data.get("password")
 
+	um = UserManager(
+		root_user=username,
+		root_pass=password,
+		host=DB_HOST,
+		port=DB_PORT
+	)
 	try:
-		um = UserManager(
-			root_user=username,
-			root_pass=password,
-			host=DB_HOST,
-			port=DB_PORT
-		)
 		um.whoami()
 		return jsonify({"token": f"{username}:{password}"})
 	except mysql.connector.Error:
 		return jsonify({"error": "Invalid credentials"}), 401
+	finally:
+		um.close()
 
 @app.route("/api/schema", methods=["POST"])
 def schema():
@@ -53,19 +57,22 @@ def schema():
 	username, password = token.split(":", 1)
 
 	um = UserManager(root_user=username, root_pass=password)
-	with um._connect() as conn, conn.cursor() as cur:
-		cur.execute(f"USE {DEFAULT_DB}")
-		cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
-		tables = [row[0] for row in cur.fetchall()]
+	try:
+		with um._connect() as conn, conn.cursor() as cur:
+			cur.execute(f"USE {DEFAULT_DB}")
+			cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+			tables = [row[0] for row in cur.fetchall()]
 
-		cur.execute("SHOW FULL TABLES WHERE Table_type = 'VIEW'")
-		views = [row[0] for row in cur.fetchall()]
+			cur.execute("SHOW FULL TABLES WHERE Table_type = 'VIEW'")
+			views = [row[0] for row in cur.fetchall()]
 
-		cur.execute("SHOW TRIGGERS")
-		triggers = [row[0] for row in cur.fetchall()]
+			cur.execute("SHOW TRIGGERS")
+			triggers = [row[0] for row in cur.fetchall()]
 
-		cur.execute("SHOW PROCEDURE STATUS WHERE Db = %s", (DEFAULT_DB,))
-		procedures = [row[1] for row in cur.fetchall()]
+			cur.execute("SHOW PROCEDURE STATUS WHERE Db = %s", (DEFAULT_DB,))
+			procedures = [row[1] for row in cur.fetchall()]
+	finally:
+		um.close()
 
 	return jsonify({
 		"tables": tables,
@@ -80,14 +87,17 @@ def browse(table):
 	username, password = token.split(":", 1)
 
 	um = UserManager(root_user=username, root_pass=password, host=DB_HOST, port=DB_PORT)
-	with um._connect() as conn, conn.cursor(dictionary=True) as cur:
-		try:
-			cur.execute(f"USE {DEFAULT_DB}")
-			cur.execute(f"SELECT * FROM `{table}` LIMIT 100")
-			rows = cur.fetchall()
-			return jsonify(rows)
-		except Exception as e:
-			return jsonify({"error": str(e)}), 400
+	try:
+		with um._connect() as conn, conn.cursor(dictionary=True) as cur:
+			try:
+				cur.execute(f"USE {DEFAULT_DB}")
+				cur.execute(f"SELECT * FROM `{table}` LIMIT 100")
+				rows = cur.fetchall()
+				return jsonify(rows)
+			except Exception as e:
+				return jsonify({"error": str(e)}), 400
+	finally:
+		um.close()
 
 @app.route("/api/query", methods=["POST"])
 def run_query():
@@ -99,22 +109,69 @@ def run_query():
 		return jsonify({"error": "Query is empty"}), 400
 
 	um = UserManager(root_user=username, root_pass=password, host=DB_HOST, port=DB_PORT)
-	with um._connect() as conn:
-		is_select = sql.lower().startswith("select")
-		cursor_class = conn.cursor(dictionary=True) if is_select else conn.cursor()
+	try:
+		with um._connect() as conn:
+			is_select = sql.lower().startswith("select")
+			cursor_class = conn.cursor(dictionary=True) if is_select else conn.cursor()
+
+			with cursor_class as cur:
+				try:
+					cur.execute(f"USE {DEFAULT_DB}")
+					cur.execute(sql)
+					if is_select:
+						rows = cur.fetchall()
+						return jsonify(rows)
+					else:
+						conn.commit()
+						return jsonify({"status": "OK"})
+				except Exception as e:
+					return jsonify({"error": str(e)}), 400
+	finally:
+		um.close()
+
+@app.route("/api/profile", methods=["POST"])
+def profile():
+	"""
+	EXPLAIN ANALYZE profile of either {"sql": "..."} or {"query": 4}.
+	Returns one entry per plan: the typed tree, a self-time ranking and folded stacks.
+	"""
+	token = request.headers.get("Authorization", "")
+	if ":" not in token:
+		return jsonify({"error": "Missing auth token"}), 401
+	username, password = token.split(":", 1)
+	data = request.get_json() or {}
 
-		with cursor_class as cur:
-			try:
-				cur.execute(f"USE {DEFAULT_DB}")
-				cur.execute(sql)
-				if is_select:
-					rows = cur.fetchall()
-					return jsonify(rows)
-				else:
-					conn.commit()
-					return jsonify({"status": "OK"})
-			except Exception as e:
-				return jsonify({"error": str(e)}), 400
+	um = UserManager(root_user=username, root_pass=password, host=DB_HOST, port=DB_PORT)
+	try:
+		if data.get("sql", "").strip():
+			trees = {"query": um.profile_sql(data["sql"], database=DEFAULT_DB)}
+		else:
+			q = int(data.get("query", 0))
+			sql_path = QUERIES_DIR / f"Q{q:02d}.sql"
+			if not sql_path.exists():
+				return jsonify({"error": f"Unknown query Q{q:02d}"}), 404
+			trees = um.profile_query_file(sql_path, database=DEFAULT_DB, multi_plan=q in (4, 6))
+	except (ValueError, mysql.connector.Error, click.ClickException) as e:
+		return jsonify({"error": str(e)}), 400
+	finally:
+		um.close()
+
+	return jsonify({
+		"plans": [
+			{
+				"name": name,
+				"total_ms": round(tree.total_ms, 4),
+				"tree": tree.to_dict(),
+				"ranking": [
+					{"operator": node.operator, "self_ms": round(self_ms, 4), "total_ms": round(node.total_ms, 4),
+					 "est_rows": node.est_rows, "actual_rows": node.actual_rows, "loops": node.loops}
+					for node, self_ms in self_time_ranking(tree)
+				],
+				"folded": folded_stacks(tree),
+			}
+			for name, tree in trees.items()
+		]
+	})
 
 @app.route("/api/definition/<table>", methods=["GET"])
 def definition(table):
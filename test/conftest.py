@@ -0,0 +1,10 @@
+"""Shared pytest setup: the repository root on sys.path, so `cli.users` imports without installing."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SQL_DIR = ROOT / "sql"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -1,5 +1,5 @@
 #!/bin/bash
-# test_cli.sh – Tests db137 user commands on pulse_university
+# test_cli.sh – Tests db137 user and database commands on pulse_university
 
 set +H  # Disable Bash history expansion (!)
 
@@ -161,6 +161,55 @@ test_cmd "Allow testuser2 to change their own password" \
 test_cmd "Verify login as testuser2 with new password" \
     env DB_ROOT_USER=$USER2 DB_ROOT_PASS='Changed567!' $DB137 users whoami
 
+# --------- Schema deployment, loading, queries and snapshots ---------
+echo "========== DATABASE SETUP TESTS =========="
+echo
+
+test_cmd "Create DB with parallel deployment" \
+    $DB137 create-db --jobs 4
+
+test_cmd "Incremental create-db with no changes" \
+    $DB137 create-db --incremental
+
+test_cmd "Record fingerprints with --baseline" \
+    $DB137 create-db --baseline
+
+test_cmd "EXPECT_FAIL: Reject --incremental with --no-indexes" \
+    $DB137 create-db --incremental --no-indexes
+
+test_cmd "Load with deferred indexes" \
+    $DB137 load-db --defer-indexes --jobs 4
+
+test_cmd "Trusted load with set-based validation" \
+    $DB137 load-db --trusted
+
+test_cmd "EXPECT_FAIL: Reject --on-violation without --trusted" \
+    $DB137 load-db --on-violation delete
+
+test_cmd "Trusted load with bulk profile" \
+    $DB137 load-db --trusted --profile bulk
+
+test_cmd "Run Q1 without the result cache" \
+    $DB137 q 1 --no-cache
+
+test_cmd "Run Q1 through the result cache" \
+    $DB137 q 1
+
+test_cmd "Save snapshot" \
+    $DB137 snapshot save cli_test --replace
+
+test_cmd "List snapshots" \
+    $DB137 snapshot list
+
+test_cmd "Reset DB from snapshot" \
+    $DB137 reset-db --snapshot cli_test
+
+test_cmd "EXPECT_FAIL: Restore a missing snapshot" \
+    $DB137 snapshot restore no_such_snapshot --yes
+
+test_cmd "Drop snapshot" \
+    $DB137 snapshot drop cli_test --yes
+
 # --------- Cleanup ---------
 test_cmd "Drop all test users" \
     $DB137 users drop-all
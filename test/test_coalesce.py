@@ -0,0 +1,39 @@
+"""cli.users.manager._coalesce_inserts – multi-row INSERTs bounded by max_allowed_packet."""
+
+from cli.users.manager import _coalesce_inserts
+
+
+def test_merges_consecutive_rows_of_one_table():
+    statements = [
+        (1, "INSERT INTO t (a, b) VALUES (1, 'x')"),
+        (2, "INSERT INTO t (a, b) VALUES (2, 'y')"),
+        (3, "INSERT INTO u (a) VALUES (3)"),
+        (4, "UPDATE t SET a = 1"),
+        (5, "INSERT INTO t (a, b) VALUES (5, 'z')"),
+    ]
+    units = list(_coalesce_inserts(statements, 1 << 20))
+    assert [sql for sql, _ in units] == [
+        "INSERT INTO t (a, b) VALUES (1, 'x'),\n(2, 'y')",
+        "INSERT INTO u (a) VALUES (3)",
+        "UPDATE t SET a = 1",
+        "INSERT INTO t (a, b) VALUES (5, 'z')",
+    ]
+    assert units[0][1] == statements[:2]
+    assert [line for _, members in units for line, _ in members] == [1, 2, 3, 4, 5]
+
+
+def test_units_stay_below_the_packet_limit():
+    statements = [(i, f"INSERT INTO t (a) VALUES ({i})") for i in range(100)]
+    units = list(_coalesce_inserts(statements, 60))
+    assert len(units) > 1
+    assert all(len(sql.encode("utf-8")) <= 60 for sql, _ in units)
+    assert sum(len(members) for _, members in units) == 100
+
+
+def test_row_larger_than_the_limit_is_sent_alone():
+    big = "x" * 200
+    statements = [(1, "INSERT INTO t (a) VALUES ('a')"), (2, f"INSERT INTO t (a) VALUES ('{big}')"),
+                  (3, "INSERT INTO t (a) VALUES ('b')")]
+    units = list(_coalesce_inserts(statements, 100))
+    assert [members for _, members in units] == [[statements[0]], [statements[1]], [statements[2]]]
+    assert units[1][0] == statements[1][1]
@@ -0,0 +1,72 @@
+"""cli.users.deploy.deploy_plan on the real create-db scripts."""
+
+import re
+from collections import Counter
+
+import pytest
+
+from cli.users.deploy import critical_path, deploy_plan
+from cli.users.schema import table_dependencies
+from cli.users.splitter import iter_statements
+
+from conftest import SQL_DIR
+
+SCRIPTS = ["indexing.sql", "procedures.sql", "triggers.sql", "views.sql"]
+CREATE_INDEX = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+\S+\s+ON\s+`?(\w+)", re.I)
+
+
+def read(name: str) -> list[tuple[int, str]]:
+    with (SQL_DIR / name).open(encoding="utf-8") as fp:
+        return list(iter_statements(fp))
+
+
+@pytest.fixture(scope="module")
+def plan():
+    tables = table_dependencies((SQL_DIR / "install.sql").read_text(encoding="utf-8"))
+    return deploy_plan([(SQL_DIR / name, read(name)) for name in SCRIPTS],
+                       database="pulse_university", tables=tables)
+
+
+def test_every_statement_belongs_to_one_object(plan):
+    assert "STATEMENTS" not in {obj.kind for obj in plan}
+    members = sum(len(obj.members) for obj in plan)
+    assert members == sum(len(read(name)) for name in SCRIPTS) - sum(
+        1 for name in SCRIPTS for _, stmt in read(name) if stmt.upper().startswith("USE "))
+
+
+def test_object_kinds(plan):
+    kinds = Counter(obj.kind for obj in plan)
+    indexed = {m.group(1) for _, stmt in read("indexing.sql") if (m := CREATE_INDEX.match(stmt))}
+    assert kinds["TABLE"] == len(indexed)
+    assert kinds["VIEW"] > 0 and kinds["TRIGGER"] > 0 and kinds["PROCEDURE"] > 0
+
+
+def test_prerequisites_come_first(plan):
+    assert [obj.index for obj in plan] == list(range(len(plan)))
+    assert all(i < obj.index for obj in plan for i in obj.after)
+
+
+def test_index_helper_wraps_the_index_objects(plan):
+    helper = [obj for obj in plan if obj.kind == "PROCEDURE" and obj.name == "DropIndexIfExists"]
+    assert len(helper) == 2                                   # created first, dropped at the end
+    tables = [obj for obj in plan if obj.kind == "TABLE"]
+    assert all(helper[0].index in obj.after for obj in tables)
+    assert {obj.index for obj in tables} <= helper[1].after
+
+
+def test_views_wait_for_the_views_they_read(plan):
+    by_name = {obj.name: obj for obj in plan if obj.kind == "VIEW"}
+    detail = by_name["View_Performance_Detail"]
+    assert detail.index in by_name["View_Genre_Year_Counts"].after
+
+
+def test_triggers_wait_for_the_procedures_they_call(plan):
+    check = next(obj for obj in plan if obj.kind == "PROCEDURE" and obj.name == "check_staff_ratio")
+    callers = [obj for obj in plan if obj.kind == "TRIGGER" and check.index in obj.after]
+    assert callers
+
+
+def test_critical_path_is_a_dependency_chain(plan):
+    path = critical_path(plan)
+    assert path
+    assert all(earlier.index in later.after for earlier, later in zip(path, path[1:]))
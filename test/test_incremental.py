@@ -0,0 +1,87 @@
+"""cli.users.incremental – object fingerprints and plan_changes on the real create-db scripts."""
+
+from pathlib import Path
+
+import pytest
+
+from cli.users.incremental import schema_objects, plan_changes
+from cli.users.splitter import iter_statements
+
+from conftest import SQL_DIR
+
+SCRIPTS = ["indexing.sql", "procedures.sql", "triggers.sql", "views.sql"]
+
+
+def objects_of(texts: dict[str, str]):
+    def parsed(name):
+        return Path(name), list(iter_statements(texts[name]))
+    return schema_objects(parsed("install.sql"), [parsed(name) for name in SCRIPTS], database="pulse_university")
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return {name: (SQL_DIR / name).read_text(encoding="utf-8") for name in ["install.sql", *SCRIPTS]}
+
+
+@pytest.fixture(scope="module")
+def recorded(texts):
+    return {key: obj.fingerprint for key, obj in objects_of(texts).items()}
+
+
+def edited(texts, name, old, new):
+    assert old in texts[name]
+    return {**texts, name: texts[name].replace(old, new, 1)}
+
+
+def test_inventory(texts):
+    objects = objects_of(texts)
+    kinds = {kind for kind, _ in objects}
+    assert kinds == {"TABLE", "DATA", "INDEX", "PROCEDURE", "TRIGGER", "VIEW"}
+    assert ("PROCEDURE", "DropIndexIfExists") not in objects       # indexing.sql drops it again
+    assert ("INDEX", "Ticket.idx_ticket_attendee_event") in objects
+
+
+def test_unchanged_scripts_redeploy_nothing(texts, recorded):
+    assert plan_changes(objects_of(texts), recorded) == ([], [])
+
+
+def test_comments_and_whitespace_do_not_count(texts, recorded):
+    changed = edited(texts, "views.sql", "CREATE", "-- reviewed\n   CREATE")
+    assert plan_changes(objects_of(changed), recorded) == ([], [])
+
+
+def test_changed_view_takes_its_dependents_along(texts, recorded):
+    changed = edited(texts, "views.sql", "CREATE VIEW View_Performance_Detail AS\nSELECT",
+                     "CREATE VIEW View_Performance_Detail AS\nSELECT 1 AS extra,")
+    redeploy, removed = plan_changes(objects_of(changed), recorded)
+    assert redeploy == [("VIEW", "View_Performance_Detail"), ("VIEW", "View_Genre_Year_Counts")]
+    assert removed == []
+
+
+def test_changed_procedure_takes_its_triggers_along(texts, recorded):
+    objects = objects_of(texts)
+    check = objects[("PROCEDURE", "check_staff_ratio")]
+    stale = {**recorded, check.key: "0" * 64}
+    redeploy, _ = plan_changes(objects, stale)
+    assert redeploy[0] == check.key
+    assert {kind for kind, _ in redeploy[1:]} == {"TRIGGER"}
+    assert all(check.key in objects[key].needs for key in redeploy[1:])
+
+
+def test_new_and_removed_objects(texts, recorded):
+    objects = objects_of(texts)
+    gone = ("INDEX", "Ticket.idx_ticket_attendee_event")
+    del objects[gone]
+    redeploy, removed = plan_changes(objects, {**recorded, ("VIEW", "View_Old"): "0" * 64})
+    assert redeploy == []
+    assert removed == [gone, ("VIEW", "View_Old")]
+    redeploy, removed = plan_changes(objects_of(texts), {k: v for k, v in recorded.items() if k != gone})
+    assert (redeploy, removed) == ([gone], [])
+
+
+def test_table_edit_changes_only_that_table(texts, recorded):
+    objects = objects_of(texts)
+    table = next(key for key in objects if key[0] == "TABLE")
+    stmt = objects[table].statements[0][1]
+    changed = edited(texts, "install.sql", stmt, stmt.replace("(", "(\n  note VARCHAR(10),", 1))
+    assert plan_changes(objects_of(changed), recorded) == ([table], [])
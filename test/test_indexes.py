@@ -0,0 +1,37 @@
+"""cli.users.deploy.secondary_indexes – CREATE INDEX rewritten as grouped ALTER TABLE clauses."""
+
+import re
+
+from cli.users.deploy import secondary_indexes
+from cli.users.splitter import iter_statements
+
+from conftest import SQL_DIR
+
+
+def test_groups_clauses_by_table_in_script_order():
+    statements = [
+        (1, "USE shop"),
+        (2, "CREATE INDEX idx_a ON Orders (a)"),
+        (3, "CALL DropIndexIfExists('Items', 'idx_b')"),
+        (4, "CREATE UNIQUE INDEX idx_b ON Items (b) ALGORITHM=INPLACE LOCK=NONE"),
+        (5, "CREATE INDEX idx_c ON other.Orders (c, d)"),
+        (6, "CREATE INDEX idx_d ON Orders (d)"),
+    ]
+    assert secondary_indexes(statements) == {
+        ("shop", "Orders"): [(2, "idx_a", "ADD INDEX `idx_a` (a)"), (6, "idx_d", "ADD INDEX `idx_d` (d)")],
+        ("shop", "Items"): [(4, "idx_b", "ADD UNIQUE INDEX `idx_b` (b)")],
+        ("other", "Orders"): [(5, "idx_c", "ADD INDEX `idx_c` (c, d)")],
+    }
+
+
+def test_database_applies_before_the_first_use():
+    assert list(secondary_indexes([(1, "CREATE INDEX i ON T (x)")], database="db")) == [("db", "T")]
+
+
+def test_every_index_of_indexing_sql_is_kept():
+    with (SQL_DIR / "indexing.sql").open(encoding="utf-8") as fp:
+        statements = list(iter_statements(fp))
+    indexes = secondary_indexes(statements, database="pulse_university")
+    created = [stmt for _, stmt in statements if re.match(r"CREATE\s+(?:UNIQUE\s+)?INDEX\b", stmt, re.I)]
+    assert sum(len(clauses) for clauses in indexes.values()) == len(created)
+    assert all(clause.startswith("ADD ") for clauses in indexes.values() for _, _, clause in clauses)
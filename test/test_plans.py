@@ -0,0 +1,17 @@
+"""cli.users.plans – statement splitting and the query check used before EXPLAIN ANALYZE."""
+
+from cli.users.plans import is_query, split_statements
+
+
+def test_split_drops_comments_and_empty_input():
+    assert split_statements("-- note\n/* block */\nSELECT 1;\n") == ["SELECT 1"]
+    assert split_statements("-- only a comment\n   \n") == []
+
+
+def test_only_select_and_with_are_queries():
+    assert is_query("SELECT 1")
+    assert is_query("  (SELECT 1) UNION (SELECT 2)")
+    assert is_query("with t AS (SELECT 1) SELECT * FROM t")
+    assert not is_query("DELETE FROM t")
+    assert not is_query("UPDATE t SET a = (SELECT 1)")
+    assert not is_query("")
@@ -0,0 +1,68 @@
+"""cli.users.splitter.iter_statements – edge cases of the statement splitter."""
+
+from cli.users.splitter import iter_statements
+
+
+def statements(sql: str) -> list[str]:
+    return [stmt for _, stmt in iter_statements(sql)]
+
+
+def test_semicolons_inside_quotes_do_not_split():
+    assert statements("INSERT INTO t VALUES ('a;b', \"c;d\");\nSELECT 1;") == [
+        "INSERT INTO t VALUES ('a;b', \"c;d\")",
+        "SELECT 1",
+    ]
+
+
+def test_doubled_quotes():
+    assert statements("INSERT INTO t VALUES ('it''s; fine');SELECT 2;") == [
+        "INSERT INTO t VALUES ('it''s; fine')",
+        "SELECT 2",
+    ]
+
+
+def test_backslash_escapes():
+    assert statements("INSERT INTO t VALUES ('a\\'; b');SELECT 3;") == [
+        "INSERT INTO t VALUES ('a\\'; b')",
+        "SELECT 3",
+    ]
+
+
+def test_backticked_identifier_with_semicolon():
+    assert statements("SELECT `odd;name` FROM t;SELECT 4;") == ["SELECT `odd;name` FROM t", "SELECT 4"]
+
+
+def test_delimiter_directive():
+    sql = "DELIMITER $$\nCREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 2;\nEND$$\nDELIMITER ;\nSELECT 4;"
+    assert list(iter_statements(sql)) == [
+        (2, "CREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 2;\nEND"),
+        (8, "SELECT 4"),
+    ]
+
+
+def test_routine_body_without_delimiter_keeps_if_end_if_together():
+    sql = ("CREATE TRIGGER tr BEFORE INSERT ON t FOR EACH ROW\nBEGIN\n"
+           "  IF NEW.a < 0 THEN\n    SET NEW.a = 0;\n  END IF;\nEND;\nSELECT 5;")
+    assert statements(sql) == [
+        "CREATE TRIGGER tr BEFORE INSERT ON t FOR EACH ROW\nBEGIN\n  IF NEW.a < 0 THEN\n    SET NEW.a = 0;\n  END IF;\nEND",
+        "SELECT 5",
+    ]
+
+
+def test_comments_are_dropped():
+    assert statements("# comment; here\nSELECT 6; -- trailing; x\n/* block; */ SELECT 7;") == ["SELECT 6", "SELECT 7"]
+
+
+def test_executable_and_hint_comments_are_kept():
+    assert statements("/*!40101 SET NAMES utf8 */;\nSELECT /*+ NO_INDEX(t) */ a FROM t;") == [
+        "/*!40101 SET NAMES utf8 */",
+        "SELECT /*+ NO_INDEX(t) */ a FROM t",
+    ]
+
+
+def test_double_dash_without_space_is_not_a_comment():
+    assert statements("SELECT '--not a comment';SELECT 1--1;") == ["SELECT '--not a comment'", "SELECT 1--1"]
+
+
+def test_reads_an_iterable_of_lines():
+    assert list(iter_statements(["SELECT 1;\n", "SELECT\n", "2;\n"])) == [(1, "SELECT 1"), (2, "SELECT\n2")]
@@ -0,0 +1,24 @@
+"""cli.users.validation – rule set and the stage-overlap replay."""
+
+from cli.users.validation import RULES, TRUSTED_TRIGGERS, _first_come_per_stage
+
+
+def test_rules_cover_the_trusted_triggers():
+    assert len({rule.name for rule in RULES}) == len(RULES)
+    assert set(TRUSTED_TRIGGERS) == {name for rule in RULES for name in rule.triggers}
+
+
+def test_stage_overlap_keeps_the_lower_perf_id():
+    rows = [(7, 2, 0, 5), (5, 2, 1, 3)]
+    assert _first_come_per_stage(rows) == [(7,)]
+
+
+def test_rejected_performance_blocks_nothing():
+    # 1-2, 2-3 and 3-4 overlap pairwise; the trigger rejects 2 and 4 only
+    rows = [(1, 1, 0, 10), (2, 1, 9, 20), (3, 1, 19, 30), (4, 1, 29, 40)]
+    assert _first_come_per_stage(rows) == [(2,), (4,)]
+
+
+def test_stages_are_independent_and_touching_slots_do_not_overlap():
+    rows = [(1, 1, 0, 10), (2, 2, 0, 10), (3, 1, 10, 20)]
+    assert _first_come_per_stage(rows) == []